@@ -196,41 +196,43 @@ def cargar_datos_desde_archivo(file_path):
 
     return valores_rgb, colores_circundantes
 
-# Configuración de la interfaz gráfica
-root = tk.Tk()
-root.title("Reconocimiento de Colores")
-
-# Configuración del menú desplegable para la métrica de distancia
-metrica_var = StringVar(root)
-metrica_var.set("Manhattan (p=1)")
-opciones = ["Manhattan (p=1)", "Euclidiana (p=2)", "Máximo (p=inf)"]
-menu_metrica = tk.OptionMenu(root, metrica_var, *opciones)
-menu_metrica.pack(pady=20)
-menu_metrica.configure(bg='#f0f0f0', fg='black', font=('Arial', 12))
-
-# Botón para cargar una imagen
-btn_cargar = tk.Button(root, text="Cargar Imagen", command=cargar_imagen, width=40, padx=15, font=('Arial', 18, 'bold'), background='orange', foreground='white')
-btn_cargar.pack(pady=20)
-
-# Botón para guardar datos
-btn_guardar = tk.Button(root, text="Guardar Datos", command=guardar_datos_en_archivo, width=40, padx=15, font=('Arial', 18, 'bold'), background='orange', foreground='white')
-btn_guardar.pack(pady=20)
-
-# Lienzo para mostrar la imagen
-canvas = tk.Canvas(root, bg='white')
-canvas.pack(fill=tk.BOTH, expand=True, padx=20, pady=20)
-
-# Barras de desplazamiento para el lienzo
-scroll_x = tk.Scrollbar(root, orient="horizontal", command=canvas.xview)
-scroll_x.pack(side=tk.BOTTOM, fill=tk.X)
-scroll_y = tk.Scrollbar(root, orient="vertical", command=canvas.yview)
-scroll_y.pack(side=tk.RIGHT, fill=tk.Y)
-
-canvas.config(yscrollcommand=scroll_y.set, xscrollcommand=scroll_x.set)
-
-# Etiqueta para mostrar el resultado
-label_result = tk.Label(root, text="", font=("Arial", 16))
-label_result.pack(pady=20)
-
-# Iniciar la interfaz gráfica
-root.mainloop()
\ No newline at end of file
+# La interfaz sólo se construye al ejecutar el script, así el módulo puede importarse sin pantalla
+if __name__ == "__main__":
+    # Configuración de la interfaz gráfica
+    root = tk.Tk()
+    root.title("Reconocimiento de Colores")
+
+    # Configuración del menú desplegable para la métrica de distancia
+    metrica_var = StringVar(root)
+    metrica_var.set("Manhattan (p=1)")
+    opciones = ["Manhattan (p=1)", "Euclidiana (p=2)", "Máximo (p=inf)"]
+    menu_metrica = tk.OptionMenu(root, metrica_var, *opciones)
+    menu_metrica.pack(pady=20)
+    menu_metrica.configure(bg='#f0f0f0', fg='black', font=('Arial', 12))
+
+    # Botón para cargar una imagen
+    btn_cargar = tk.Button(root, text="Cargar Imagen", command=cargar_imagen, width=40, padx=15, font=('Arial', 18, 'bold'), background='orange', foreground='white')
+    btn_cargar.pack(pady=20)
+
+    # Botón para guardar datos
+    btn_guardar = tk.Button(root, text="Guardar Datos", command=guardar_datos_en_archivo, width=40, padx=15, font=('Arial', 18, 'bold'), background='orange', foreground='white')
+    btn_guardar.pack(pady=20)
+
+    # Lienzo para mostrar la imagen
+    canvas = tk.Canvas(root, bg='white')
+    canvas.pack(fill=tk.BOTH, expand=True, padx=20, pady=20)
+
+    # Barras de desplazamiento para el lienzo
+    scroll_x = tk.Scrollbar(root, orient="horizontal", command=canvas.xview)
+    scroll_x.pack(side=tk.BOTTOM, fill=tk.X)
+    scroll_y = tk.Scrollbar(root, orient="vertical", command=canvas.yview)
+    scroll_y.pack(side=tk.RIGHT, fill=tk.Y)
+
+    canvas.config(yscrollcommand=scroll_y.set, xscrollcommand=scroll_x.set)
+
+    # Etiqueta para mostrar el resultado
+    label_result = tk.Label(root, text="", font=("Arial", 16))
+    label_result.pack(pady=20)
+
+    # Iniciar la interfaz gráfica
+    root.mainloop()
\ No newline at end of file
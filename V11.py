@@ -12,203 +12,308 @@
 import tkinter as tk  # Biblioteca para crear interfaces gráficas en Python
 from tkinter import filedialog, StringVar, messagebox  # Módulos para manejar diálogos de archivos
 from PIL import Image, ImageTk  # Biblioteca para trabajar con imágenes
-import cv2  # OpenCV, una biblioteca de visión por computadora
 import numpy as np  # Biblioteca para trabajar con arreglos y operaciones matemáticas
-from collections import Counter  # Módulo para trabajar con estructuras de datos especializadas
-import json  # Módulo para trabajar con archivos JSON
 import os  # Módulo para interactuar con el sistema operativo
 import time  # Módulo para manejar operaciones relacionadas con el tiempo
-import fnmatch  # Módulo para realizar coincidencias de patrones en nombres de archivos
+import queue  # Cola para devolver los resultados de los hilos de trabajo a la interfaz
+from collections import OrderedDict  # Caché de imágenes escaladas en orden de uso
+from concurrent.futures import ThreadPoolExecutor  # Hilos de trabajo para no bloquear la interfaz
+from clasificador import AMARILLO, FONDO, ROJO, VERDE, clasificar_imagen, texto_etiqueta  # Clasificación vectorizada y texto de comparacion()
+from tablas import tabla_para  # Tablas de consulta RGB -> etiqueta precalculadas
+from vecindad import crear_raster, voto_vecinos  # Mapa denso de etiquetas
+from regiones import regiones_desde_etiquetas  # Una región por manzana
+from paralelo import clasificar_en_paralelo  # Clasificación por franjas en varios núcleos
+from persistencia import EXTENSION as EXTENSION_SESION, cargar_datos, guardar_sesion  # Sesiones binarias compactas
+from registro import activar_registro  # Conjunto de prototipos configurable
+from indice import DIRECTORIO_DATOS, buscar_sesion, huella_imagen, registrar_sesion  # Índice de sesiones guardadas
+from cache_resultados import buscar_resultado, guardar_resultado  # Clasificaciones ya hechas de la misma imagen
+from instrumentacion import instrumentar, un_pixel  # Métricas opcionales por etapa (MANZANAS_METRICAS)
 
 # ----------------------------------------------------------
 # Variables Globales
 # ----------------------------------------------------------
 valores_rgb = {}  # Diccionario para almacenar los valores RGB
-colores_circundantes = {}  # Diccionario para almacenar colores circundantes
+etiquetas = None  # Mapa HxW (uint8) con el código de etiqueta de cada píxel visitado
+visitados = None  # Máscara HxW (bool) de los píxeles ya clasificados
+COLORES_TK = {"rojo": "red", "verde": "green", "amarillo": "yellow"}  # Nombres de color que entiende Tk
+METRICAS = {"Manhattan (p=1)": 1, "Euclidiana (p=2)": 2, "Máximo (p=inf)": float('inf')}
+
+# Trabajo pesado (decodificar, construir tablas, clasificar la imagen, guardar) fuera del hilo de Tk
+trabajadores = ThreadPoolExecutor(max_workers=2)
+resultados = queue.Queue()  # Pares (función, argumentos) que los hilos dejan para el hilo de Tk
+INTERVALO_RESULTADOS_MS = 15  # Cada cuánto revisa la interfaz los resultados de los hilos
+pixeles_imagen = None  # Arreglo HxWx3 (uint8, RGB) de la imagen cargada
+huella_actual = None  # Huella del contenido de la imagen cargada
+TIPO_MAPA = "mapa"  # Entradas de la caché de resultados con sólo el mapa y las manzanas
+clasificacion = {}  # Métrica -> mapa HxW de etiquetas de la imagen completa
+tablas_listas = {}  # Métrica -> tabla de consulta ya abierta
+preparando = set()  # Pares (métrica, generación) con una preparación en curso
+evento_pendiente = None  # Último movimiento del cursor aún sin procesar
+generacion = 0  # Aumenta con cada imagen cargada, para descartar resultados de imágenes anteriores
+
+# Superposición de la clasificación completa sobre la imagen
+COLORES_MASCARA = {ROJO: (230, 30, 30), VERDE: (40, 200, 40), AMARILLO: (250, 220, 0)}  # RGB por código
+ALFA_MASCARA = 110  # Opacidad de la máscara (de 0 a 256)
+ESCALAS = (0.25, 0.5, 1.0, 2.0, 4.0)  # Niveles de acercamiento del lienzo
+PIXELES_MAXIMOS_VISTA = 40_000_000  # Tamaño máximo de una imagen escalada
+FOTOS_EN_CACHE = 6  # Imágenes escaladas que se conservan para redibujar sin recalcular
+regiones_por_metrica = {}  # Métrica -> manzanas de la imagen completa
+fotos = OrderedDict()  # (métrica o None, escala) -> PhotoImage lista para el lienzo
+renderizando = set()  # Pares (clave de la foto, generación) que se preparan en segundo plano
+escala = 1.0  # Escala elegida
+escala_mostrada = 1.0  # Escala de la imagen que está en el lienzo
 
 # ----------------------------------------------------------
-# Función para Calcular la Distancia de Minkowski
+# Función para Ejecutar un Trabajo en Segundo Plano
 # ----------------------------------------------------------
-def minkowski_distance(x, y, p):
+def en_segundo_plano(trabajo, al_terminar, *argumentos, al_fallar=None):
     """
-    Calcula la distancia de Minkowski entre dos puntos.
+    Ejecuta un trabajo en un hilo y entrega su resultado en el hilo de Tk.
 
-    Args:
-    x (list): Coordenadas del primer punto.
-    y (list): Coordenadas del segundo punto.
-    p (float): Parámetro de la distancia de Minkowski.
+    Tk no admite llamadas desde otros hilos, así que el resultado se deja en
+    una cola que atender_resultados() revisa con root.after().
 
-    Returns:
-    float: Distancia de Minkowski entre los dos puntos.
+    Args:
+    trabajo (callable): Función a ejecutar en el hilo de trabajo.
+    al_terminar (callable): Función que recibe el resultado en el hilo de Tk, o None.
+    *argumentos: Argumentos del trabajo.
+    al_fallar (callable): Función sin argumentos que se llama en el hilo de Tk si el
+        trabajo lanza una excepción (además de mostrar el error), o None.
     """
-    if len(x) != len(y):
-        raise ValueError("Los puntos x e y deben tener la misma dimensión.")
-
-    if p == 2:
-        return sum((xi - yi) ** 2 for xi, yi in zip(x, y)) ** 0.5
-    if p == float('inf'):
-        return max(abs(xi - yi) for xi, yi in zip(x, y))
-    sum_powered_differences = sum(abs(xi - yi) ** p for xi, yi in zip(x, y))
-    return sum_powered_differences ** (1 / p)
+    def ejecutar():
+        try:
+            resultado = trabajo(*argumentos)
+        except Exception as error:
+            if al_fallar is not None:
+                resultados.put((al_fallar, ()))
+            resultados.put((mostrar_error, (error,)))
+        else:
+            if al_terminar is not None:
+                resultados.put((al_terminar, (resultado,)))
+
+    trabajadores.submit(ejecutar)
 
 # ----------------------------------------------------------
-# Prototipos de Colores para Comparación
+# Función para Atender los Resultados de los Hilos de Trabajo
 # ----------------------------------------------------------
-prototipo_rgb1 = (185, 77, 64)  # Rojo
-prototipo_rgb2 = (137, 185, 65)  # Verde
-prototipo_rgb3 = (230, 173, 75)  # Amarillo
-prototipo_rgb4 = (255, 255, 255)  # Blanco
+def atender_resultados():
+    """
+    Aplica en el hilo de Tk los resultados pendientes y vuelve a agendarse.
+    """
+    while True:
+        try:
+            funcion, argumentos = resultados.get_nowait()
+        except queue.Empty:
+            break
+        funcion(*argumentos)
+    root.after(INTERVALO_RESULTADOS_MS, atender_resultados)
+
+def mostrar_error(error):
+    messagebox.showerror("Error", str(error))
 
 # ----------------------------------------------------------
-# Funciones para Calcular la Distancia para Colores Específicos
+# Funciones para Preparar una Métrica en Segundo Plano
 # ----------------------------------------------------------
-def roja(pixel, metrica):
+def preparar_metrica(metrica, generacion_imagen, pixeles, huella=None):
     """
-    Calcula la distancia para el color rojo.
+    Abre (o construye) la tabla de una métrica y clasifica la imagen completa.
+
+    Si la misma imagen ya se clasificó con estos prototipos y esta métrica
+    (aunque tuviera otro nombre), el mapa sale de la caché de resultados.
 
     Args:
-    pixel (tuple): Coordenadas de color del píxel.
     metrica (float): Parámetro de la distancia de Minkowski.
+    generacion_imagen (int): Generación de la imagen que se clasifica.
+    pixeles (ndarray): Imagen HxWx3 (RGB), o None si no hay imagen cargada.
+    huella (str): Huella del contenido de la imagen, o None para no usar la caché.
 
     Returns:
-    float or None: Distancia si el píxel es rojo, None en caso contrario.
+    tuple: (métrica, tabla, generación, (mapa de etiquetas, manzanas) o None).
     """
-    return minkowski_distance(prototipo_rgb1, pixel, metrica) if (
-        pixel[0] > 50 and pixel[1] < 60 and pixel[2] < 60
-    ) else None
+    if pixeles is None:
+        return metrica, tabla_para(metrica), generacion_imagen, None
+    guardado = buscar_resultado(huella, metrica, TIPO_MAPA) if huella else None
+    if guardado is not None:
+        # La tabla se abre igual: la corrección bajo el cursor la necesita
+        mapa, resultado = guardado
+        return metrica, tabla_para(metrica), generacion_imagen, (mapa, resultado["manzanas"])
+
+    tabla = tabla_para(metrica)
+    # Por franjas de filas en varios hilos; la consulta a la tabla libera el GIL, así Tk sigue atendiendo
+    mapa = clasificar_en_paralelo(pixeles, metrica)
+    manzanas = regiones_desde_etiquetas(mapa)
+    if huella:
+        guardar_resultado(huella, metrica, mapa, {"manzanas": manzanas}, TIPO_MAPA)
+    return metrica, tabla, generacion_imagen, (mapa, manzanas)
+
+def metrica_preparada(resultado):
+    metrica, tabla, generacion_imagen, clasificada = resultado
+    preparando.discard((metrica, generacion_imagen))
+    tablas_listas[metrica] = tabla
+    if clasificada is not None and generacion_imagen == generacion:
+        clasificacion[metrica], regiones_por_metrica[metrica] = clasificada
+        dibujar()
+
+def cambiar_metrica(*_):
+    metrica = METRICAS[metrica_var.get()]
+    if metrica in clasificacion or (metrica, generacion) in preparando:
+        return
+    pendiente = (metrica, generacion)
+    preparando.add(pendiente)
+    # Si la preparación falla, la métrica puede volver a elegirse para reintentarla
+    en_segundo_plano(preparar_metrica, metrica_preparada, metrica, generacion, pixeles_imagen, huella_actual,
+                     al_fallar=lambda: preparando.discard(pendiente))
 
-def verde(pixel, metrica):
+# ----------------------------------------------------------
+# Función para Preparar una Vista de la Imagen en Segundo Plano
+# ----------------------------------------------------------
+def renderizar_vista(clave, generacion_imagen, pixeles, mapa, escala_vista):
     """
-    Calcula la distancia para el color verde.
+    Mezcla la máscara de colores con la imagen y la escala, sin tocar Tk.
 
     Args:
-    pixel (tuple): Coordenadas de color del píxel.
-    metrica (float): Parámetro de la distancia de Minkowski.
+    clave (tuple): Clave de la vista en la caché de fotos.
+    generacion_imagen (int): Generación de la imagen.
+    pixeles (ndarray): Imagen HxWx3 (RGB).
+    mapa (ndarray): Mapa HxW de etiquetas, o None para la imagen sin máscara.
+    escala_vista (float): Escala de la vista.
 
     Returns:
-    float or None: Distancia si el píxel es verde, None en caso contrario.
+    tuple: (clave, generación, imagen PIL escalada).
     """
-    return minkowski_distance(prototipo_rgb2, pixel, metrica) if (
-        pixel[0] > 20 and pixel[1] > 30 and pixel[2] < 100
-    ) else None
+    vista = pixeles
+    if mapa is not None:
+        paleta = np.zeros((256, 3), dtype=np.uint16)
+        for codigo, color in COLORES_MASCARA.items():
+            paleta[codigo] = color
+        # Mezcla entera sólo en los píxeles de fruta; el fondo queda intacto
+        pintados = mapa != FONDO
+        vista = pixeles.copy()
+        vista[pintados] = (
+            (pixeles[pintados].astype(np.uint16) * (256 - ALFA_MASCARA) + paleta[mapa[pintados]] * ALFA_MASCARA) >> 8
+        ).astype(np.uint8)
+
+    imagen = Image.fromarray(vista)
+    if escala_vista != 1:
+        ancho, alto = imagen.size
+        tamano = (max(1, round(ancho * escala_vista)), max(1, round(alto * escala_vista)))
+        imagen = imagen.resize(tamano, Image.NEAREST if escala_vista > 1 else Image.BILINEAR)
+    return clave, generacion_imagen, imagen
+
+def vista_renderizada(resultado):
+    clave, generacion_imagen, imagen = resultado
+    renderizando.discard((clave, generacion_imagen))
+    if generacion_imagen != generacion:
+        return
+    fotos[clave] = ImageTk.PhotoImage(imagen)
+    while len(fotos) > FOTOS_EN_CACHE:
+        fotos.popitem(last=False)
+    if clave == clave_vista():
+        mostrar_vista(clave)
 
-def amarilla(pixel, metrica):
+# ----------------------------------------------------------
+# Funciones para Dibujar la Superposición en el Lienzo
+# ----------------------------------------------------------
+def clave_vista():
     """
-    Calcula la distancia para el color amarillo.
-
-    Args:
-    pixel (tuple): Coordenadas de color del píxel.
-    metrica (float): Parámetro de la distancia de Minkowski.
+    Devuelve la clave de la vista que corresponde a los controles actuales.
 
     Returns:
-    float or None: Distancia si el píxel es amarillo, None en caso contrario.
+    tuple: (métrica si se muestra la máscara o None, escala).
     """
-    return minkowski_distance(prototipo_rgb3, pixel, metrica) if (
-        pixel[0] > 50 and pixel[1] > 80 and pixel[2] < 110
-    ) else None
+    metrica = METRICAS[metrica_var.get()]
+    con_mascara = superposicion_var.get() and metrica in clasificacion
+    return (metrica if con_mascara else None, escala)
 
-def blanco(pixel, metrica):
+def dibujar(*_):
     """
-    Calcula la distancia para el color blanco.
-
-    Args:
-    pixel (tuple): Coordenadas de color del píxel.
-    metrica (float): Parámetro de la distancia de Minkowski.
-
-    Returns:
-    float or None: Distancia si el píxel es blanco, None en caso contrario.
+    Muestra la vista actual desde la caché o la prepara en segundo plano.
     """
-    return minkowski_distance(prototipo_rgb4, pixel, metrica) if (
-        pixel[0] > 200 and pixel[1] > 200 and pixel[2] > 200
-    ) else None
-
-# ----------------------------------------------------------
-# Función para Comparar el Color de un Píxel con los Prototipos
-# ----------------------------------------------------------
-def comparacion(pixel, metrica, event):
+    if pixeles_imagen is None:
+        return
+    clave = clave_vista()
+    if clave in fotos:
+        mostrar_vista(clave)
+    elif (clave, generacion) not in renderizando:
+        pendiente = (clave, generacion)
+        renderizando.add(pendiente)
+        metrica, escala_vista = clave
+        mapa = clasificacion[metrica] if metrica is not None else None
+        en_segundo_plano(renderizar_vista, vista_renderizada, clave, generacion, pixeles_imagen, mapa, escala_vista,
+                         al_fallar=lambda: renderizando.discard(pendiente))
+
+def mostrar_vista(clave):
     """
-    Compara el color de un píxel con los prototipos y determina el color dominante.
+    Pone en el lienzo una vista ya escalada y las cajas de sus manzanas.
 
     Args:
-    pixel (tuple): Coordenadas de color del píxel.
-    metrica (float): Parámetro de la distancia de Minkowski.
-    event: Evento relacionado con la posición del píxel.
-
-    Returns:
-    tuple: Mensaje indicando el color y el color de la fuente para la presentación.
+    clave (tuple): Clave de la vista en la caché de fotos.
     """
-    valor_rojo = roja(pixel, metrica)
-    valor_verde = verde(pixel, metrica)
-    valor_amarillo = amarilla(pixel, metrica)
-    valor_blanco = blanco(pixel, metrica)
-
-    valores = {
-        "Rojo": valor_rojo,
-        "Verde": valor_verde,
-        "Amarillo": valor_amarillo,
-        "Blanco": valor_blanco,
-    }
-# ----------------------------------------------------------
-# Filtrar valores válidos y seleccionar el color dominante
-# ----------------------------------------------------------
-    valores_validos = {color: valor for color, valor in valores.items() if valor is not None and valor != float('inf')}
-
-    if not valores_validos:
-        return "Es fondo", "black"
+    global escala_mostrada
+    metrica, escala_mostrada = clave
+    fotos.move_to_end(clave)
+    photo = fotos[clave]
+    canvas.photo_image = photo
+    canvas.itemconfig("imagen", image=photo)
+    canvas.config(scrollregion=(0, 0, photo.width(), photo.height()))
 
-    color_label = min(valores_validos, key=valores_validos.get)
-    font_color = color_label.lower()
+    canvas.delete("cajas")
+    for region in regiones_por_metrica.get(metrica, []):
+        x, y, ancho, alto = (valor * escala_mostrada for valor in region["bbox"])
+        canvas.create_rectangle(x, y, x + ancho, y + alto, outline=COLORES_TK[region["color"]], width=2, tags="cajas")
 
-    if color_label.lower() == "blanco":
-        return "Es fondo", "black"
+def cambiar_escala(paso):
+    """
+    Acerca o aleja la vista un nivel de ESCALAS.
 
-    return f"Es manzana de color {color_label.lower()}", font_color
+    Args:
+    paso (int): +1 para acercar, -1 para alejar.
+    """
+    global escala
+    if pixeles_imagen is None:
+        return
+    indice = min(max(ESCALAS.index(escala) + paso, 0), len(ESCALAS) - 1)
+    alto, ancho = pixeles_imagen.shape[:2]
+    if alto * ancho * ESCALAS[indice] ** 2 <= PIXELES_MAXIMOS_VISTA:
+        escala = ESCALAS[indice]
+        dibujar()
 
 # ----------------------------------------------------------
-# Función para Detectar la Forma de una Imagen
+# Función para Convertir la Posición del Cursor en un Píxel de la Imagen
 # ----------------------------------------------------------
-def detectar_forma(img):
+def posicion_en_imagen(event):
     """
-    Detecta la forma de una imagen y determina si es una manzana o fondo.
+    Convierte la posición del cursor en el lienzo a coordenadas de la imagen.
+
+    Tiene en cuenta el desplazamiento de las barras y la escala mostrada.
 
     Args:
-    img: Imagen a analizar.
+    event: Evento <Motion> del lienzo.
 
     Returns:
-    str: Mensaje indicando si es una manzana o fondo.
+    tuple: (x, y) en píxeles de la imagen original.
     """
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-    _, thresh = cv2.threshold(gray, 128, 255, cv2.THRESH_BINARY)
-    contours, _ = cv2.findContours(thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-
-    for contour in contours:
-        approx = cv2.approxPolyDP(contour, 0.02 * cv2.arcLength(contour, True), True)
-        if len(approx) >= 5:
-            return "Es una manzana"
-
-    return "Es fondo"
+    return int(canvas.canvasx(event.x) / escala_mostrada), int(canvas.canvasy(event.y) / escala_mostrada)
 
 # ----------------------------------------------------------
 # Función para Corregir la Detección Basada en Colores Circundantes
 # ----------------------------------------------------------
-def corregir_deteccion(event, metrica_seleccionada):
+@instrumentar("corregir_deteccion", un_pixel)
+def corregir_deteccion(x, y, metrica_seleccionada):
     """
     Corrige la detección basada en los colores circundantes.
 
     Args:
-    event: Evento relacionado con la posición del píxel.
+    x (int): Columna del píxel en la imagen.
+    y (int): Fila del píxel en la imagen.
     metrica_seleccionada (float): Parámetro de la distancia de Minkowski.
     """
-    x, y = event.x, event.y
-    vecinos = [(x+i, y+j) for i in range(-1, 2) for j in range(-1, 2) if (0 <= x+i < width) and (0 <= y+j < height) and (i, j) != (0, 0)]
-
-    colores = [colores_circundantes[vecino] for vecino in vecinos if vecino in colores_circundantes]
-    contador_colores = Counter(colores)
+    codigo = voto_vecinos(etiquetas, visitados, x, y)
 
-    if contador_colores:
-        color_mas_comun, _ = contador_colores.most_common(1)[0]
-        if color_mas_comun.lower() in ["rojo", "verde", "amarillo", "blanco"]:
-            label_result.config(text=f"Es {color_mas_comun.lower()}", fg=color_mas_comun.lower())
+    if codigo is not None:
+        _, color_mas_comun = texto_etiqueta(codigo)
+        if color_mas_comun in COLORES_TK:
+            label_result.config(text=f"Es {color_mas_comun}", fg=COLORES_TK[color_mas_comun])
 
 # ----------------------------------------------------------
 # Función para Cargar una Imagen y Configurar la Interfaz Gráfica
@@ -216,61 +321,146 @@ def corregir_deteccion(event, metrica_seleccionada):
 def cargar_imagen():
     """
     Carga una imagen y configura la interfaz gráfica.
+
+    La imagen y la sesión previa se leen en segundo plano; la ventana sigue
+    respondiendo mientras tanto.
     """
-    global file_path
+    global file_path, generacion
     file_path = filedialog.askopenfilename()
     if not file_path:
         return
+    generacion += 1
+    label_result.config(text="Cargando imagen...", fg="black")
+    en_segundo_plano(leer_imagen_y_sesion, imagen_cargada, file_path, generacion)
+
+# ----------------------------------------------------------
+# Función para Leer la Imagen y su Sesión en Segundo Plano
+# ----------------------------------------------------------
+@instrumentar("carga_imagen")
+def leer_imagen_y_sesion(ruta, generacion_imagen):
+    """
+    Decodifica la imagen y recupera su sesión más reciente.
+
+    Args:
+    ruta (str): Ruta de la imagen.
+    generacion_imagen (int): Generación de la carga.
+
+    Returns:
+    tuple: (generación, imagen PIL, píxeles RGB, huella, (valores_rgb, etiquetas, visitados)).
+    """
+    original_image = Image.open(ruta)
+    original_image.load()
+    pixeles = np.asarray(original_image.convert("RGB"))
+    ancho, alto = original_image.size
+    # Una sola huella sirve para buscar la sesión, la caché de resultados y registrar al guardar
+    huella = huella_imagen(ruta)
+    return generacion_imagen, original_image, pixeles, huella, cargar_datos_desde_archivo(ruta, alto, ancho, huella)
+
+# ----------------------------------------------------------
+# Función para Mostrar la Imagen ya Leída
+# ----------------------------------------------------------
+def imagen_cargada(resultado):
+    """
+    Configura el lienzo con la imagen leída en segundo plano (hilo de Tk).
+
+    Args:
+    resultado (tuple): Resultado de leer_imagen_y_sesion().
+    """
+    global etiquetas, visitados, pixeles_imagen, huella_actual, escala
+    generacion_imagen, original_image, pixeles, huella, (valores_rgb_cargados, etiquetas_cargadas, visitados_cargados) = resultado
+    if generacion_imagen != generacion:
+        return  # Se eligió otra imagen mientras ésta se leía
     # ----------------------------------------------------------
-    # Abrir la imagen y configurar el lienzo
+    # Configurar el lienzo; las vistas de la imagen anterior ya no sirven
     # ----------------------------------------------------------
-    original_image = Image.open(file_path)
-    photo = ImageTk.PhotoImage(original_image)
+    escala = 1.0
+    fotos.clear()
+    fotos[(None, escala)] = ImageTk.PhotoImage(original_image)
+    canvas.delete(tk.ALL)
     canvas.original_image = original_image
-    canvas.photo_image = photo
-    canvas.config(scrollregion=canvas.bbox(tk.ALL))
-    canvas.create_image(0, 0, anchor=tk.NW, image=photo)
-    canvas.bind('<Motion>', lambda event: color_detect(event, file_path))
-    
+    canvas.create_image(0, 0, anchor=tk.NW, tags="imagen")
+    mostrar_vista((None, escala))
+    canvas.bind('<Motion>', al_mover_cursor)
+
     # ----------------------------------------------------------
-    # Cargar datos previos si están disponibles
+    # Datos previos y clasificación completa en segundo plano
     # ----------------------------------------------------------
-    valores_rgb_cargados, colores_circundantes_cargados = cargar_datos_desde_archivo(file_path)
-
+    etiquetas, visitados = etiquetas_cargadas, visitados_cargados
+    pixeles_imagen = pixeles
+    huella_actual = huella
+    clasificacion.clear()
+    regiones_por_metrica.clear()
     valores_rgb.clear()
     valores_rgb.update(valores_rgb_cargados)
-    colores_circundantes.clear()
-    colores_circundantes.update(colores_circundantes_cargados)
+    label_result.config(text="")
+    cambiar_metrica()
+
+# ----------------------------------------------------------
+# Función para Agrupar los Movimientos del Cursor
+# ----------------------------------------------------------
+def al_mover_cursor(event):
+    """
+    Guarda sólo el último movimiento y agenda un único procesamiento.
+
+    Si llegan varios eventos <Motion> antes de que la interfaz quede libre,
+    se procesa únicamente la posición más reciente.
+
+    Args:
+    event: Evento <Motion> del lienzo.
+    """
+    global evento_pendiente
+    agendado = evento_pendiente is not None
+    evento_pendiente = event
+    if not agendado:
+        root.after_idle(procesar_movimiento)
+
+def procesar_movimiento():
+    global evento_pendiente
+    event, evento_pendiente = evento_pendiente, None
+    color_detect(event, file_path)
 
 # ----------------------------------------------------------
 # Función para detectar el color de un píxel en movimiento
 # ----------------------------------------------------------
 def color_detect(event, file_path):
     global width, height
-    width, height = canvas.original_image.size
+    height, width = pixeles_imagen.shape[:2]
+    x, y = posicion_en_imagen(event)
 
-    if 0 <= event.x < width and 0 <= event.y < height:
-        r, g, b = canvas.original_image.getpixel((event.x, event.y))
+    if 0 <= x < width and 0 <= y < height:
         metrica_seleccionada = metrica_var.get()
-        metrica_dict = {"Manhattan (p=1)": 1, "Euclidiana (p=2)": 2, "Máximo (p=inf)": float('inf')}
-
-        color_label, font_color = comparacion((r, g, b), metrica_dict[metrica_seleccionada], event)
-
-        font_color = font_color if font_color in ["white", "red", "green", "yellow"] else "black"
+        metrica = METRICAS[metrica_seleccionada]
+
+        # Con la imagen ya clasificada, el cursor sólo consulta el mapa de etiquetas;
+        # la tabla precalculada da el mismo resultado que comparacion()
+        if metrica in clasificacion:
+            codigo = clasificacion[metrica][y, x]
+        elif metrica in tablas_listas:
+            r, g, b = pixeles_imagen[y, x]
+            codigo = tablas_listas[metrica][r, g, b]
+        else:
+            # La tabla todavía se construye en segundo plano: se clasifica sólo este píxel
+            codigo = clasificar_imagen(pixeles_imagen[y:y + 1, x:x + 1], metrica)[0, 0]
+        color_label, font_color = texto_etiqueta(codigo)
+
+        # texto_etiqueta() da el color en español; Tk necesita su nombre en inglés
+        font_color = COLORES_TK.get(font_color, "black")
         #----------------------------------------------------------
-        # Verificar si la posición ya existe en colores_circundantes antes de agregarla
+        # Verificar si la posición ya fue visitada antes de agregarla
         #----------------------------------------------------------
-        if (event.x, event.y) not in colores_circundantes:
-            colores_circundantes[(event.x, event.y)] = color_label
-
-            corregir_deteccion(event, metrica_seleccionada)
+        if not visitados[y, x]:
+            etiquetas[y, x] = codigo
+            visitados[y, x] = True
 
             label_result.config(text=color_label, fg=font_color)
+
+            # Si hay vecinos ya visitados, su voto reemplaza el resultado del píxel solo
+            corregir_deteccion(x, y, metrica_seleccionada)
 #----------------------------------------------------------
-# Función para guardar los datos en un archivo JSON
+# Función para guardar los datos en un archivo binario compacto
 #----------------------------------------------------------
 def guardar_datos_en_archivo():
-    if not colores_circundantes:
+    if visitados is None or not visitados.any():
         messagebox.showinfo("Advertencia", "No hay datos para guardar.")
         return
 
@@ -278,81 +468,108 @@ def guardar_datos_en_archivo():
         messagebox.showinfo("Advertencia", "Cargue una imagen antes de guardar datos.")
         return
     #----------------------------------------------------------
-    # Crear el nombre del archivo JSON
+    # Crear el nombre del archivo con la fecha, para conservar cada sesión
     #----------------------------------------------------------
     nombre_archivo_imagen = os.path.basename(file_path)
     nombre_base, _ = os.path.splitext(nombre_archivo_imagen)
-    nombre_archivo_json = f'datos_{nombre_base}.json'
-
-    colores_circundantes_str = {str(key): value for key, value in colores_circundantes.items()}
+    os.makedirs(DIRECTORIO_DATOS, exist_ok=True)
+    nombre_archivo = os.path.join(DIRECTORIO_DATOS, f'datos_{nombre_base}_{time.strftime("%Y%m%d%H%M%S")}{EXTENSION_SESION}')
     #----------------------------------------------------------
-    # Guardar los datos en el archivo JSON
+    # Guardar una copia del mapa de etiquetas y los visitados en segundo plano,
+    # así el cursor puede seguir marcando píxeles mientras se escribe el archivo
     #----------------------------------------------------------
-    datos = {'valores_rgb': valores_rgb, 'colores_circundantes': colores_circundantes_str}
-    with open(nombre_archivo_json, 'w') as archivo:
-        json.dump(datos, archivo)
+    en_segundo_plano(
+        escribir_sesion, sesion_guardada,
+        nombre_archivo, file_path, etiquetas.copy(), visitados.copy(), dict(valores_rgb), huella_actual,
+    )
+
+def escribir_sesion(nombre_archivo, ruta_imagen, etiquetas_sesion, visitados_sesion, valores, huella=None):
+    guardar_sesion(nombre_archivo, etiquetas_sesion, visitados_sesion, valores)
+    registrar_sesion(nombre_archivo, ruta_imagen, huella)
+    return nombre_archivo
+
+def sesion_guardada(nombre_archivo):
     messagebox.showinfo("Guardado", "Datos guardados correctamente.")
 #----------------------------------------------------------
-# Función para cargar datos desde un archivo JSON
+# Función para cargar datos desde un archivo .etq o JSON
 #----------------------------------------------------------
-def cargar_datos_desde_archivo(file_path):
-    nombre_archivo_imagen = os.path.basename(file_path)
-    nombre_base, _ = os.path.splitext(nombre_archivo_imagen)
-    patron_json = f'datos_{nombre_base}_*.json'
+def cargar_datos_desde_archivo(file_path, alto, ancho, huella=None):
+    # El índice del directorio de datos da la sesión más reciente sin listar el directorio
+    archivo_mas_reciente = buscar_sesion(file_path, huella=huella)
 
-    archivos_json = [archivo for archivo in os.listdir() if fnmatch.fnmatch(archivo, patron_json)]
+    if archivo_mas_reciente:
+        return cargar_datos(archivo_mas_reciente, alto, ancho)
 
-    if archivos_json:
-        archivo_json_mas_reciente = max(archivos_json, key=os.path.getctime)
-        with open(archivo_json_mas_reciente, 'r') as archivo:
-            datos = json.load(archivo)
-            valores_rgb = datos.get('valores_rgb', {})
-            colores_circundantes = datos.get('colores_circundantes', {})
-    else:
-        valores_rgb = {}
-        colores_circundantes = {}
+    return {}, *crear_raster(alto, ancho)
 
-    return valores_rgb, colores_circundantes
+# La interfaz sólo se construye al ejecutar el script, así el módulo puede importarse sin pantalla
+if __name__ == "__main__":
+    # Prototipos del archivo indicado en MANZANAS_PROTOTIPOS, si existe
+    activar_registro()
 
-#----------------------------------------------------------
-# Configuración de la interfaz gráfica
-#----------------------------------------------------------
-root = tk.Tk()
-root.title("Reconocimiento de Colores")
+    #----------------------------------------------------------
+    # Configuración de la interfaz gráfica
+    #----------------------------------------------------------
+    root = tk.Tk()
+    root.title("Reconocimiento de Colores")
 
-#----------------------------------------------------------
-# Configuración del menú desplegable para la métrica de distancia
-#----------------------------------------------------------
-metrica_var = StringVar(root)
-metrica_var.set("Manhattan (p=1)")
-opciones = ["Manhattan (p=1)", "Euclidiana (p=2)", "Máximo (p=inf)"]
-menu_metrica = tk.OptionMenu(root, metrica_var, *opciones)
-menu_metrica.pack(pady=20)
-menu_metrica.configure(bg='#f0f0f0', fg='black', font=('Arial', 12))
-
-# Botón para cargar una imagen
-btn_cargar = tk.Button(root, text="Cargar Imagen", command=cargar_imagen, width=40, padx=15, font=('Arial', 18, 'bold'), background='orange', foreground='white')
-btn_cargar.pack(pady=20)
-
-# Botón para guardar datos
-btn_guardar = tk.Button(root, text="Guardar Datos", command=guardar_datos_en_archivo, width=40, padx=15, font=('Arial', 18, 'bold'), background='orange', foreground='white')
-btn_guardar.pack(pady=20)
-
-# Lienzo para mostrar la imagen
-canvas = tk.Canvas(root, bg='white')
-canvas.pack(fill=tk.BOTH, expand=True, padx=20, pady=20)
-
-# Barras de desplazamiento para el lienzo
-scroll_x = tk.Scrollbar(root, orient="horizontal", command=canvas.xview)
-scroll_x.pack(side=tk.BOTTOM, fill=tk.X)
-scroll_y = tk.Scrollbar(root, orient="vertical", command=canvas.yview)
-scroll_y.pack(side=tk.RIGHT, fill=tk.Y)
-
-canvas.config(yscrollcommand=scroll_y.set, xscrollcommand=scroll_x.set)
-
-# Etiqueta para mostrar el resultado
-label_result = tk.Label(root, text="", font=("Arial", 16))
-label_result.pack(pady=20)
-
-# Iniciar la interfaz gráfica
-root.mainloop()
\ No newline at end of file
+    #----------------------------------------------------------
+    # Configuración del menú desplegable para la métrica de distancia
+    #----------------------------------------------------------
+    metrica_var = StringVar(root)
+    metrica_var.set("Manhattan (p=1)")
+    metrica_var.trace_add("write", cambiar_metrica)
+    metrica_var.trace_add("write", dibujar)
+    opciones = ["Manhattan (p=1)", "Euclidiana (p=2)", "Máximo (p=inf)"]
+    menu_metrica = tk.OptionMenu(root, metrica_var, *opciones)
+    menu_metrica.pack(pady=20)
+    menu_metrica.configure(bg='#f0f0f0', fg='black', font=('Arial', 12))
+
+    # Casilla para mostrar la clasificación completa y las cajas de las manzanas
+    superposicion_var = tk.BooleanVar(root, value=False)
+    casilla_superposicion = tk.Checkbutton(root, text="Mostrar superposición", variable=superposicion_var, command=dibujar, font=('Arial', 12))
+    casilla_superposicion.pack()
+
+    # Botón para cargar una imagen
+    btn_cargar = tk.Button(root, text="Cargar Imagen", command=cargar_imagen, width=40, padx=15, font=('Arial', 18, 'bold'), background='orange', foreground='white')
+    btn_cargar.pack(pady=20)
+
+    # Botón para guardar datos
+    btn_guardar = tk.Button(root, text="Guardar Datos", command=guardar_datos_en_archivo, width=40, padx=15, font=('Arial', 18, 'bold'), background='orange', foreground='white')
+    btn_guardar.pack(pady=20)
+
+    # Lienzo para mostrar la imagen
+    canvas = tk.Canvas(root, bg='white')
+    canvas.pack(fill=tk.BOTH, expand=True, padx=20, pady=20)
+
+    # Barras de desplazamiento para el lienzo
+    scroll_x = tk.Scrollbar(root, orient="horizontal", command=canvas.xview)
+    scroll_x.pack(side=tk.BOTTOM, fill=tk.X)
+    scroll_y = tk.Scrollbar(root, orient="vertical", command=canvas.yview)
+    scroll_y.pack(side=tk.RIGHT, fill=tk.Y)
+
+    canvas.config(yscrollcommand=scroll_y.set, xscrollcommand=scroll_x.set)
+
+    # Acercar y alejar con Ctrl + rueda del ratón (Button-4/5 en X11) o con las teclas + y -
+    root.bind("<Control-MouseWheel>", lambda event: cambiar_escala(1 if event.delta > 0 else -1))
+    root.bind("<Control-Button-4>", lambda event: cambiar_escala(1))
+    root.bind("<Control-Button-5>", lambda event: cambiar_escala(-1))
+    root.bind("<plus>", lambda event: cambiar_escala(1))
+    root.bind("<minus>", lambda event: cambiar_escala(-1))
+
+    # Etiqueta para mostrar el resultado
+    label_result = tk.Label(root, text="", font=("Arial", 16))
+    label_result.pack(pady=20)
+
+    # Al cerrar, los trabajos pendientes se cancelan en lugar de esperarlos
+    def cerrar():
+        trabajadores.shutdown(wait=False, cancel_futures=True)
+        root.destroy()
+    root.protocol("WM_DELETE_WINDOW", cerrar)
+
+    # Preparar la tabla de la métrica inicial y empezar a atender a los hilos de trabajo
+    cambiar_metrica()
+    atender_resultados()
+
+    # Iniciar la interfaz gráfica
+    root.mainloop()
\ No newline at end of file
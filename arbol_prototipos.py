@@ -0,0 +1,170 @@
+# ----------------------------------------------------------
+# Árbol KD sobre los Prototipos de Color
+# ----------------------------------------------------------
+# Con docenas o cientos de prototipos, comparar cada píxel con todos ellos
+# se vuelve el cuello de botella. Este árbol KD agrupa los prototipos en
+# cajas y descarta, para lotes completos de píxeles a la vez, las ramas que
+# no pueden contener un prototipo más cercano o cuya compuerta ningún
+# prototipo puede cumplir. El resultado es exactamente el de comparar contra
+# todos los prototipos en orden (Manhattan, Euclidiana o Chebyshev).
+# ----------------------------------------------------------
+
+# ----------------------------------------------------------
+# Importación de Bibliotecas
+# ----------------------------------------------------------
+import numpy as np  # Biblioteca para trabajar con arreglos y operaciones matemáticas
+
+from distancias import distancia_ordenable  # Distancias enteras con el orden de minkowski_distance()
+
+# ----------------------------------------------------------
+# Variables Globales
+# ----------------------------------------------------------
+TAMANO_HOJA = 8  # Prototipos como máximo en cada hoja
+METRICAS_ARBOL = (1, 2, float('inf'))
+
+# ----------------------------------------------------------
+# Función para Construir el Árbol
+# ----------------------------------------------------------
+def construir_arbol(prototipos, tamano_hoja=TAMANO_HOJA):
+    """
+    Construye un árbol KD sobre los colores de los prototipos.
+
+    Cada nodo guarda la caja que contiene a sus prototipos y la unión de sus
+    compuertas (el menor límite inferior y el mayor superior por canal).
+
+    Args:
+    prototipos (tuple): Entradas (nombre, prototipo RGB, inferiores, superiores, código).
+    tamano_hoja (int): Prototipos como máximo en cada hoja.
+
+    Returns:
+    dict: Árbol con los arreglos de los prototipos y la lista de nodos.
+    """
+    colores = np.array([rgb for _, rgb, _, _, _ in prototipos], dtype=np.int64)
+    inferiores = np.array([inferior for _, _, inferior, _, _ in prototipos], dtype=np.int64)
+    superiores = np.array([superior for _, _, _, superior, _ in prototipos], dtype=np.int64)
+    codigos = np.array([codigo for *_, codigo in prototipos], dtype=np.uint8)
+
+    nodos = []
+
+    def construir(indices):
+        nodo = {
+            "minimo": colores[indices].min(axis=0),
+            "maximo": colores[indices].max(axis=0),
+            "compuerta_inferior": inferiores[indices].min(axis=0),
+            "compuerta_superior": superiores[indices].max(axis=0),
+        }
+        posicion = len(nodos)
+        nodos.append(nodo)
+        if len(indices) <= tamano_hoja:
+            # Las hojas conservan el orden original para resolver empates como la búsqueda lineal
+            nodo["hoja"] = np.sort(indices)
+            return posicion
+
+        eje = int(np.argmax(nodo["maximo"] - nodo["minimo"]))
+        ordenados = indices[np.argsort(colores[indices, eje], kind="stable")]
+        mitad = len(ordenados) // 2
+        nodo["eje"] = eje
+        nodo["corte"] = int(colores[ordenados[mitad], eje])
+        nodo["hijos"] = (construir(ordenados[:mitad]), construir(ordenados[mitad:]))
+        return posicion
+
+    construir(np.arange(len(colores)))
+    return {
+        "colores": colores,
+        "inferiores": inferiores,
+        "superiores": superiores,
+        "codigos": codigos,
+        "nodos": nodos,
+    }
+
+# ----------------------------------------------------------
+# Función para Acotar la Distancia de un Píxel a una Caja
+# ----------------------------------------------------------
+def _cota_inferior(pixeles, minimo, maximo, metrica):
+    """
+    Calcula la menor distancia posible (en la escala de distancia_ordenable) a la caja.
+
+    Args:
+    pixeles (ndarray): Arreglo (N, 3) de enteros.
+    minimo (ndarray): Esquina inferior de la caja.
+    maximo (ndarray): Esquina superior de la caja.
+    metrica (float): 1, 2 o inf.
+
+    Returns:
+    ndarray: Cotas (N,).
+    """
+    separacion = np.maximum(np.maximum(minimo - pixeles, pixeles - maximo), 0)
+    if metrica == 1:
+        return separacion.sum(axis=1)
+    if metrica == 2:
+        return (separacion * separacion).sum(axis=1)
+    return separacion.max(axis=1)
+
+# ----------------------------------------------------------
+# Función para Consultar el Árbol
+# ----------------------------------------------------------
+def consultar_arbol(arbol, pixeles, metrica, codigo_sin_prototipo=0):
+    """
+    Busca, para un lote de píxeles, el prototipo más cercano cuya compuerta se cumple.
+
+    En empates gana el prototipo que aparece primero en la lista, igual que
+    en la comparación lineal de clasificar_imagen().
+
+    Args:
+    arbol (dict): Árbol de construir_arbol().
+    pixeles (ndarray): Arreglo (N, 3) de píxeles RGB.
+    metrica (float): Parámetro de Minkowski (1, 2 o inf).
+    codigo_sin_prototipo (int): Código para los píxeles que no pasan ninguna compuerta.
+
+    Returns:
+    ndarray: Códigos de etiqueta (N,) uint8.
+    """
+    if metrica not in METRICAS_ARBOL:
+        raise ValueError("El árbol sólo admite las métricas 1, 2 e inf.")
+
+    pixeles = np.asarray(pixeles, dtype=np.int64).reshape(-1, 3)
+    numero = len(pixeles)
+    sin_prototipo = len(arbol["colores"])
+    mejor_distancia = np.full(numero, np.iinfo(np.int64).max, dtype=np.int64)
+    mejor_indice = np.full(numero, sin_prototipo, dtype=np.int64)
+
+    # Pila de (nodo, índices de los píxeles que aún pueden mejorar en ese nodo)
+    pila = [(0, np.arange(numero))]
+    while pila:
+        posicion, consultas = pila.pop()
+        nodo = arbol["nodos"][posicion]
+        puntos = pixeles[consultas]
+
+        # Se conserva la igualdad (<=) para no perder un empate con un prototipo de menor índice
+        siguen = _cota_inferior(puntos, nodo["minimo"], nodo["maximo"], metrica) <= mejor_distancia[consultas]
+        siguen &= np.all(
+            (puntos > nodo["compuerta_inferior"]) & (puntos < nodo["compuerta_superior"]), axis=1
+        )
+        consultas, puntos = consultas[siguen], puntos[siguen]
+        if not len(consultas):
+            continue
+
+        if "hoja" in nodo:
+            for indice in nodo["hoja"]:
+                compuerta = np.all(
+                    (puntos > arbol["inferiores"][indice]) & (puntos < arbol["superiores"][indice]), axis=1
+                )
+                distancia = distancia_ordenable(puntos, arbol["colores"][indice], metrica)
+                actual = mejor_distancia[consultas]
+                mejora = compuerta & (
+                    (distancia < actual) | ((distancia == actual) & (indice < mejor_indice[consultas]))
+                )
+                mejor_distancia[consultas[mejora]] = distancia[mejora]
+                mejor_indice[consultas[mejora]] = indice
+            continue
+
+        # Cada píxel visita primero el hijo de su lado del corte (la pila saca el último)
+        izquierdo, derecho = nodo["hijos"]
+        del_lado_izquierdo = puntos[:, nodo["eje"]] < nodo["corte"]
+        pila.append((derecho, consultas[del_lado_izquierdo]))
+        pila.append((izquierdo, consultas[del_lado_izquierdo]))
+        pila.append((izquierdo, consultas[~del_lado_izquierdo]))
+        pila.append((derecho, consultas[~del_lado_izquierdo]))
+
+    codigos = np.append(arbol["codigos"], np.uint8(codigo_sin_prototipo))
+    return codigos[mejor_indice]
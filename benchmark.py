@@ -0,0 +1,336 @@
+# ----------------------------------------------------------
+# Banco de Pruebas de Rendimiento del Proceso de Clasificación
+# ----------------------------------------------------------
+# Genera imágenes sintéticas (discos rojos, verdes y amarillos sobre fondo
+# blanco) en varias resoluciones y mide cada etapa por métrica (p=1, 2, inf):
+# píxeles por segundo, memoria máxima y latencias p50/p99. El resultado es
+# JSON; con --referencia se compara contra una corrida anterior y el proceso
+# termina con error si alguna etapa empeora más de la tolerancia.
+#
+# Uso:
+#   python benchmark.py --salida bench.json
+#   python benchmark.py --referencia bench.json --tolerancia 0.2
+# ----------------------------------------------------------
+
+# ----------------------------------------------------------
+# Importación de Bibliotecas
+# ----------------------------------------------------------
+import argparse  # Módulo para leer los argumentos de la línea de comandos
+import json  # Módulo para trabajar con archivos JSON
+import os  # Módulo para interactuar con el sistema operativo
+import sys  # Módulo para terminar con un código de salida
+import tempfile  # Directorio temporal para las pruebas de persistencia
+import time  # Módulo para medir tiempos
+import tracemalloc  # Medición de la memoria máxima de cada etapa
+
+import cv2  # OpenCV, una biblioteca de visión por computadora
+import numpy as np  # Biblioteca para trabajar con arreglos y operaciones matemáticas
+
+from clasificador import clasificar_imagen, clasificar_por_colores, colores_unicos  # Clasificación vectorizada
+from nucleo import comparacion, detectar_forma, detectar_forma_multiescala, minkowski_distance, prototipo_rgb1  # Núcleo por píxel
+from paralelo import clasificar_en_paralelo  # Clasificación por franjas en varios núcleos
+from persistencia import cargar_sesion, guardar_sesion  # Sesiones binarias compactas
+from tablas import clasificar_con_tabla, tabla_para  # Clasificación con tablas precalculadas
+from vecindad import filtro_moda, raster_a_diccionario, diccionario_a_raster, crear_raster, voto_vecinos  # Vecindad
+
+# ----------------------------------------------------------
+# Variables Globales
+# ----------------------------------------------------------
+RESOLUCIONES = {"vga": (480, 640), "fhd": (1080, 1920), "12mp": (3000, 4000)}
+METRICAS = {"1": 1, "2": 2, "inf": float('inf')}
+# Colores RGB de los discos; pasan las compuertas de roja(), verde() y amarilla()
+COLORES_DISCOS = ((190, 40, 45), (137, 185, 65), (230, 173, 75))
+MUESTRA_POR_PIXEL = 20000  # Píxeles medidos en las etapas que procesan uno a la vez
+
+# ----------------------------------------------------------
+# Función para Generar una Imagen Sintética
+# ----------------------------------------------------------
+def imagen_sintetica(alto, ancho, semilla=0):
+    """
+    Dibuja discos de los tres colores de manzana sobre un fondo blanco.
+
+    Args:
+    alto (int): Alto de la imagen en píxeles.
+    ancho (int): Ancho de la imagen en píxeles.
+    semilla (int): Semilla para que la imagen sea reproducible.
+
+    Returns:
+    ndarray: Imagen HxWx3 (uint8) en orden RGB.
+    """
+    generador = np.random.default_rng(semilla)
+    imagen = np.full((alto, ancho, 3), 255, dtype=np.uint8)
+    radio_maximo = max(4, min(alto, ancho) // 10)
+    for indice in range(12):
+        centro = (int(generador.integers(0, ancho)), int(generador.integers(0, alto)))
+        radio = int(generador.integers(radio_maximo // 2, radio_maximo + 1))
+        cv2.circle(imagen, centro, radio, COLORES_DISCOS[indice % 3], -1, lineType=cv2.LINE_AA)
+    return imagen
+
+# ----------------------------------------------------------
+# Funciones de las Etapas Medidas
+# ----------------------------------------------------------
+# Cada etapa recibe el contexto de la imagen y devuelve los píxeles procesados.
+def _muestra(contexto):
+    """
+    Devuelve una muestra fija de píxeles (como tuplas) y sus coordenadas.
+
+    Args:
+    contexto (dict): Contexto de la imagen.
+
+    Returns:
+    tuple: (lista de tuplas RGB, filas, columnas).
+    """
+    if "muestra" not in contexto:
+        imagen = contexto["imagen"]
+        generador = np.random.default_rng(1)
+        cantidad = min(MUESTRA_POR_PIXEL, imagen.shape[0] * imagen.shape[1])
+        filas = generador.integers(0, imagen.shape[0], cantidad)
+        columnas = generador.integers(0, imagen.shape[1], cantidad)
+        contexto["muestra"] = ([tuple(p) for p in imagen[filas, columnas].tolist()], filas, columnas)
+    return contexto["muestra"]
+
+def etapa_minkowski(contexto, metrica):
+    pixeles, _, _ = _muestra(contexto)
+    for pixel in pixeles:
+        minkowski_distance(prototipo_rgb1, pixel, metrica)
+    return len(pixeles)
+
+def etapa_comparacion(contexto, metrica):
+    pixeles, _, _ = _muestra(contexto)
+    for pixel in pixeles:
+        comparacion(pixel, metrica, None)
+    return len(pixeles)
+
+def etapa_vectorizada(contexto, metrica):
+    clasificar_imagen(contexto["imagen"], metrica)
+    return contexto["imagen"].shape[0] * contexto["imagen"].shape[1]
+
+def etapa_colores(contexto, metrica):
+    clasificar_por_colores(contexto["imagen"], metrica)
+    return contexto["imagen"].shape[0] * contexto["imagen"].shape[1]
+
+def etapa_tabla(contexto, metrica):
+    clasificar_con_tabla(contexto["imagen"], metrica)
+    return contexto["imagen"].shape[0] * contexto["imagen"].shape[1]
+
+def etapa_paralela(contexto, metrica):
+    clasificar_en_paralelo(contexto["imagen"], metrica, suavizar=True)
+    return contexto["imagen"].shape[0] * contexto["imagen"].shape[1]
+
+def etapa_corregir_deteccion(contexto, metrica):
+    _, filas, columnas = _muestra(contexto)
+    etiquetas = contexto["etiquetas"][metrica]
+    visitados = contexto["visitados"]
+    for y, x in zip(filas.tolist(), columnas.tolist()):
+        voto_vecinos(etiquetas, visitados, x, y)
+    return len(filas)
+
+def etapa_filtro_moda(contexto, metrica):
+    filtro_moda(contexto["etiquetas"][metrica])
+    return contexto["etiquetas"][metrica].size
+
+def etapa_detectar_forma(contexto, metrica):
+    detectar_forma(contexto["imagen_bgr"])
+    return contexto["imagen"].shape[0] * contexto["imagen"].shape[1]
+
+def etapa_detectar_forma_multiescala(contexto, metrica):
+    detectar_forma_multiescala(contexto["imagen_bgr"])
+    return contexto["imagen"].shape[0] * contexto["imagen"].shape[1]
+
+def etapa_json(contexto, metrica):
+    etiquetas, visitados = contexto["etiquetas"][metrica], contexto["visitados"]
+    ruta = os.path.join(contexto["temporal"], "datos_bench.json")
+    with open(ruta, "w") as archivo:
+        json.dump({"valores_rgb": {}, "colores_circundantes": raster_a_diccionario(etiquetas, visitados)}, archivo)
+    with open(ruta, "r") as archivo:
+        datos = json.load(archivo)
+    diccionario_a_raster(datos["colores_circundantes"], *crear_raster(*etiquetas.shape))
+    return int(visitados.sum())
+
+def etapa_etq(contexto, metrica):
+    etiquetas, visitados = contexto["etiquetas"][metrica], contexto["visitados"]
+    ruta = os.path.join(contexto["temporal"], "datos_bench.etq")
+    guardar_sesion(ruta, etiquetas, visitados, {})
+    _, cargadas, _ = cargar_sesion(ruta)
+    # Tocar los datos para que la lectura del mapeo en memoria entre en la medición
+    int(cargadas.sum())
+    return int(visitados.sum())
+
+ETAPAS = {
+    "minkowski_distance": (etapa_minkowski, True),
+    "comparacion": (etapa_comparacion, True),
+    "clasificar_imagen": (etapa_vectorizada, True),
+    "clasificar_por_colores": (etapa_colores, True),
+    "clasificar_con_tabla": (etapa_tabla, True),
+    "clasificar_en_paralelo": (etapa_paralela, True),
+    "corregir_deteccion": (etapa_corregir_deteccion, True),
+    "filtro_moda": (etapa_filtro_moda, True),
+    "detectar_forma": (etapa_detectar_forma, False),
+    "detectar_forma_multiescala": (etapa_detectar_forma_multiescala, False),
+    "persistencia_json": (etapa_json, True),
+    "persistencia_etq": (etapa_etq, True),
+}
+
+# ----------------------------------------------------------
+# Función para Medir una Etapa
+# ----------------------------------------------------------
+def medir(funcion, contexto, metrica, repeticiones):
+    """
+    Ejecuta una etapa varias veces y resume su rendimiento.
+
+    La memoria se mide en una ejecución aparte, porque tracemalloc hace más
+    lentas las asignaciones y alteraría los tiempos.
+
+    Args:
+    funcion (callable): Etapa a medir.
+    contexto (dict): Contexto de la imagen.
+    metrica (float): Parámetro de la distancia de Minkowski.
+    repeticiones (int): Número de ejecuciones cronometradas.
+
+    Returns:
+    dict: pixeles, pixeles_por_segundo, p50_ms, p99_ms y memoria_maxima_bytes.
+    """
+    funcion(contexto, metrica)  # Calentamiento (tablas, cachés, importaciones perezosas)
+
+    latencias = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        pixeles = funcion(contexto, metrica)
+        latencias.append(time.perf_counter() - inicio)
+
+    tracemalloc.start()
+    funcion(contexto, metrica)
+    _, memoria_maxima = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    mediana = float(np.percentile(latencias, 50))
+    return {
+        "pixeles": pixeles,
+        "pixeles_por_segundo": round(pixeles / mediana, 1) if mediana > 0 else None,
+        "p50_ms": round(1000 * mediana, 3),
+        "p99_ms": round(1000 * float(np.percentile(latencias, 99)), 3),
+        "memoria_maxima_bytes": int(memoria_maxima),
+    }
+
+# ----------------------------------------------------------
+# Función para Ejecutar el Banco de Pruebas Completo
+# ----------------------------------------------------------
+def ejecutar(resoluciones, metricas, etapas, repeticiones):
+    """
+    Mide cada combinación de resolución, métrica y etapa.
+
+    Args:
+    resoluciones (list): Claves de RESOLUCIONES.
+    metricas (list): Claves de METRICAS.
+    etapas (list): Claves de ETAPAS.
+    repeticiones (int): Ejecuciones cronometradas por combinación.
+
+    Returns:
+    list: Un diccionario por medición.
+    """
+    resultados = []
+    with tempfile.TemporaryDirectory() as temporal:
+        for nombre_resolucion in resoluciones:
+            alto, ancho = RESOLUCIONES[nombre_resolucion]
+            imagen = imagen_sintetica(alto, ancho)
+            colores, _, _ = colores_unicos(imagen)
+            contexto = {
+                "imagen": imagen,
+                "imagen_bgr": np.ascontiguousarray(imagen[..., ::-1]),
+                "etiquetas": {METRICAS[m]: clasificar_con_tabla(imagen, METRICAS[m]) for m in metricas},
+                # La mitad de los píxeles visitados, como tras recorrer la imagen con el cursor
+                "visitados": np.random.default_rng(2).random((alto, ancho)) < 0.5,
+                "temporal": temporal,
+            }
+            for nombre_etapa in etapas:
+                funcion, depende_de_metrica = ETAPAS[nombre_etapa]
+                for nombre_metrica in (metricas if depende_de_metrica else [None]):
+                    metrica = METRICAS[nombre_metrica] if nombre_metrica else METRICAS[metricas[0]]
+                    medicion = medir(funcion, contexto, metrica, repeticiones)
+                    resultados.append({
+                        "etapa": nombre_etapa,
+                        "resolucion": nombre_resolucion,
+                        "metrica": nombre_metrica,
+                        "proporcion_colores_unicos": round(len(colores) / (alto * ancho), 6),
+                        **medicion,
+                    })
+                    print(f"{nombre_etapa:>22} {nombre_resolucion:>5} p={nombre_metrica or '-':>3} "
+                          f"{medicion['pixeles_por_segundo'] or 0:>14,.0f} px/s", file=sys.stderr)
+    return resultados
+
+# ----------------------------------------------------------
+# Función para Comparar contra una Corrida de Referencia
+# ----------------------------------------------------------
+def regresiones(resultados, referencia, tolerancia):
+    """
+    Busca las mediciones cuyo rendimiento cayó más que la tolerancia.
+
+    Args:
+    resultados (list): Mediciones actuales.
+    referencia (list): Mediciones de la corrida de referencia.
+    tolerancia (float): Caída relativa permitida (0.2 = 20 %).
+
+    Returns:
+    list: Mensajes, uno por regresión encontrada.
+    """
+    clave = lambda medicion: (medicion["etapa"], medicion["resolucion"], medicion["metrica"])
+    anteriores = {clave(medicion): medicion for medicion in referencia}
+    mensajes = []
+    for medicion in resultados:
+        anterior = anteriores.get(clave(medicion))
+        if not anterior or not anterior["pixeles_por_segundo"] or not medicion["pixeles_por_segundo"]:
+            continue
+        proporcion = medicion["pixeles_por_segundo"] / anterior["pixeles_por_segundo"]
+        if proporcion < 1 - tolerancia:
+            mensajes.append(f"{'/'.join(str(parte) for parte in clave(medicion))}: {proporcion:.2f}x de la referencia")
+    return mensajes
+
+# ----------------------------------------------------------
+# Función Principal
+# ----------------------------------------------------------
+def main(argumentos=None):
+    """
+    Punto de entrada de la línea de comandos.
+
+    Args:
+    argumentos (list): Argumentos a interpretar; por omisión los de sys.argv.
+    """
+    parser = argparse.ArgumentParser(description="Banco de pruebas de la clasificación de manzanas.")
+    parser.add_argument("--resoluciones", nargs="+", choices=list(RESOLUCIONES), default=list(RESOLUCIONES))
+    parser.add_argument("--metricas", nargs="+", choices=list(METRICAS), default=list(METRICAS))
+    parser.add_argument("--etapas", nargs="+", choices=list(ETAPAS), default=list(ETAPAS))
+    parser.add_argument("--repeticiones", type=int, default=5, help="Ejecuciones cronometradas por medición.")
+    parser.add_argument("--salida", help="Archivo JSON de resultados (por omisión, la salida estándar).")
+    parser.add_argument("--referencia", help="JSON de una corrida anterior para detectar regresiones.")
+    parser.add_argument("--tolerancia", type=float, default=0.2, help="Caída relativa permitida.")
+    args = parser.parse_args(argumentos)
+
+    for nombre_metrica in args.metricas:
+        tabla_para(METRICAS[nombre_metrica])
+
+    resultados = ejecutar(args.resoluciones, args.metricas, args.etapas, args.repeticiones)
+    informe = {
+        "fecha": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "numpy": np.__version__,
+        "opencv": cv2.__version__,
+        "nucleos": os.cpu_count(),
+        "resultados": resultados,
+    }
+
+    if args.salida:
+        with open(args.salida, "w") as archivo:
+            json.dump(informe, archivo, indent=2)
+    else:
+        json.dump(informe, sys.stdout, indent=2)
+        print()
+
+    if args.referencia:
+        with open(args.referencia, "r") as archivo:
+            mensajes = regresiones(resultados, json.load(archivo)["resultados"], args.tolerancia)
+        for mensaje in mensajes:
+            print(f"Regresión: {mensaje}", file=sys.stderr)
+        if mensajes:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+# ----------------------------------------------------------
+# Caché de Resultados por Contenido de la Imagen
+# ----------------------------------------------------------
+# Guarda el mapa de etiquetas y las manzanas de una imagen bajo la huella de
+# su contenido y la versión de los prototipos con la métrica (la misma huella
+# que nombra las tablas), así un fotograma de calibración repetido o una
+# imagen que se vuelve a abrir no se procesan otra vez, aunque cambie de
+# nombre. Las entradas viven en memoria con un límite de bytes (se desaloja
+# la usada hace más tiempo) y, si se configura un directorio, también en
+# disco. Al cambiar los prototipos la huella cambia, y la memoria se vacía.
+# ----------------------------------------------------------
+
+# ----------------------------------------------------------
+# Importación de Bibliotecas
+# ----------------------------------------------------------
+import hashlib  # Módulo para calcular la huella del contenido
+import json  # Módulo para guardar las manzanas en disco
+import os  # Módulo para interactuar con el sistema operativo
+import threading  # Candado para usar la caché desde varios hilos
+from collections import OrderedDict  # Entradas en orden de uso
+
+import numpy as np  # Biblioteca para trabajar con arreglos y operaciones matemáticas
+
+import clasificador  # Conjunto de prototipos activo
+from tablas import huella_prototipos  # Versión de los prototipos y la métrica
+
+# ----------------------------------------------------------
+# Variables Globales
+# ----------------------------------------------------------
+BYTES_MAXIMOS = 256 * 1024 * 1024  # Memoria máxima de la caché por omisión
+configuracion = {
+    "bytes_maximos": BYTES_MAXIMOS,
+    # Directorio de la copia en disco (configurable con MANZANAS_CACHE_RESULTADOS); None la desactiva
+    "directorio": os.environ.get("MANZANAS_CACHE_RESULTADOS"),
+}
+# Formato del resultado completo de lote.py y servicio.py (alto, ancho, forma, pixeles, manzanas);
+# quien guarde otro formato usa otro tipo, así nunca recibe una entrada ajena
+TIPO_IMAGEN = "imagen"
+entradas = OrderedDict()  # (huella, versión, tipo) -> (etiquetas, resultado, bytes)
+estadisticas = {"aciertos": 0, "aciertos_disco": 0, "fallos": 0, "desalojos": 0, "invalidaciones": 0, "bytes": 0}
+candado = threading.RLock()
+prototipos_vigentes = [(clasificador.PROTOTIPOS, clasificador.ESPACIO_COLOR)]  # Conjunto y espacio con que se llenó la memoria
+
+# ----------------------------------------------------------
+# Función para Configurar la Caché
+# ----------------------------------------------------------
+def configurar_cache(bytes_maximos=None, directorio=None):
+    """
+    Cambia el límite de memoria y el directorio de la copia en disco.
+
+    Args:
+    bytes_maximos (int): Bytes como máximo en memoria (0 desactiva la memoria).
+    directorio (str): Directorio de la copia en disco, o None para no cambiarlo.
+    """
+    with candado:
+        if bytes_maximos is not None:
+            configuracion["bytes_maximos"] = bytes_maximos
+            _desalojar()
+        if directorio is not None:
+            configuracion["directorio"] = directorio or None
+
+# ----------------------------------------------------------
+# Función para Calcular la Huella de un Contenido
+# ----------------------------------------------------------
+def huella_contenido(contenido):
+    """
+    Calcula la huella de los bytes de un archivo o de los píxeles de un arreglo.
+
+    Para un archivo coincide con indice.huella_imagen().
+
+    Args:
+    contenido (bytes or ndarray): Bytes del archivo o arreglo de la imagen.
+
+    Returns:
+    str: Huella hexadecimal (BLAKE2b de 128 bits).
+    """
+    huella = hashlib.blake2b(digest_size=16)
+    if isinstance(contenido, np.ndarray):
+        # La forma entra en la huella: dos imágenes con los mismos bytes y otra forma son distintas
+        huella.update(repr((contenido.shape, contenido.dtype.str)).encode("ascii"))
+        contenido = np.ascontiguousarray(contenido)
+    huella.update(memoryview(contenido).cast("B"))
+    return huella.hexdigest()
+
+# ----------------------------------------------------------
+# Función para Vaciar la Memoria si Cambiaron los Prototipos
+# ----------------------------------------------------------
+def _revisar_prototipos():
+    """
+    Vacía la memoria si el conjunto de prototipos o el espacio de color activos cambiaron.
+
+    Las claves ya incluyen la versión de los prototipos, así que una entrada
+    vieja nunca se devolvería; vaciarlas sólo libera su memoria de inmediato.
+    """
+    prototipos, espacio = prototipos_vigentes[0]
+    if prototipos is not clasificador.PROTOTIPOS or espacio != clasificador.ESPACIO_COLOR:
+        invalidar_cache()
+
+def invalidar_cache():
+    """Descarta todas las entradas en memoria (la copia en disco queda, marcada con su versión)."""
+    with candado:
+        entradas.clear()
+        estadisticas["bytes"] = 0
+        estadisticas["invalidaciones"] += 1
+        prototipos_vigentes[0] = (clasificador.PROTOTIPOS, clasificador.ESPACIO_COLOR)
+
+# ----------------------------------------------------------
+# Función para Desalojar Entradas hasta Respetar el Límite
+# ----------------------------------------------------------
+def _desalojar():
+    """Quita las entradas usadas hace más tiempo hasta quedar bajo el límite de bytes."""
+    while entradas and estadisticas["bytes"] > configuracion["bytes_maximos"]:
+        _, (_, _, tamano) = entradas.popitem(last=False)
+        estadisticas["bytes"] -= tamano
+        estadisticas["desalojos"] += 1
+
+def _rutas_disco(huella, version, tipo):
+    base = os.path.join(configuracion["directorio"], f"{huella}_{version}_{tipo}")
+    return f"{base}.npy", f"{base}.json"
+
+def _en_memoria(clave, etiquetas, resultado):
+    """Guarda una entrada en memoria y desaloja lo que sobre."""
+    tamano = etiquetas.nbytes + len(json.dumps(resultado))
+    if tamano > configuracion["bytes_maximos"]:
+        return
+    if clave in entradas:
+        estadisticas["bytes"] -= entradas.pop(clave)[2]
+    entradas[clave] = (etiquetas, resultado, tamano)
+    estadisticas["bytes"] += tamano
+    _desalojar()
+
+# ----------------------------------------------------------
+# Función para Buscar un Resultado
+# ----------------------------------------------------------
+def buscar_resultado(huella, metrica, tipo=TIPO_IMAGEN):
+    """
+    Devuelve el resultado guardado de una imagen con los prototipos y la métrica actuales.
+
+    Args:
+    huella (str): Huella del contenido de la imagen.
+    metrica (float): Parámetro de la distancia de Minkowski.
+    tipo (str): Formato del resultado; sólo se devuelven entradas guardadas con el mismo tipo.
+
+    Returns:
+    tuple or None: (mapa HxW de etiquetas de sólo lectura, resultado), o None si no está.
+    """
+    with candado:
+        _revisar_prototipos()
+        clave = (huella, huella_prototipos(metrica), tipo)
+        if clave in entradas:
+            entradas.move_to_end(clave)
+            estadisticas["aciertos"] += 1
+            etiquetas, resultado, _ = entradas[clave]
+            return etiquetas, resultado
+
+        if configuracion["directorio"]:
+            ruta_etiquetas, ruta_resultado = _rutas_disco(*clave)
+            try:
+                with open(ruta_resultado, "r", encoding="utf-8") as archivo:
+                    resultado = json.load(archivo)
+                etiquetas = np.load(ruta_etiquetas, mmap_mode="r")
+            except (OSError, ValueError):
+                pass
+            else:
+                estadisticas["aciertos_disco"] += 1
+                _en_memoria(clave, etiquetas, resultado)
+                return etiquetas, resultado
+
+        estadisticas["fallos"] += 1
+        return None
+
+# ----------------------------------------------------------
+# Función para Guardar un Resultado
+# ----------------------------------------------------------
+def guardar_resultado(huella, metrica, etiquetas, resultado, tipo=TIPO_IMAGEN):
+    """
+    Guarda el mapa de etiquetas y el resultado (serializable en JSON) de una imagen.
+
+    Args:
+    huella (str): Huella del contenido de la imagen.
+    metrica (float): Parámetro de la distancia de Minkowski.
+    etiquetas (ndarray): Mapa HxW (uint8) de códigos de etiqueta.
+    resultado (dict): Manzanas y demás datos de la imagen.
+    tipo (str): Formato del resultado (TIPO_IMAGEN para el registro completo de una imagen).
+    """
+    etiquetas = np.array(etiquetas, dtype=np.uint8)
+    etiquetas.setflags(write=False)  # Quien reciba la entrada no puede alterar la caché
+    with candado:
+        _revisar_prototipos()
+        clave = (huella, huella_prototipos(metrica), tipo)
+        _en_memoria(clave, etiquetas, resultado)
+        directorio = configuracion["directorio"]
+
+    if directorio:
+        # Primero el resultado y al final las etiquetas: sólo una entrada completa tiene ambos
+        os.makedirs(directorio, exist_ok=True)
+        ruta_etiquetas, ruta_resultado = _rutas_disco(*clave)
+        sufijo = f".{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(ruta_resultado + sufijo, "w", encoding="utf-8") as archivo:
+            json.dump(resultado, archivo, ensure_ascii=False)
+        os.replace(ruta_resultado + sufijo, ruta_resultado)
+        with open(ruta_etiquetas + sufijo, "wb") as archivo:
+            np.save(archivo, etiquetas)
+        os.replace(ruta_etiquetas + sufijo, ruta_etiquetas)
+
+# ----------------------------------------------------------
+# Función para Consultar las Estadísticas
+# ----------------------------------------------------------
+def estadisticas_cache():
+    """
+    Devuelve los contadores de la caché.
+
+    Returns:
+    dict: Aciertos (en memoria y en disco), fallos, desalojos, invalidaciones,
+        bytes y entradas en memoria, y la proporción de aciertos.
+    """
+    with candado:
+        datos = dict(estadisticas, entradas=len(entradas))
+    consultas = datos["aciertos"] + datos["aciertos_disco"] + datos["fallos"]
+    datos["proporcion_aciertos"] = round((datos["aciertos"] + datos["aciertos_disco"]) / consultas, 4) if consultas else None
+    return datos
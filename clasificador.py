@@ -0,0 +1,334 @@
+# ----------------------------------------------------------
+# Clasificación Vectorizada de Imágenes Completas
+# ----------------------------------------------------------
+# Aplica las mismas compuertas y prototipos que comparacion() (nucleo.py)
+# a un arreglo HxWx3 completo en una sola pasada de NumPy.
+# ----------------------------------------------------------
+
+# ----------------------------------------------------------
+# Importación de Bibliotecas
+# ----------------------------------------------------------
+import numpy as np  # Biblioteca para trabajar con arreglos y operaciones matemáticas
+
+from arbol_prototipos import construir_arbol, consultar_arbol  # Árbol KD sobre los prototipos
+from distancias import distancia_ordenable, prototipo_mas_cercano  # Motor de distancias
+from espacios_color import ESPACIOS, ESPACIOS_CIRCULARES, convertir_pixeles, convertir_prototipos  # Lab y HSV
+from instrumentacion import instrumentar, pixeles_del_primero  # Métricas opcionales por etapa
+from nucleo import prototipo_rgb1, prototipo_rgb2, prototipo_rgb3, prototipo_rgb4  # Prototipos de colores
+
+# ----------------------------------------------------------
+# Códigos de Etiqueta
+# ----------------------------------------------------------
+FONDO = 0
+ROJO = 1
+VERDE = 2
+AMARILLO = 3
+
+# Textos devueltos por comparacion() para cada código de etiqueta
+ETIQUETAS = {
+    FONDO: ("Es fondo", "black"),
+    ROJO: ("Es manzana de color rojo", "rojo"),
+    VERDE: ("Es manzana de color verde", "verde"),
+    AMARILLO: ("Es manzana de color amarillo", "amarillo"),
+}
+
+# ----------------------------------------------------------
+# Prototipos y Compuertas
+# ----------------------------------------------------------
+# Cada entrada: (nombre, prototipo RGB, límites inferiores, límites superiores, código).
+# Un píxel pasa la compuerta si inferior < canal < superior en los tres canales,
+# igual que las condiciones de roja(), verde(), amarilla() y blanco().
+# El orden es el mismo que el del diccionario de comparacion(): en caso de empate
+# gana el primer prototipo.
+PROTOTIPOS = (
+    ("Rojo", prototipo_rgb1, (50, -1, -1), (256, 60, 60), ROJO),
+    ("Verde", prototipo_rgb2, (20, 30, -1), (256, 256, 100), VERDE),
+    ("Amarillo", prototipo_rgb3, (50, 80, -1), (256, 256, 110), AMARILLO),
+    ("Blanco", prototipo_rgb4, (200, 200, 200), (256, 256, 256), FONDO),
+)
+
+# Número de filas procesadas a la vez para acotar la memoria intermedia
+FILAS_POR_BLOQUE = 256
+
+# Número de colores distintos clasificados a la vez en clasificar_por_colores()
+COLORES_POR_BLOQUE = 1 << 18
+
+# Métricas con distancias enteras exactas; el resto usa el motor de punto flotante
+METRICAS_EXACTAS = (1, 2, float('inf'))
+
+# Con al menos esta cantidad de prototipos se consulta el árbol KD en lugar de recorrerlos todos
+PROTOTIPOS_PARA_ARBOL = 32
+
+# Árbol del conjunto de prototipos activo: (PROTOTIPOS con que se construyó, árbol)
+_arbol = (None, None)
+
+# Espacio de color donde se miden las distancias (las compuertas siempre se evalúan en RGB)
+ESPACIO_COLOR = "rgb"
+
+# Prototipos activos convertidos: (PROTOTIPOS, espacio, colores en ese espacio)
+_prototipos_espacio = (None, None, None)
+
+# ----------------------------------------------------------
+# Función para Clasificar un Bloque de Píxeles
+# ----------------------------------------------------------
+def _clasificar_bloque(bloque, metrica):
+    """
+    Clasifica un bloque de píxeles con las compuertas y prototipos.
+
+    Fuera de RGB el bloque se convierte una sola vez al espacio activo; las
+    compuertas se evalúan con los valores RGB originales.
+
+    Args:
+    bloque (ndarray): Arreglo (..., 3) de píxeles RGB.
+    metrica (float): Parámetro de la distancia de Minkowski.
+
+    Returns:
+    ndarray: Códigos de etiqueta (uint8) con la forma del bloque sin el último eje.
+    """
+    if metrica not in METRICAS_EXACTAS:
+        return _clasificar_bloque_general(bloque, metrica)
+    # El árbol poda con las cajas RGB de las compuertas, así que sólo sirve en RGB
+    if len(PROTOTIPOS) >= PROTOTIPOS_PARA_ARBOL and ESPACIO_COLOR == "rgb":
+        return consultar_arbol(_arbol_activo(), bloque.reshape(-1, 3), metrica, FONDO).reshape(bloque.shape[:-1])
+
+    pixeles = bloque.astype(np.int32)
+    coordenadas = pixeles if ESPACIO_COLOR == "rgb" else convertir_pixeles(bloque, ESPACIO_COLOR).astype(np.int32)
+    circular = ESPACIO_COLOR in ESPACIOS_CIRCULARES
+    mejor_distancia = np.full(pixeles.shape[:-1], np.iinfo(np.int32).max, dtype=np.int32)
+    mejor_codigo = np.full(pixeles.shape[:-1], FONDO, dtype=np.uint8)
+
+    for (_, _, inferior, superior, codigo), prototipo in zip(PROTOTIPOS, _prototipos_activos()):
+        compuerta = np.all((pixeles > inferior) & (pixeles < superior), axis=-1)
+        distancia = distancia_ordenable(coordenadas, prototipo, metrica, circular)
+        # Sólo una distancia estrictamente menor reemplaza a la anterior,
+        # así en empates gana el primer prototipo como en min() de comparacion()
+        mejora = compuerta & (distancia < mejor_distancia)
+        mejor_distancia[mejora] = distancia[mejora]
+        mejor_codigo[mejora] = codigo
+
+    return mejor_codigo
+
+# ----------------------------------------------------------
+# Función para Obtener el Árbol de los Prototipos Activos
+# ----------------------------------------------------------
+def _arbol_activo():
+    """
+    Devuelve el árbol KD de PROTOTIPOS, construyéndolo sólo si el conjunto cambió.
+
+    Returns:
+    dict: Árbol de construir_arbol().
+    """
+    global _arbol
+    if _arbol[0] is not PROTOTIPOS:
+        _arbol = (PROTOTIPOS, construir_arbol(PROTOTIPOS))
+    return _arbol[1]
+
+# ----------------------------------------------------------
+# Función para Obtener los Prototipos en el Espacio Activo
+# ----------------------------------------------------------
+def _prototipos_activos():
+    """
+    Devuelve los colores de PROTOTIPOS en ESPACIO_COLOR, convirtiéndolos sólo si algo cambió.
+
+    Returns:
+    tuple: Un color (tupla de tres enteros) por prototipo.
+    """
+    global _prototipos_espacio
+    if _prototipos_espacio[0] is not PROTOTIPOS or _prototipos_espacio[1] != ESPACIO_COLOR:
+        colores = [prototipo for _, prototipo, *_ in PROTOTIPOS]
+        _prototipos_espacio = (PROTOTIPOS, ESPACIO_COLOR, convertir_prototipos(colores, ESPACIO_COLOR))
+    return _prototipos_espacio[2]
+
+# ----------------------------------------------------------
+# Función para Clasificar un Bloque con Cualquier Métrica
+# ----------------------------------------------------------
+def _clasificar_bloque_general(bloque, metrica):
+    """
+    Clasifica un bloque con distancias de punto flotante para cualquier p.
+
+    Args:
+    bloque (ndarray): Arreglo (..., 3) de píxeles RGB.
+    metrica (float): Parámetro de la distancia de Minkowski.
+
+    Returns:
+    ndarray: Códigos de etiqueta (uint8) con la forma del bloque sin el último eje.
+    """
+    inferiores = np.array([inferior for _, _, inferior, _, _ in PROTOTIPOS])
+    superiores = np.array([superior for _, _, _, superior, _ in PROTOTIPOS])
+    # El índice -1 (ningún prototipo válido) toma el último elemento: FONDO
+    codigos = np.array([codigo for *_, codigo in PROTOTIPOS] + [FONDO], dtype=np.uint8)
+
+    def compuertas(pixeles):
+        pixeles = pixeles[:, None, :]
+        return np.all((pixeles > inferiores) & (pixeles < superiores), axis=-1)
+
+    pixeles = bloque.reshape(-1, 3)
+    if ESPACIO_COLOR == "rgb":
+        validos, coordenadas = compuertas, pixeles
+    else:
+        # Las distancias se miden en el espacio convertido: las compuertas RGB se calculan antes
+        validos, coordenadas = compuertas(pixeles), convertir_pixeles(pixeles, ESPACIO_COLOR)
+    indices, _ = prototipo_mas_cercano(
+        coordenadas, _prototipos_activos(), metrica, validos, circular=ESPACIO_COLOR in ESPACIOS_CIRCULARES
+    )
+    return codigos[indices].reshape(bloque.shape[:-1])
+
+# ----------------------------------------------------------
+# Función para Clasificar una Imagen Completa
+# ----------------------------------------------------------
+@instrumentar("clasificar_imagen", pixeles_del_primero)
+def clasificar_imagen(imagen, metrica):
+    """
+    Clasifica todos los píxeles de una imagen en una pasada vectorizada.
+
+    Para p=1, 2 e inf el resultado es idéntico, píxel por píxel, al de
+    comparacion(); para otros valores de p coincide salvo empates que el
+    redondeo de punto flotante resuelva distinto.
+
+    Args:
+    imagen (ndarray): Arreglo HxWx3 con los canales en orden RGB.
+    metrica (float): Parámetro de la distancia de Minkowski.
+
+    Returns:
+    ndarray: Mapa HxW (uint8) de códigos de etiqueta (FONDO, ROJO, VERDE, AMARILLO).
+    """
+    imagen = np.asarray(imagen)
+    if imagen.ndim != 3 or imagen.shape[2] != 3:
+        raise ValueError("La imagen debe tener forma HxWx3.")
+
+    etiquetas = np.empty(imagen.shape[:2], dtype=np.uint8)
+    for inicio in range(0, imagen.shape[0], FILAS_POR_BLOQUE):
+        fin = inicio + FILAS_POR_BLOQUE
+        etiquetas[inicio:fin] = _clasificar_bloque(imagen[inicio:fin], metrica)
+    return etiquetas
+
+# ----------------------------------------------------------
+# Función para Reducir una Imagen a sus Colores Distintos
+# ----------------------------------------------------------
+def colores_unicos(imagen):
+    """
+    Reduce una imagen a sus colores distintos usando una clave RGB empacada en 24 bits.
+
+    Args:
+    imagen (ndarray): Arreglo HxWx3 (uint8).
+
+    Returns:
+    tuple: (colores (U, 3) uint8, inversa (H*W,) con el índice del color de cada
+    píxel, conteos (U,) con los píxeles de cada color).
+    """
+    imagen = np.asarray(imagen, dtype=np.uint8)
+    claves = (
+        (imagen[..., 0].astype(np.uint32) << 16) | (imagen[..., 1].astype(np.uint32) << 8) | imagen[..., 2]
+    )
+    claves, inversa, conteos = np.unique(claves.ravel(), return_inverse=True, return_counts=True)
+    colores = np.stack([(claves >> 16) & 0xFF, (claves >> 8) & 0xFF, claves & 0xFF], axis=-1).astype(np.uint8)
+    return colores, inversa.ravel(), conteos
+
+# ----------------------------------------------------------
+# Función para Clasificar una Imagen por sus Colores Distintos
+# ----------------------------------------------------------
+@instrumentar("clasificar_por_colores", pixeles_del_primero)
+def clasificar_por_colores(imagen, metrica):
+    """
+    Clasifica cada color distinto una sola vez y reparte las etiquetas a los píxeles.
+
+    Las fotos reales tienen muchos menos colores que píxeles, así que con
+    métricas sin tabla precalculada esto ahorra la mayor parte del trabajo.
+    El resultado es el mismo que el de clasificar_imagen().
+
+    Args:
+    imagen (ndarray): Arreglo HxWx3 con los canales en orden RGB.
+    metrica (float): Parámetro de la distancia de Minkowski.
+
+    Returns:
+    tuple: (mapa HxW (uint8) de códigos de etiqueta, histograma con "colores" (U, 3),
+    "conteos" (U,), "etiquetas" (U,) y "proporcion_unicos" (colores distintos / píxeles)).
+    """
+    imagen = np.asarray(imagen)
+    if imagen.ndim != 3 or imagen.shape[2] != 3:
+        raise ValueError("La imagen debe tener forma HxWx3.")
+
+    colores, inversa, conteos = colores_unicos(imagen)
+    etiquetas_colores = np.empty(len(colores), dtype=np.uint8)
+    for inicio in range(0, len(colores), COLORES_POR_BLOQUE):
+        fin = inicio + COLORES_POR_BLOQUE
+        etiquetas_colores[inicio:fin] = _clasificar_bloque(colores[inicio:fin], metrica)
+
+    histograma = {
+        "colores": colores,
+        "conteos": conteos,
+        "etiquetas": etiquetas_colores,
+        "proporcion_unicos": len(colores) / max(1, inversa.size),
+    }
+    return etiquetas_colores[inversa].reshape(imagen.shape[:2]), histograma
+
+# ----------------------------------------------------------
+# Función para Cambiar el Conjunto de Prototipos Activo
+# ----------------------------------------------------------
+def activar_prototipos(prototipos):
+    """
+    Reemplaza los prototipos y compuertas con los que clasifican todas las funciones.
+
+    Las tablas de consulta se reconstruyen solas, porque su huella depende
+    del conjunto activo.
+
+    Args:
+    prototipos (list): Entradas (nombre, prototipo RGB, inferiores, superiores, código).
+    """
+    global PROTOTIPOS
+    PROTOTIPOS = tuple(
+        (str(nombre), tuple(int(v) for v in rgb), tuple(int(v) for v in inferior),
+         tuple(int(v) for v in superior), int(codigo))
+        for nombre, rgb, inferior, superior, codigo in prototipos
+    )
+
+# ----------------------------------------------------------
+# Función para Cambiar el Espacio de Color
+# ----------------------------------------------------------
+def activar_espacio(espacio):
+    """
+    Cambia el espacio de color donde se miden las distancias a los prototipos.
+
+    Las tablas de consulta y la caché de resultados se separan por espacio,
+    porque su huella lo incluye.
+
+    Args:
+    espacio (str): "rgb", "lab" o "hsv".
+    """
+    global ESPACIO_COLOR
+    if espacio not in ESPACIOS:
+        raise ValueError(f"Espacio de color desconocido: {espacio}")
+    ESPACIO_COLOR = espacio
+
+# ----------------------------------------------------------
+# Función para Convertir un Código en el Texto de comparacion()
+# ----------------------------------------------------------
+def texto_etiqueta(codigo):
+    """
+    Devuelve el mensaje y el color de fuente que produciría comparacion().
+
+    Args:
+    codigo (int): Código de etiqueta.
+
+    Returns:
+    tuple: Mensaje indicando el color y el color de la fuente para la presentación.
+    """
+    return ETIQUETAS[int(codigo)]
+
+# ----------------------------------------------------------
+# Función para Leer una Métrica desde Texto
+# ----------------------------------------------------------
+def metrica_desde_texto(texto):
+    """
+    Convierte el parámetro p escrito en la línea de comandos ("1", "1.5", "inf").
+
+    Args:
+    texto (str): Valor de p.
+
+    Returns:
+    float: Parámetro de la distancia de Minkowski (int si es entero).
+    """
+    metrica = float(texto)
+    if not metrica > 0:
+        raise ValueError("El parámetro p de Minkowski debe ser positivo.")
+    return int(metrica) if metrica.is_integer() else metrica
@@ -0,0 +1,162 @@
+# ----------------------------------------------------------
+# Motor de Distancias de Minkowski por Lotes
+# ----------------------------------------------------------
+# Calcula la matriz (N píxeles x K prototipos) de distancias de Minkowski
+# para cualquier p, por bloques de píxeles para acotar la memoria. Cada
+# bloque se convierte a punto flotante por separado, así una imagen uint8
+# nunca se copia completa a float64.
+# ----------------------------------------------------------
+
+# ----------------------------------------------------------
+# Importación de Bibliotecas
+# ----------------------------------------------------------
+import numpy as np  # Biblioteca para trabajar con arreglos y operaciones matemáticas
+
+# ----------------------------------------------------------
+# Variables Globales
+# ----------------------------------------------------------
+MEMORIA_POR_BLOQUE = 32 * 1024 * 1024  # Bytes de memoria intermedia por bloque
+PERIODO_CIRCULAR = 256  # Pasos de un canal circular (el tono de HSV en 8 bits da la vuelta en 256)
+
+# ----------------------------------------------------------
+# Función para Calcular Distancias Comparables a un Prototipo
+# ----------------------------------------------------------
+def distancia_ordenable(pixeles, prototipo, metrica, circular=False):
+    """
+    Calcula una distancia que ordena igual que minkowski_distance().
+
+    Para p=1 y p=inf la distancia es entera y exacta. Para p=2 se devuelve el
+    cuadrado de la distancia (entero), que conserva el orden y los empates sin
+    errores de redondeo.
+
+    Args:
+    pixeles (ndarray): Arreglo (..., 3) de enteros con los píxeles.
+    prototipo (tuple): Color del prototipo, en el mismo espacio que los píxeles.
+    metrica (float): Parámetro de la distancia de Minkowski (1, 2 o inf).
+    circular (bool): Si el primer canal es un ángulo que da la vuelta en PERIODO_CIRCULAR.
+
+    Returns:
+    ndarray: Distancias con la forma de los píxeles sin el último eje.
+    """
+    diferencias = pixeles - np.asarray(prototipo, dtype=pixeles.dtype)
+    if circular:
+        mitad = PERIODO_CIRCULAR // 2
+        diferencias[..., 0] = (diferencias[..., 0] + mitad) % PERIODO_CIRCULAR - mitad
+    if metrica == 1:
+        return np.abs(diferencias).sum(axis=-1)
+    if metrica == 2:
+        return (diferencias * diferencias).sum(axis=-1)
+    if metrica == float('inf'):
+        return np.abs(diferencias).max(axis=-1)
+    raise ValueError("La métrica debe ser 1, 2 o inf.")
+
+# ----------------------------------------------------------
+# Función para Calcular las Distancias de un Bloque
+# ----------------------------------------------------------
+def _distancias_bloque(bloque, prototipos, p, circular=False):
+    """
+    Calcula las distancias de un bloque de píxeles a todos los prototipos.
+
+    Args:
+    bloque (ndarray): Arreglo (B, C) de píxeles en punto flotante.
+    prototipos (ndarray): Arreglo (K, C) de prototipos en punto flotante.
+    p (float): Parámetro de la distancia de Minkowski.
+    circular (bool): Si el primer canal es un ángulo que da la vuelta en PERIODO_CIRCULAR.
+
+    Returns:
+    ndarray: Matriz (B, K) de distancias.
+    """
+    diferencias = np.abs(bloque[:, None, :] - prototipos[None, :, :])
+    if circular:
+        np.minimum(diferencias[..., 0], PERIODO_CIRCULAR - diferencias[..., 0], out=diferencias[..., 0])
+    if p == 1:
+        return diferencias.sum(axis=-1)
+    if p == 2:
+        return np.sqrt(np.einsum("bkc,bkc->bk", diferencias, diferencias))
+    if p == float('inf'):
+        return diferencias.max(axis=-1)
+    np.power(diferencias, p, out=diferencias)
+    return np.power(diferencias.sum(axis=-1), 1 / p)
+
+# ----------------------------------------------------------
+# Función para Calcular la Matriz de Distancias
+# ----------------------------------------------------------
+def distancias_minkowski(pixeles, prototipos, p, salida=None, tipo=np.float64, circular=False):
+    """
+    Calcula la matriz de distancias de Minkowski entre píxeles y prototipos.
+
+    Coincide con minkowski_distance() dentro de la tolerancia del punto flotante.
+
+    Args:
+    pixeles (ndarray): Arreglo (N, C) o (..., C) de píxeles (uint8, enteros o flotantes).
+    prototipos (array-like): Arreglo (K, C) de prototipos.
+    p (float): Parámetro de la distancia de Minkowski (p > 0, o inf).
+    salida (ndarray): Matriz (N, K) opcional donde escribir el resultado.
+    tipo (dtype): Tipo de punto flotante de los cálculos (float64 o float32).
+    circular (bool): Si el primer canal es un ángulo que da la vuelta en PERIODO_CIRCULAR.
+
+    Returns:
+    ndarray: Matriz (N, K) de distancias.
+    """
+    if not p > 0:
+        raise ValueError("El parámetro p de Minkowski debe ser positivo.")
+    prototipos = np.asarray(prototipos, dtype=tipo)
+    if prototipos.ndim != 2:
+        raise ValueError("Los prototipos deben tener forma (K, C).")
+    pixeles = np.asarray(pixeles).reshape(-1, prototipos.shape[1])
+
+    numero, canales = pixeles.shape
+    prototipos_k = prototipos.shape[0]
+    if salida is None:
+        salida = np.empty((numero, prototipos_k), dtype=tipo)
+
+    # Tamaño del bloque según la memoria de las diferencias (B x K x C)
+    bytes_por_pixel = prototipos_k * canales * np.dtype(tipo).itemsize
+    tamano_bloque = max(1, MEMORIA_POR_BLOQUE // bytes_por_pixel)
+    for inicio in range(0, numero, tamano_bloque):
+        fin = inicio + tamano_bloque
+        salida[inicio:fin] = _distancias_bloque(pixeles[inicio:fin].astype(tipo), prototipos, p, circular)
+    return salida
+
+# ----------------------------------------------------------
+# Función para Encontrar el Prototipo más Cercano
+# ----------------------------------------------------------
+def prototipo_mas_cercano(pixeles, prototipos, p, validos=None, tipo=np.float64, circular=False):
+    """
+    Devuelve el índice del prototipo más cercano a cada píxel, sin guardar la matriz completa.
+
+    Args:
+    pixeles (ndarray): Arreglo (N, C) de píxeles.
+    prototipos (array-like): Arreglo (K, C) de prototipos.
+    p (float): Parámetro de la distancia de Minkowski.
+    validos (callable or ndarray): Función opcional bloque -> máscara (B, K) de prototipos
+        permitidos para cada píxel (por ejemplo, las compuertas de color), o la
+        máscara (N, K) ya calculada.
+    tipo (dtype): Tipo de punto flotante de los cálculos.
+    circular (bool): Si el primer canal es un ángulo que da la vuelta en PERIODO_CIRCULAR.
+
+    Returns:
+    tuple: (índices (N,) int64, con -1 si ningún prototipo es válido; distancias (N,)).
+    """
+    prototipos = np.asarray(prototipos, dtype=tipo)
+    pixeles = np.asarray(pixeles).reshape(-1, prototipos.shape[1])
+    numero = pixeles.shape[0]
+    indices = np.empty(numero, dtype=np.int64)
+    minimas = np.empty(numero, dtype=tipo)
+
+    bytes_por_pixel = prototipos.shape[0] * prototipos.shape[1] * np.dtype(tipo).itemsize
+    tamano_bloque = max(1, MEMORIA_POR_BLOQUE // bytes_por_pixel)
+    for inicio in range(0, numero, tamano_bloque):
+        fin = inicio + tamano_bloque
+        bloque = pixeles[inicio:fin]
+        distancias = _distancias_bloque(bloque.astype(tipo), prototipos, p, circular)
+        if callable(validos):
+            distancias[~validos(bloque)] = np.inf
+        elif validos is not None:
+            distancias[~validos[inicio:fin]] = np.inf
+        # argmin devuelve el primer mínimo: en empates gana el primer prototipo
+        mejor = np.argmin(distancias, axis=1)
+        minimas[inicio:fin] = distancias[np.arange(len(mejor)), mejor]
+        mejor[np.isinf(minimas[inicio:fin])] = -1
+        indices[inicio:fin] = mejor
+    return indices, minimas
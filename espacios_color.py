@@ -0,0 +1,83 @@
+# ----------------------------------------------------------
+# Espacios de Color para la Decisión del Prototipo más Cercano
+# ----------------------------------------------------------
+# En RGB un cambio de iluminación mueve los tres canales a la vez; en Lab
+# la luminosidad queda en un canal y el color en los otros dos, y en HSV el
+# tono casi no cambia con la luz. Los píxeles y los prototipos se convierten
+# con la misma función de OpenCV (de a bloques completos), las distancias de
+# Minkowski se miden en el espacio elegido y las compuertas siguen en RGB.
+# Los valores convertidos son de 8 bits, así las distancias con p=1, 2 e inf
+# siguen siendo enteras y exactas.
+# ----------------------------------------------------------
+
+# ----------------------------------------------------------
+# Importación de Bibliotecas
+# ----------------------------------------------------------
+import numpy as np  # Biblioteca para trabajar con arreglos y operaciones matemáticas
+
+# ----------------------------------------------------------
+# Variables Globales
+# ----------------------------------------------------------
+# Espacio -> nombre de la conversión de OpenCV desde RGB (None: sin conversión).
+# HSV_FULL lleva el tono a 0-255 en lugar de 0-179, así da la vuelta en 256.
+ESPACIOS = {"rgb": None, "lab": "COLOR_RGB2Lab", "hsv": "COLOR_RGB2HSV_FULL"}
+ESPACIOS_CIRCULARES = ("hsv",)  # Espacios cuyo primer canal es un ángulo
+
+# ----------------------------------------------------------
+# Función para Validar un Espacio de Color
+# ----------------------------------------------------------
+def espacio_desde_texto(texto):
+    """
+    Valida el nombre de un espacio de color escrito en la línea de comandos.
+
+    Args:
+    texto (str): Nombre del espacio ("rgb", "lab" o "hsv", sin distinguir mayúsculas).
+
+    Returns:
+    str: Nombre del espacio en minúsculas.
+    """
+    espacio = texto.strip().lower()
+    if espacio not in ESPACIOS:
+        raise ValueError(f"Espacio de color desconocido: {texto} (se admite {', '.join(ESPACIOS)}).")
+    return espacio
+
+# ----------------------------------------------------------
+# Función para Convertir Píxeles a un Espacio de Color
+# ----------------------------------------------------------
+def convertir_pixeles(pixeles, espacio):
+    """
+    Convierte un arreglo de píxeles RGB al espacio indicado en una sola llamada.
+
+    Args:
+    pixeles (ndarray): Arreglo (..., 3) (uint8) en orden RGB.
+    espacio (str): Nombre del espacio de destino.
+
+    Returns:
+    ndarray: Arreglo (..., 3) (uint8) en el espacio de destino; en "rgb", el mismo arreglo.
+    """
+    if ESPACIOS[espacio] is None:
+        return pixeles
+    # OpenCV se importa aquí para no pagar su carga cuando se clasifica en RGB
+    import cv2
+
+    pixeles = np.ascontiguousarray(pixeles, dtype=np.uint8)
+    # Vista (N, 1, 3): cvtColor recorre cualquier forma de una sola vez
+    convertidos = cv2.cvtColor(pixeles.reshape(-1, 1, 3), getattr(cv2, ESPACIOS[espacio]))
+    return convertidos.reshape(pixeles.shape)
+
+# ----------------------------------------------------------
+# Función para Convertir los Prototipos
+# ----------------------------------------------------------
+def convertir_prototipos(colores, espacio):
+    """
+    Convierte los colores RGB de los prototipos con la misma función que los píxeles.
+
+    Args:
+    colores (list): Colores RGB de los prototipos.
+    espacio (str): Nombre del espacio de destino.
+
+    Returns:
+    tuple: Un color (tupla de tres enteros) por prototipo, en el espacio de destino.
+    """
+    convertidos = convertir_pixeles(np.array(colores, dtype=np.uint8).reshape(-1, 3), espacio)
+    return tuple(tuple(int(valor) for valor in color) for color in convertidos)
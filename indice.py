@@ -0,0 +1,219 @@
+# ----------------------------------------------------------
+# Índice de Sesiones Guardadas
+# ----------------------------------------------------------
+# Un archivo SQLite en el directorio de datos relaciona cada sesión guardada
+# con la huella del contenido de su imagen y con el nombre de la imagen, así
+# la sesión más reciente se encuentra con una consulta en lugar de listar y
+# revisar todo el directorio. Si el directorio cambia por fuera (archivos
+# copiados o borrados a mano), el índice se reconstruye una sola vez.
+# ----------------------------------------------------------
+
+# ----------------------------------------------------------
+# Importación de Bibliotecas
+# ----------------------------------------------------------
+import fnmatch  # Módulo para realizar coincidencias de patrones en nombres de archivos
+import hashlib  # Módulo para calcular la huella del contenido de las imágenes
+import os  # Módulo para interactuar con el sistema operativo
+import sqlite3  # Base de datos del índice
+
+# ----------------------------------------------------------
+# Variables Globales
+# ----------------------------------------------------------
+# Directorio de las sesiones (configurable con MANZANAS_DATOS; por omisión el directorio actual)
+DIRECTORIO_DATOS = os.environ.get("MANZANAS_DATOS", ".")
+NOMBRE_INDICE = "indice_sesiones.sqlite"
+PATRONES_SESION = ("datos_*.etq", "datos_*.json")
+TAMANO_LECTURA = 1 << 20  # Bytes leídos a la vez al calcular la huella
+
+# ----------------------------------------------------------
+# Función para Calcular la Huella de una Imagen
+# ----------------------------------------------------------
+def huella_imagen(ruta):
+    """
+    Calcula la huella del contenido de un archivo de imagen.
+
+    Args:
+    ruta (str): Ruta de la imagen.
+
+    Returns:
+    str: Huella hexadecimal (BLAKE2b de 128 bits).
+    """
+    huella = hashlib.blake2b(digest_size=16)
+    with open(ruta, "rb") as archivo:
+        for bloque in iter(lambda: archivo.read(TAMANO_LECTURA), b""):
+            huella.update(bloque)
+    return huella.hexdigest()
+
+# ----------------------------------------------------------
+# Función para Obtener el Nombre Base de una Sesión
+# ----------------------------------------------------------
+def nombre_base_sesion(archivo):
+    """
+    Extrae el nombre de la imagen de un archivo datos_<nombre>[_<fecha>].<ext>.
+
+    Args:
+    archivo (str): Nombre del archivo de la sesión.
+
+    Returns:
+    str: Nombre base de la imagen.
+    """
+    nombre, _ = os.path.splitext(archivo)
+    nombre = nombre[len("datos_"):]
+    base, separador, fecha = nombre.rpartition("_")
+    return base if separador and fecha.isdigit() else nombre
+
+# ----------------------------------------------------------
+# Función para Abrir el Índice
+# ----------------------------------------------------------
+def _conectar(directorio):
+    """
+    Abre (y crea si hace falta) el índice de un directorio de datos.
+
+    Args:
+    directorio (str): Directorio de datos.
+
+    Returns:
+    sqlite3.Connection: Conexión al índice.
+    """
+    conexion = sqlite3.connect(os.path.join(directorio, NOMBRE_INDICE))
+    # Un diario persistente no crea ni borra archivos en cada transacción,
+    # así las escrituras del índice no cambian la fecha del directorio
+    conexion.executescript("""
+        PRAGMA journal_mode = PERSIST;
+        CREATE TABLE IF NOT EXISTS sesiones (
+            archivo TEXT PRIMARY KEY,
+            nombre_base TEXT NOT NULL,
+            huella TEXT,
+            creado REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS sesiones_huella ON sesiones (huella, creado);
+        CREATE INDEX IF NOT EXISTS sesiones_nombre ON sesiones (nombre_base, creado);
+        CREATE TABLE IF NOT EXISTS meta (clave TEXT PRIMARY KEY, valor TEXT);
+    """)
+    return conexion
+
+# ----------------------------------------------------------
+# Función para Recordar el Estado del Directorio
+# ----------------------------------------------------------
+def _marcar_sincronizado(conexion, directorio):
+    """
+    Guarda la fecha de modificación actual del directorio en el índice.
+
+    Args:
+    conexion (sqlite3.Connection): Conexión al índice.
+    directorio (str): Directorio de datos.
+    """
+    conexion.execute(
+        "INSERT OR REPLACE INTO meta (clave, valor) VALUES ('mtime', ?)",
+        (str(os.stat(directorio).st_mtime_ns),),
+    )
+
+# ----------------------------------------------------------
+# Función para Sincronizar el Índice con el Directorio
+# ----------------------------------------------------------
+def sincronizar(conexion, directorio):
+    """
+    Reconstruye el índice sólo si el directorio cambió desde la última vez.
+
+    Comprobarlo cuesta una llamada a stat(); el recorrido completo sólo ocurre
+    cuando se agregaron o borraron archivos sin pasar por registrar_sesion().
+
+    Args:
+    conexion (sqlite3.Connection): Conexión al índice.
+    directorio (str): Directorio de datos.
+    """
+    fila = conexion.execute("SELECT valor FROM meta WHERE clave = 'mtime'").fetchone()
+    if fila and fila[0] == str(os.stat(directorio).st_mtime_ns):
+        return
+
+    presentes = {}
+    with os.scandir(directorio) as entradas:
+        for entrada in entradas:
+            if any(fnmatch.fnmatch(entrada.name, patron) for patron in PATRONES_SESION):
+                presentes[entrada.name] = entrada.stat().st_mtime
+
+    conocidos = {archivo for (archivo,) in conexion.execute("SELECT archivo FROM sesiones")}
+    conexion.executemany(
+        "DELETE FROM sesiones WHERE archivo = ?", [(archivo,) for archivo in conocidos - presentes.keys()]
+    )
+    # Los archivos nuevos sólo se conocen por nombre; su huella se desconoce
+    conexion.executemany(
+        "INSERT INTO sesiones (archivo, nombre_base, huella, creado) VALUES (?, ?, NULL, ?)",
+        [(archivo, nombre_base_sesion(archivo), presentes[archivo]) for archivo in presentes.keys() - conocidos],
+    )
+    _marcar_sincronizado(conexion, directorio)
+    conexion.commit()
+
+# ----------------------------------------------------------
+# Función para Registrar una Sesión Guardada
+# ----------------------------------------------------------
+def registrar_sesion(ruta_sesion, ruta_imagen, huella=None):
+    """
+    Agrega una sesión recién guardada al índice de su directorio.
+
+    Args:
+    ruta_sesion (str): Ruta del archivo de la sesión.
+    ruta_imagen (str): Ruta de la imagen de la sesión.
+    huella (str): Huella de la imagen, si ya se calculó.
+    """
+    directorio = os.path.dirname(ruta_sesion) or "."
+    archivo = os.path.basename(ruta_sesion)
+    nombre_base, _ = os.path.splitext(os.path.basename(ruta_imagen))
+
+    conexion = _conectar(directorio)
+    try:
+        conexion.execute(
+            "INSERT OR REPLACE INTO sesiones (archivo, nombre_base, huella, creado) VALUES (?, ?, ?, ?)",
+            (archivo, nombre_base, huella or huella_imagen(ruta_imagen), os.path.getmtime(ruta_sesion)),
+        )
+        # El propio guardado cambió la fecha del directorio; se marca como
+        # sincronizado para no recorrerlo en la siguiente búsqueda
+        _marcar_sincronizado(conexion, directorio)
+        conexion.commit()
+    finally:
+        conexion.close()
+
+# ----------------------------------------------------------
+# Función para Buscar la Sesión más Reciente de una Imagen
+# ----------------------------------------------------------
+def buscar_sesion(ruta_imagen, directorio=None, huella=None):
+    """
+    Devuelve la sesión más reciente de una imagen.
+
+    Primero se busca por la huella del contenido; si no hay ninguna, por el
+    nombre de la imagen entre las sesiones de huella desconocida (las que se
+    copiaron al directorio a mano o guardaron versiones anteriores).
+
+    Args:
+    ruta_imagen (str): Ruta de la imagen.
+    directorio (str): Directorio de datos; por omisión DIRECTORIO_DATOS.
+    huella (str): Huella de la imagen, si ya se calculó.
+
+    Returns:
+    str or None: Ruta del archivo de la sesión, o None si no hay ninguna.
+    """
+    directorio = directorio or DIRECTORIO_DATOS
+    if not os.path.isdir(directorio):
+        return None
+    nombre_base, _ = os.path.splitext(os.path.basename(ruta_imagen))
+
+    conexion = _conectar(directorio)
+    try:
+        sincronizar(conexion, directorio)
+        consultas = (
+            ("SELECT archivo FROM sesiones WHERE huella = ? ORDER BY creado DESC LIMIT 1",
+             huella or huella_imagen(ruta_imagen)),
+            ("SELECT archivo FROM sesiones WHERE nombre_base = ? AND huella IS NULL ORDER BY creado DESC LIMIT 1",
+             nombre_base),
+        )
+        for consulta, valor in consultas:
+            while (fila := conexion.execute(consulta, (valor,)).fetchone()) is not None:
+                ruta_sesion = os.path.join(directorio, fila[0])
+                if os.path.exists(ruta_sesion):
+                    return ruta_sesion
+                # La sesión se borró entre dos sincronizaciones: se olvida y se prueba la siguiente
+                conexion.execute("DELETE FROM sesiones WHERE archivo = ?", fila)
+                conexion.commit()
+        return None
+    finally:
+        conexion.close()
@@ -0,0 +1,323 @@
+# ----------------------------------------------------------
+# Instrumentación de las Etapas del Proceso
+# ----------------------------------------------------------
+# Contadores e histogramas de latencia y de píxeles procesados por etapa
+# (carga de imagen, clasificación, detectar_forma(), corrección por vecinos
+# y persistencia), con un perfil de cProfile opcional. Se activa con
+# variables de entorno y se vuelca al salir en JSON o en el formato de texto
+# de Prometheus:
+#
+#   MANZANAS_METRICAS=metricas.prom python lote.py fotos/
+#   MANZANAS_METRICAS=metricas.json MANZANAS_PERFIL=perfil.prof python V11.py
+#
+# Si la instrumentación no está activa al importar los módulos, las funciones
+# quedan sin envolver y no cuesta nada.
+# ----------------------------------------------------------
+
+# ----------------------------------------------------------
+# Importación de Bibliotecas
+# ----------------------------------------------------------
+import atexit  # Volcado automático al terminar el programa
+import bisect  # Búsqueda del intervalo de cada histograma
+import cProfile  # Perfil opcional de las llamadas
+import functools  # Conservar el nombre de las funciones instrumentadas
+import json  # Módulo para trabajar con archivos JSON
+import os  # Módulo para interactuar con el sistema operativo
+import threading  # Candado para registrar desde varios hilos
+import time  # Módulo para medir tiempos
+
+# ----------------------------------------------------------
+# Variables Globales
+# ----------------------------------------------------------
+LIMITES_LATENCIA = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0)  # Segundos
+LIMITES_PIXELES = (1, 10, 100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000, 100_000_000)
+activa = False  # Si las funciones instrumentadas registran sus llamadas
+estadisticas = {}  # Etapa -> contadores e histogramas
+candado = threading.Lock()
+perfil = None  # cProfile.Profile en curso, si se pidió
+destinos = {}  # "metricas" y "perfil": rutas donde se vuelca al salir
+
+# ----------------------------------------------------------
+# Función para Crear las Estadísticas de una Etapa
+# ----------------------------------------------------------
+def _nueva_etapa():
+    """
+    Crea los contadores vacíos de una etapa.
+
+    Los histogramas guardan el conteo de cada intervalo (no acumulado); la
+    última casilla es el intervalo abierto hasta +Inf.
+
+    Returns:
+    dict: Contadores e histogramas en cero.
+    """
+    return {
+        "llamadas": 0,
+        "errores": 0,
+        "segundos": 0.0,
+        "pixeles": 0,
+        "latencia": [0] * (len(LIMITES_LATENCIA) + 1),
+        "tamano": [0] * (len(LIMITES_PIXELES) + 1),
+    }
+
+# ----------------------------------------------------------
+# Función para Registrar una Llamada
+# ----------------------------------------------------------
+def registrar(etapa, segundos, pixeles=None, error=False):
+    """
+    Suma una llamada a las estadísticas de una etapa.
+
+    Args:
+    etapa (str): Nombre de la etapa.
+    segundos (float): Duración de la llamada.
+    pixeles (int): Píxeles procesados, si se conocen.
+    error (bool): Si la llamada terminó con una excepción.
+    """
+    with candado:
+        datos = estadisticas.get(etapa)
+        if datos is None:
+            datos = estadisticas[etapa] = _nueva_etapa()
+        datos["llamadas"] += 1
+        datos["errores"] += bool(error)
+        datos["segundos"] += segundos
+        datos["latencia"][bisect.bisect_left(LIMITES_LATENCIA, segundos)] += 1
+        if pixeles is not None:
+            datos["pixeles"] += int(pixeles)
+            datos["tamano"][bisect.bisect_left(LIMITES_PIXELES, pixeles)] += 1
+
+# ----------------------------------------------------------
+# Funciones para Contar los Píxeles de los Argumentos
+# ----------------------------------------------------------
+def pixeles_del_primero(arreglo, *_, **__):
+    """Píxeles (alto x ancho) del primer argumento, un arreglo de imagen."""
+    return arreglo.shape[0] * arreglo.shape[1]
+
+def pixeles_del_segundo(_, arreglo, *__, **___):
+    """Píxeles (alto x ancho) del segundo argumento, un arreglo de imagen."""
+    return arreglo.shape[0] * arreglo.shape[1]
+
+def un_pixel(*_, **__):
+    """Etapas que procesan un solo píxel por llamada."""
+    return 1
+
+# ----------------------------------------------------------
+# Decorador para Instrumentar una Etapa
+# ----------------------------------------------------------
+def instrumentar(etapa, pixeles=None):
+    """
+    Mide la duración y los píxeles de cada llamada a una función.
+
+    Las funciones sólo se envuelven si la instrumentación ya está activa al
+    decorarlas (al importar el módulo), así desactivada no agrega ni una llamada.
+
+    Args:
+    etapa (str): Nombre de la etapa en los volcados.
+    pixeles (callable): Función opcional que recibe los mismos argumentos y
+        devuelve los píxeles procesados.
+
+    Returns:
+    callable: Decorador.
+    """
+    def decorador(funcion):
+        if not activa:
+            return funcion
+
+        @functools.wraps(funcion)
+        def envoltura(*args, **kwargs):
+            if not activa:
+                return funcion(*args, **kwargs)
+            inicio = time.perf_counter()
+            try:
+                resultado = funcion(*args, **kwargs)
+            except Exception:
+                registrar(etapa, time.perf_counter() - inicio, error=True)
+                raise
+            registrar(etapa, time.perf_counter() - inicio, pixeles(*args, **kwargs) if pixeles else None)
+            return resultado
+        return envoltura
+    return decorador
+
+# ----------------------------------------------------------
+# Funciones para Combinar Estadísticas entre Procesos
+# ----------------------------------------------------------
+def instantanea(reiniciar=False):
+    """
+    Copia las estadísticas actuales, por ejemplo para enviarlas al proceso principal.
+
+    Args:
+    reiniciar (bool): Vaciar las estadísticas después de copiarlas.
+
+    Returns:
+    dict: Etapa -> contadores e histogramas.
+    """
+    with candado:
+        copia = {etapa: {clave: list(valor) if isinstance(valor, list) else valor for clave, valor in datos.items()}
+                 for etapa, datos in estadisticas.items()}
+        if reiniciar:
+            estadisticas.clear()
+    return copia
+
+def combinar(otras):
+    """
+    Suma a las estadísticas locales las de otro proceso.
+
+    Args:
+    otras (dict): Resultado de instantanea() en otro proceso.
+    """
+    with candado:
+        for etapa, datos in (otras or {}).items():
+            propios = estadisticas.setdefault(etapa, _nueva_etapa())
+            for clave, valor in datos.items():
+                if isinstance(valor, list):
+                    propios[clave] = [a + b for a, b in zip(propios[clave], valor)]
+                else:
+                    propios[clave] += valor
+
+def reiniciar():
+    """Vacía las estadísticas (un proceso hijo no debe contar las heredadas del padre)."""
+    with candado:
+        estadisticas.clear()
+
+# ----------------------------------------------------------
+# Funciones para Dar Formato a las Estadísticas
+# ----------------------------------------------------------
+def _acumulado(conteos, limites):
+    """
+    Convierte los conteos por intervalo en pares (límite, conteo acumulado).
+
+    Args:
+    conteos (list): Conteo de cada intervalo, con +Inf al final.
+    limites (tuple): Límites superiores de los intervalos.
+
+    Returns:
+    list: Pares (texto del límite, conteo acumulado).
+    """
+    total, pares = 0, []
+    for limite, conteo in zip(list(limites) + ["+Inf"], conteos):
+        total += conteo
+        pares.append((str(limite), total))
+    return pares
+
+def a_json(datos=None):
+    """
+    Da formato JSON a las estadísticas.
+
+    Args:
+    datos (dict): Estadísticas; por omisión las actuales.
+
+    Returns:
+    str: Documento JSON.
+    """
+    datos = instantanea() if datos is None else datos
+    etapas = {}
+    for etapa, valores in sorted(datos.items()):
+        etapas[etapa] = {
+            "llamadas": valores["llamadas"],
+            "errores": valores["errores"],
+            "segundos": round(valores["segundos"], 6),
+            "pixeles": valores["pixeles"],
+            "pixeles_por_segundo": (
+                round(valores["pixeles"] / valores["segundos"], 1) if valores["pixeles"] and valores["segundos"] > 0 else None
+            ),
+            "latencia_segundos": dict(_acumulado(valores["latencia"], LIMITES_LATENCIA)),
+            "pixeles_por_llamada": dict(_acumulado(valores["tamano"], LIMITES_PIXELES)),
+        }
+    return json.dumps({"pid": os.getpid(), "etapas": etapas}, indent=2, ensure_ascii=False)
+
+def a_prometheus(datos=None):
+    """
+    Da el formato de texto de Prometheus a las estadísticas.
+
+    Args:
+    datos (dict): Estadísticas; por omisión las actuales.
+
+    Returns:
+    str: Métricas en formato de exposición de texto.
+    """
+    datos = instantanea() if datos is None else datos
+    lineas = []
+    for nombre, tipo, ayuda, clave in (
+        ("manzanas_etapa_llamadas_total", "counter", "Llamadas por etapa.", "llamadas"),
+        ("manzanas_etapa_errores_total", "counter", "Llamadas que terminaron con una excepción.", "errores"),
+        ("manzanas_etapa_pixeles_total", "counter", "Píxeles procesados por etapa.", "pixeles"),
+    ):
+        lineas += [f"# HELP {nombre} {ayuda}", f"# TYPE {nombre} {tipo}"]
+        lineas += [f'{nombre}{{etapa="{etapa}"}} {valores[clave]}' for etapa, valores in sorted(datos.items())]
+
+    for nombre, ayuda, clave, limites, suma in (
+        ("manzanas_etapa_segundos", "Latencia de cada llamada.", "latencia", LIMITES_LATENCIA, "segundos"),
+        ("manzanas_etapa_pixeles_por_llamada", "Píxeles procesados en cada llamada.", "tamano", LIMITES_PIXELES, "pixeles"),
+    ):
+        lineas += [f"# HELP {nombre} {ayuda}", f"# TYPE {nombre} histogram"]
+        for etapa, valores in sorted(datos.items()):
+            pares = _acumulado(valores[clave], limites)
+            lineas += [f'{nombre}_bucket{{etapa="{etapa}",le="{limite}"}} {conteo}' for limite, conteo in pares]
+            lineas.append(f'{nombre}_sum{{etapa="{etapa}"}} {valores[suma]}')
+            lineas.append(f'{nombre}_count{{etapa="{etapa}"}} {pares[-1][1]}')
+    return "\n".join(lineas) + "\n"
+
+# ----------------------------------------------------------
+# Función para Volcar las Estadísticas a un Archivo
+# ----------------------------------------------------------
+def volcar(ruta=None, ruta_perfil=None):
+    """
+    Escribe las estadísticas (JSON si la ruta termina en .json; si no, Prometheus) y el perfil.
+
+    Args:
+    ruta (str): Archivo de métricas; por omisión el de MANZANAS_METRICAS.
+    ruta_perfil (str): Archivo del perfil de cProfile; por omisión el de MANZANAS_PERFIL.
+    """
+    ruta = ruta or destinos.get("metricas")
+    if ruta:
+        contenido = a_json() if ruta.lower().endswith(".json") else a_prometheus()
+        ruta_temporal = f"{ruta}.{os.getpid()}.tmp"
+        with open(ruta_temporal, "w", encoding="utf-8") as archivo:
+            archivo.write(contenido)
+        os.replace(ruta_temporal, ruta)
+
+    ruta_perfil = ruta_perfil or destinos.get("perfil")
+    if perfil is not None and ruta_perfil:
+        perfil.dump_stats(ruta_perfil)
+
+# ----------------------------------------------------------
+# Función para Activar la Instrumentación
+# ----------------------------------------------------------
+def activar(ruta=None, ruta_perfil=None):
+    """
+    Empieza a registrar las etapas y, opcionalmente, a perfilar con cProfile.
+
+    Debe llamarse antes de importar los módulos instrumentados (la variable
+    MANZANAS_METRICAS lo hace al importar este módulo). El perfil cubre el
+    hilo que llama a esta función; los procesos de trabajo sólo envían sus
+    contadores (ver instantanea() y combinar()).
+
+    Args:
+    ruta (str): Archivo donde volcar las métricas al salir, o None.
+    ruta_perfil (str): Archivo donde volcar el perfil al salir, o None para no perfilar.
+    """
+    global activa, perfil
+    activa = True
+    if ruta:
+        destinos["metricas"] = ruta
+    if ruta_perfil and perfil is None:
+        destinos["perfil"] = ruta_perfil
+        perfil = cProfile.Profile()
+        perfil.enable()
+    if not destinos.get("registrado"):
+        destinos["registrado"] = True
+        atexit.register(volcar)
+
+def desactivar():
+    """Deja de registrar, detiene el perfil y lo vuelca; un activar() posterior empieza uno nuevo."""
+    global activa, perfil
+    activa = False
+    if perfil is not None:
+        perfil.disable()
+        # Lo ya medido se conserva en su archivo antes de soltar el perfil
+        ruta_perfil = destinos.pop("perfil", None)
+        if ruta_perfil:
+            perfil.dump_stats(ruta_perfil)
+        perfil = None
+
+# Activación desde el entorno, para medir cualquier programa sin modificarlo
+if os.environ.get("MANZANAS_METRICAS") or os.environ.get("MANZANAS_PERFIL"):
+    activar(os.environ.get("MANZANAS_METRICAS"), os.environ.get("MANZANAS_PERFIL"))
@@ -0,0 +1,266 @@
+# ----------------------------------------------------------
+# Clasificación por Lotes sin Interfaz Gráfica
+# ----------------------------------------------------------
+# Recorre directorios o patrones de imágenes, clasifica cada píxel con las
+# tablas precalculadas y detecta la forma con detectar_forma(), repartiendo
+# el trabajo en un grupo de procesos. Escribe un archivo JSON por imagen que
+# repite su ruta relativa bajo --salida (fotos/a/x.jpg -> resultados/a/x.jpg.json).
+#
+# Uso:
+#   python lote.py fotos/ "otras/*.jpg" --salida resultados --metrica 2
+# ----------------------------------------------------------
+
+# ----------------------------------------------------------
+# Importación de Bibliotecas
+# ----------------------------------------------------------
+import argparse  # Módulo para leer los argumentos de la línea de comandos
+import glob  # Módulo para expandir patrones de rutas
+import json  # Módulo para trabajar con archivos JSON
+import os  # Módulo para interactuar con el sistema operativo
+import time  # Módulo para medir el rendimiento
+from concurrent.futures import ProcessPoolExecutor  # Grupo de procesos para repartir las imágenes
+
+import cv2  # OpenCV, una biblioteca de visión por computadora
+import numpy as np  # Biblioteca para trabajar con arreglos y operaciones matemáticas
+
+import instrumentacion  # Métricas opcionales por etapa
+from cache_resultados import TIPO_IMAGEN, buscar_resultado, configurar_cache, guardar_resultado  # Caché por contenido
+from clasificador import ETIQUETAS, clasificar_por_colores, metrica_desde_texto  # Códigos de etiqueta y clasificación
+from tablas import clasificar_con_tabla, tabla_para  # Clasificación con tablas precalculadas
+from nucleo import detectar_forma  # Detección de forma sin interfaz gráfica
+from regiones import regiones_desde_etiquetas  # Una región por manzana
+from espacios_color import espacio_desde_texto  # Espacio de color de las distancias
+from registro import activar_registro  # Conjunto de prototipos configurable
+from indice import huella_imagen  # Huella del contenido de las imágenes
+
+# ----------------------------------------------------------
+# Variables Globales
+# ----------------------------------------------------------
+EXTENSIONES = (".jpg", ".jpeg", ".png", ".bmp", ".tif", ".tiff", ".webp")
+
+# ----------------------------------------------------------
+# Función para Reunir las Imágenes de Entrada
+# ----------------------------------------------------------
+def buscar_imagenes(entradas):
+    """
+    Expande directorios y patrones en una lista ordenada de imágenes.
+
+    Args:
+    entradas (list): Directorios, patrones glob o rutas de imágenes.
+
+    Returns:
+    list: Rutas de las imágenes encontradas, sin repetir.
+    """
+    rutas = set()
+    for entrada in entradas:
+        if os.path.isdir(entrada):
+            for carpeta, _, archivos in os.walk(entrada):
+                rutas.update(
+                    os.path.join(carpeta, archivo) for archivo in archivos
+                    if archivo.lower().endswith(EXTENSIONES)
+                )
+        else:
+            rutas.update(
+                ruta for ruta in glob.glob(entrada, recursive=True)
+                if os.path.isfile(ruta) and ruta.lower().endswith(EXTENSIONES)
+            )
+    return sorted(rutas)
+
+# ----------------------------------------------------------
+# Función para Nombrar los Resultados
+# ----------------------------------------------------------
+def rutas_de_salida(rutas, directorio_salida):
+    """
+    Da a cada imagen un JSON que repite su ruta relativa bajo el directorio de salida.
+
+    La ruta se toma desde la carpeta común de todas las imágenes y conserva la
+    extensión (a/x.jpg -> a/x.jpg.json), así a/x.jpg, b/x.jpg y x.png no se pisan.
+
+    Args:
+    rutas (list): Rutas de las imágenes.
+    directorio_salida (str): Directorio de resultados.
+
+    Returns:
+    list: Ruta del JSON de cada imagen, en el mismo orden.
+    """
+    absolutas = [os.path.abspath(ruta) for ruta in rutas]
+    base = os.path.commonpath([os.path.dirname(ruta) for ruta in absolutas])
+    return [os.path.join(directorio_salida, os.path.relpath(ruta, base) + ".json") for ruta in absolutas]
+
+# ----------------------------------------------------------
+# Función para Preparar cada Proceso
+# ----------------------------------------------------------
+def iniciar_proceso(metrica, ruta_prototipos, por_colores=False, directorio_cache=None, espacio=None):
+    """
+    Prepara un proceso del grupo: un hilo de OpenCV, los prototipos activos y la tabla ya abierta.
+
+    Args:
+    metrica (float): Parámetro de la distancia de Minkowski.
+    ruta_prototipos (str): Archivo de prototipos a activar, o None para los predeterminados.
+    por_colores (bool): Si se clasifica por colores distintos (sin tabla).
+    directorio_cache (str): Directorio de la copia en disco de la caché de resultados; vacío o None
+        deja el de MANZANAS_CACHE_RESULTADOS.
+    espacio (str): Espacio de color de las distancias, o None para el de MANZANAS_ESPACIO.
+    """
+    if directorio_cache:
+        configurar_cache(directorio=directorio_cache)
+    # Cada proceso ya ocupa un núcleo; los hilos internos de OpenCV sólo competirían entre sí
+    cv2.setNumThreads(1)
+    # Los contadores heredados del proceso principal ya se cuentan allí
+    instrumentacion.reiniciar()
+    activar_registro(ruta_prototipos, espacio)
+    if not por_colores:
+        tabla_para(metrica)
+
+# ----------------------------------------------------------
+# Función para Leer una Imagen
+# ----------------------------------------------------------
+@instrumentacion.instrumentar("carga_imagen")
+def leer_imagen(ruta):
+    """
+    Lee una imagen del disco en orden BGR.
+
+    Args:
+    ruta (str): Ruta de la imagen.
+
+    Returns:
+    ndarray or None: Imagen HxWx3, o None si no se pudo leer.
+    """
+    return cv2.imread(ruta, cv2.IMREAD_COLOR)
+
+# ----------------------------------------------------------
+# Función para Clasificar una Imagen
+# ----------------------------------------------------------
+def clasificar_archivo(ruta, metrica, ruta_salida, por_colores=False, usar_cache=False):
+    """
+    Clasifica una imagen y escribe su resultado en JSON.
+
+    Un error en esta imagen queda en su resultado y no detiene al resto del lote.
+
+    Args:
+    ruta (str): Ruta de la imagen.
+    metrica (float): Parámetro de la distancia de Minkowski.
+    ruta_salida (str): Archivo JSON donde se escribe el resultado.
+    por_colores (bool): Clasificar cada color distinto una vez en lugar de usar la tabla.
+    usar_cache (bool): Reutilizar el resultado de una imagen con el mismo contenido.
+
+    Returns:
+    dict: Resultado de la imagen, o un diccionario con la clave "error".
+    """
+    try:
+        return _clasificar_archivo(ruta, metrica, ruta_salida, por_colores, usar_cache)
+    except Exception as error:
+        return {"imagen": ruta, "error": f"{type(error).__name__}: {error}"}
+
+def _clasificar_archivo(ruta, metrica, ruta_salida, por_colores, usar_cache):
+    huella = huella_imagen(ruta) if usar_cache else None
+    # Con --colores-unicos el resultado lleva además "colores": se guarda con otro tipo
+    tipo = "imagen_colores" if por_colores else TIPO_IMAGEN
+    guardado = buscar_resultado(huella, metrica, tipo) if usar_cache else None
+    if guardado is not None:
+        resultado = {"imagen": ruta, **guardado[1]}
+        _escribir_resultado(resultado, ruta_salida)
+        return resultado
+
+    imagen_bgr = leer_imagen(ruta)
+    if imagen_bgr is None:
+        return {"imagen": ruta, "error": "No se pudo leer la imagen."}
+
+    if por_colores:
+        etiquetas, histograma = clasificar_por_colores(imagen_bgr[..., ::-1], metrica)
+    else:
+        etiquetas, histograma = clasificar_con_tabla(imagen_bgr[..., ::-1], metrica), None
+    conteo = np.bincount(etiquetas.ravel(), minlength=len(ETIQUETAS))
+
+    resultado = {
+        "imagen": ruta,
+        "alto": int(imagen_bgr.shape[0]),
+        "ancho": int(imagen_bgr.shape[1]),
+        "forma": detectar_forma(imagen_bgr),
+        "pixeles": {ETIQUETAS[codigo][0]: int(conteo[codigo]) for codigo in ETIQUETAS},
+        "manzanas": regiones_desde_etiquetas(etiquetas),
+    }
+    if histograma is not None:
+        resultado["colores"] = {
+            "distintos": len(histograma["colores"]),
+            "proporcion_unicos": round(histograma["proporcion_unicos"], 6),
+        }
+    if usar_cache:
+        guardar_resultado(huella, metrica, etiquetas, {clave: valor for clave, valor in resultado.items() if clave != "imagen"}, tipo)
+
+    _escribir_resultado(resultado, ruta_salida)
+    return resultado
+
+# ----------------------------------------------------------
+# Función para Escribir el Resultado de una Imagen
+# ----------------------------------------------------------
+def _escribir_resultado(resultado, ruta_salida):
+    """
+    Escribe el JSON de una imagen y adjunta los contadores de instrumentación del proceso.
+
+    Args:
+    resultado (dict): Resultado de la imagen.
+    ruta_salida (str): Archivo JSON donde se escribe el resultado.
+    """
+    os.makedirs(os.path.dirname(ruta_salida) or ".", exist_ok=True)
+    with open(ruta_salida, "w") as archivo:
+        json.dump(resultado, archivo, ensure_ascii=False)
+    if instrumentacion.activa:
+        # Los contadores de este proceso viajan con el resultado y se suman en el principal
+        resultado["instrumentacion"] = instrumentacion.instantanea(reiniciar=True)
+
+# ----------------------------------------------------------
+# Función Principal
+# ----------------------------------------------------------
+def main(argumentos=None):
+    """
+    Punto de entrada de la línea de comandos.
+
+    Args:
+    argumentos (list): Argumentos a interpretar; por omisión los de sys.argv.
+    """
+    parser = argparse.ArgumentParser(description="Clasificación por lotes de imágenes de manzanas.")
+    parser.add_argument("entradas", nargs="+", help="Directorios, patrones glob o imágenes.")
+    parser.add_argument("--salida", default="resultados", help="Directorio de resultados.")
+    parser.add_argument("--metrica", type=metrica_desde_texto, default=1, help="Parámetro p de Minkowski (1, 2, inf o cualquier p > 0).")
+    parser.add_argument("--prototipos", default=os.environ.get("MANZANAS_PROTOTIPOS"), help="Archivo JSON de prototipos.")
+    parser.add_argument("--espacio", type=espacio_desde_texto, default=os.environ.get("MANZANAS_ESPACIO", "rgb"),
+                        help="Espacio de color de las distancias: rgb, lab o hsv.")
+    parser.add_argument("--procesos", type=int, default=os.cpu_count(), help="Número de procesos.")
+    parser.add_argument("--colores-unicos", action="store_true",
+                        help="Clasificar cada color distinto una vez en lugar de construir la tabla.")
+    parser.add_argument("--cache", nargs="?", const="", metavar="DIRECTORIO",
+                        help="Reutilizar resultados de imágenes con el mismo contenido; con un directorio, también entre ejecuciones.")
+    args = parser.parse_args(argumentos)
+
+    rutas = buscar_imagenes(args.entradas)
+    if not rutas:
+        parser.error("No se encontraron imágenes.")
+    os.makedirs(args.salida, exist_ok=True)
+    metrica = args.metrica
+
+    # Construir la tabla una sola vez antes de repartir el trabajo
+    activar_registro(args.prototipos, args.espacio)
+    if not args.colores_unicos:
+        tabla_para(metrica)
+
+    inicio = time.perf_counter()
+    errores = 0
+    with ProcessPoolExecutor(max_workers=args.procesos, initializer=iniciar_proceso, initargs=(metrica, args.prototipos, args.colores_unicos, args.cache, args.espacio)) as grupo:
+        resultados = grupo.map(
+            clasificar_archivo, rutas, [metrica] * len(rutas), rutas_de_salida(rutas, args.salida),
+            [args.colores_unicos] * len(rutas), [args.cache is not None] * len(rutas),
+            chunksize=max(1, len(rutas) // (4 * args.procesos)),
+        )
+        for resultado in resultados:
+            instrumentacion.combinar(resultado.pop("instrumentacion", None))
+            if "error" in resultado:
+                errores += 1
+                print(f"{resultado['imagen']}: {resultado['error']}")
+    transcurrido = time.perf_counter() - inicio
+
+    print(f"{len(rutas) - errores} imágenes clasificadas en {transcurrido:.1f} s "
+          f"({60 * len(rutas) / transcurrido:.0f} imágenes/min), {errores} errores.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,289 @@
+# ----------------------------------------------------------
+# Procesamiento por Teselas de Mosaicos Gigantes
+# ----------------------------------------------------------
+# Los ortomosaicos de dron de la huerta no caben en memoria. Este módulo
+# abre la imagen mapeada en memoria (.npy, RGB crudo o TIFF sin compresión),
+# la recorre en teselas con un margen de solape, clasifica y segmenta cada
+# una y une las manzanas que cruzan los bordes: cada manzana se conserva
+# sólo en la tesela cuyo núcleo contiene el centro de su caja, y el solape
+# garantiza que esa tesela la vea completa. El tamaño de las teselas se
+# calcula para que la memoria de trabajo no pase de un límite.
+#
+# Uso:
+#   python mosaico.py huerta.tif --memoria 512 --solape 256 --salida huerta.json
+#   python mosaico.py huerta.rgb --forma 60000x80000 --etiquetas huerta_etiquetas.npy
+# ----------------------------------------------------------
+
+# ----------------------------------------------------------
+# Importación de Bibliotecas
+# ----------------------------------------------------------
+import argparse  # Módulo para leer los argumentos de la línea de comandos
+import json  # Módulo para trabajar con archivos JSON
+import os  # Módulo para interactuar con el sistema operativo
+import sys  # Módulo para escribir el progreso en la salida de errores
+
+import numpy as np  # Biblioteca para trabajar con arreglos y operaciones matemáticas
+from PIL import Image  # Pillow, para leer la cabecera de los TIFF sin decodificarlos
+
+from clasificador import ETIQUETAS, metrica_desde_texto  # Códigos de etiqueta y lectura de p
+from espacios_color import espacio_desde_texto  # Espacio de color de las distancias
+from paralelo import HILOS, clasificar_en_paralelo  # Clasificación por franjas en varios núcleos
+from regiones import AREA_MINIMA, contar_por_color, regiones_desde_etiquetas  # Una región por manzana
+from registro import activar_registro  # Conjunto de prototipos configurable
+from tablas import tabla_para  # Clasificación con tablas precalculadas
+
+# ----------------------------------------------------------
+# Variables Globales
+# ----------------------------------------------------------
+MEMORIA_MAXIMA = 512 * 1024 * 1024  # Bytes de memoria de trabajo por omisión
+SOLAPE = 256  # Margen (píxeles) alrededor de cada tesela; debe cubrir la manzana más grande
+# Bytes de trabajo por píxel de tesela: copia RGB, índices de la consulta a la
+# tabla, etiquetas, máscaras y el mapa de componentes de int32
+BYTES_POR_PIXEL = 40
+EXTENSIONES_CRUDAS = (".rgb", ".raw")
+
+# ----------------------------------------------------------
+# Función para Abrir un TIFF sin Compresión Mapeado en Memoria
+# ----------------------------------------------------------
+def _mapear_tiff(ruta):
+    """
+    Mapea en memoria un TIFF RGB sin compresión cuyas tiras son contiguas.
+
+    Pillow sólo lee la cabecera; los píxeles se leen del disco cuando una
+    tesela los toca.
+
+    Args:
+    ruta (str): Ruta del archivo TIFF.
+
+    Returns:
+    ndarray: Arreglo HxWx3 (uint8) mapeado en memoria, en orden RGB.
+    """
+    maximo_anterior = Image.MAX_IMAGE_PIXELS
+    Image.MAX_IMAGE_PIXELS = None  # Sin decodificar no hay riesgo de "bomba de descompresión"
+    try:
+        with Image.open(ruta) as imagen:
+            ancho, alto = imagen.size
+            modo, tiras = imagen.mode, sorted(imagen.tile, key=lambda tira: tira[2])
+    finally:
+        Image.MAX_IMAGE_PIXELS = maximo_anterior
+
+    bytes_fila = 3 * ancho
+    contiguas = modo == "RGB" and all(
+        codec == "raw" and argumentos[0] == "RGB" and argumentos[1] in (0, bytes_fila)
+        and argumentos[2] == 1 and (x0, x1) == (0, ancho)
+        for codec, (x0, _, x1, _), _, argumentos in tiras
+    )
+    # Cada tira debe empezar justo donde termina la anterior
+    desplazamiento = tiras[0][2] if tiras else 0
+    for _, (_, y0, _, y1), inicio, _ in tiras:
+        contiguas = contiguas and inicio == desplazamiento + y0 * bytes_fila
+    if not contiguas or tiras[0][1][1] != 0:
+        raise ValueError(
+            "Sólo se pueden mapear TIFF RGB de 8 bits sin compresión; "
+            "convierta el mosaico a .npy o a RGB crudo."
+        )
+    return np.memmap(ruta, dtype=np.uint8, mode="r", offset=desplazamiento, shape=(alto, ancho, 3))
+
+# ----------------------------------------------------------
+# Función para Abrir un Mosaico
+# ----------------------------------------------------------
+def abrir_mosaico(ruta, forma=None):
+    """
+    Abre un mosaico mapeado en memoria, sin leer sus píxeles.
+
+    Args:
+    ruta (str): Archivo .npy (HxWx3), RGB crudo (.rgb/.raw) o TIFF sin compresión.
+    forma (tuple): (alto, ancho) de un archivo RGB crudo.
+
+    Returns:
+    ndarray: Arreglo HxWx3 (uint8) en orden RGB.
+    """
+    extension = os.path.splitext(ruta)[1].lower()
+    if extension == ".npy":
+        mosaico = np.load(ruta, mmap_mode="r")
+    elif extension in EXTENSIONES_CRUDAS:
+        if forma is None:
+            raise ValueError("Un archivo RGB crudo necesita su forma (alto x ancho).")
+        mosaico = np.memmap(ruta, dtype=np.uint8, mode="r", shape=(forma[0], forma[1], 3))
+    elif extension in (".tif", ".tiff"):
+        mosaico = _mapear_tiff(ruta)
+    else:
+        raise ValueError(f"Formato de mosaico no admitido: {extension}")
+
+    if mosaico.ndim != 3 or mosaico.shape[2] != 3 or mosaico.dtype != np.uint8:
+        raise ValueError("El mosaico debe ser un arreglo HxWx3 de uint8.")
+    return mosaico
+
+# ----------------------------------------------------------
+# Función para Calcular el Tamaño de las Teselas
+# ----------------------------------------------------------
+def lado_tesela(memoria_maxima=MEMORIA_MAXIMA, solape=SOLAPE):
+    """
+    Calcula el lado del núcleo de las teselas para no pasar del límite de memoria.
+
+    Args:
+    memoria_maxima (int): Bytes de memoria de trabajo permitidos.
+    solape (int): Margen de cada lado de la tesela.
+
+    Returns:
+    int: Lado del núcleo de cada tesela en píxeles.
+    """
+    lado_total = int((memoria_maxima // BYTES_POR_PIXEL) ** 0.5)
+    lado = lado_total - 2 * solape
+    if lado < max(64, solape):
+        raise ValueError(
+            f"El límite de memoria ({memoria_maxima} bytes) es muy pequeño para un solape de {solape} píxeles."
+        )
+    return lado
+
+# ----------------------------------------------------------
+# Función para Recorrer las Teselas
+# ----------------------------------------------------------
+def teselas(alto, ancho, lado, solape):
+    """
+    Genera las teselas de una imagen como pares (núcleo, núcleo con margen).
+
+    Los núcleos no se solapan y cubren la imagen entera; el margen se recorta
+    en los bordes de la imagen.
+
+    Args:
+    alto (int): Alto de la imagen.
+    ancho (int): Ancho de la imagen.
+    lado (int): Lado del núcleo de las teselas.
+    solape (int): Margen alrededor de cada núcleo.
+
+    Returns:
+    generator: Tuplas ((y0, y1, x0, x1) del núcleo, (y0, y1, x0, x1) con margen).
+    """
+    for y0 in range(0, alto, lado):
+        for x0 in range(0, ancho, lado):
+            y1, x1 = min(y0 + lado, alto), min(x0 + lado, ancho)
+            yield (y0, y1, x0, x1), (max(0, y0 - solape), min(alto, y1 + solape), max(0, x0 - solape), min(ancho, x1 + solape))
+
+# ----------------------------------------------------------
+# Función para Procesar un Mosaico Completo
+# ----------------------------------------------------------
+def procesar_mosaico(mosaico, metrica, memoria_maxima=MEMORIA_MAXIMA, solape=SOLAPE,
+                     area_minima=AREA_MINIMA, etiquetas_salida=None, progreso=None, hilos=1):
+    """
+    Clasifica y segmenta un mosaico tesela por tesela.
+
+    Una manzana se informa una sola vez: la tesela cuyo núcleo contiene el
+    centro de su caja la ve completa siempre que la manzana mida a lo sumo
+    el doble del solape, y las demás teselas la descartan.
+
+    Args:
+    mosaico (ndarray): Arreglo HxWx3 (uint8) en orden RGB, normalmente mapeado en memoria.
+    metrica (float): Parámetro de la distancia de Minkowski.
+    memoria_maxima (int): Bytes de memoria de trabajo permitidos.
+    solape (int): Margen alrededor de cada tesela.
+    area_minima (int): Área mínima de una región para considerarla manzana.
+    etiquetas_salida (ndarray): Arreglo HxW (uint8) opcional donde escribir las etiquetas.
+    progreso (callable): Función opcional (teselas hechas, teselas totales).
+    hilos (int): Hilos que clasifican cada tesela por franjas de filas.
+
+    Returns:
+    dict: Alto, ancho, número de teselas, píxeles por etiqueta y manzanas con
+        coordenadas del mosaico.
+    """
+    alto, ancho = mosaico.shape[:2]
+    lado = lado_tesela(memoria_maxima, solape)
+    total = -(-alto // lado) * -(-ancho // lado)
+    conteo = np.zeros(len(ETIQUETAS), dtype=np.int64)
+    manzanas = []
+
+    for numero, ((y0, y1, x0, x1), (my0, my1, mx0, mx1)) in enumerate(teselas(alto, ancho, lado, solape), 1):
+        etiquetas = clasificar_en_paralelo(mosaico[my0:my1, mx0:mx1], metrica, hilos)
+        nucleo = etiquetas[y0 - my0:y1 - my0, x0 - mx0:x1 - mx0]
+        conteo += np.bincount(nucleo.ravel(), minlength=len(ETIQUETAS))
+        if etiquetas_salida is not None:
+            etiquetas_salida[y0:y1, x0:x1] = nucleo
+
+        for region in regiones_desde_etiquetas(etiquetas, area_minima):
+            x, y, ancho_region, alto_region = region["bbox"]
+            x, y = x + mx0, y + my0
+            # El centro de la caja cae en el núcleo de exactamente una tesela
+            if y0 <= y + alto_region // 2 < y1 and x0 <= x + ancho_region // 2 < x1:
+                region["bbox"] = [x, y, ancho_region, alto_region]
+                manzanas.append(region)
+        del etiquetas, nucleo
+        if progreso is not None:
+            progreso(numero, total)
+
+    return {
+        "alto": int(alto),
+        "ancho": int(ancho),
+        "teselas": total,
+        "lado_tesela": lado,
+        "pixeles": {ETIQUETAS[codigo][0]: int(conteo[codigo]) for codigo in ETIQUETAS},
+        "conteo": contar_por_color(manzanas),
+        "manzanas": manzanas,
+    }
+
+# ----------------------------------------------------------
+# Función para Leer la Forma de un Archivo Crudo
+# ----------------------------------------------------------
+def forma_desde_texto(texto):
+    """
+    Convierte "ALTOxANCHO" en una tupla (alto, ancho).
+
+    Args:
+    texto (str): Forma escrita en la línea de comandos.
+
+    Returns:
+    tuple: (alto, ancho).
+    """
+    alto, _, ancho = texto.lower().partition("x")
+    return int(alto), int(ancho)
+
+# ----------------------------------------------------------
+# Función Principal
+# ----------------------------------------------------------
+def main(argumentos=None):
+    """
+    Punto de entrada de la línea de comandos.
+
+    Args:
+    argumentos (list): Argumentos a interpretar; por omisión los de sys.argv.
+    """
+    parser = argparse.ArgumentParser(description="Detección de manzanas en mosaicos más grandes que la memoria.")
+    parser.add_argument("mosaico", help="Archivo .npy, RGB crudo (.rgb/.raw) o TIFF sin compresión.")
+    parser.add_argument("--forma", type=forma_desde_texto, help="ALTOxANCHO de un archivo RGB crudo.")
+    parser.add_argument("--metrica", type=metrica_desde_texto, default=1, help="Parámetro p de Minkowski (1, 2, inf o cualquier p > 0).")
+    parser.add_argument("--prototipos", default=os.environ.get("MANZANAS_PROTOTIPOS"), help="Archivo JSON de prototipos.")
+    parser.add_argument("--espacio", type=espacio_desde_texto, default=os.environ.get("MANZANAS_ESPACIO", "rgb"),
+                        help="Espacio de color de las distancias: rgb, lab o hsv.")
+    parser.add_argument("--memoria", type=int, default=MEMORIA_MAXIMA // (1024 * 1024), help="Memoria de trabajo máxima en MB.")
+    parser.add_argument("--solape", type=int, default=SOLAPE, help="Margen entre teselas; al menos la mitad de la manzana más grande.")
+    parser.add_argument("--area-minima", type=int, default=AREA_MINIMA, help="Área mínima de una manzana en píxeles.")
+    parser.add_argument("--etiquetas", help="Archivo .npy donde guardar el mapa de etiquetas completo.")
+    parser.add_argument("--hilos", type=int, default=HILOS, help="Hilos que clasifican cada tesela por franjas.")
+    parser.add_argument("--salida", help="Archivo JSON del resultado; por omisión la salida estándar.")
+    args = parser.parse_args(argumentos)
+
+    activar_registro(args.prototipos, args.espacio)
+    tabla_para(args.metrica)
+    mosaico = abrir_mosaico(args.mosaico, args.forma)
+    etiquetas_salida = None
+    if args.etiquetas:
+        # El mapa de etiquetas completo también se escribe mapeado en memoria
+        etiquetas_salida = np.lib.format.open_memmap(args.etiquetas, mode="w+", dtype=np.uint8, shape=mosaico.shape[:2])
+
+    resultado = procesar_mosaico(
+        mosaico, args.metrica, args.memoria * 1024 * 1024, args.solape, args.area_minima, etiquetas_salida,
+        progreso=lambda hechas, total: print(f"\rTesela {hechas}/{total}", end="", file=sys.stderr), hilos=args.hilos,
+    )
+    print(file=sys.stderr)
+    resultado["imagen"] = args.mosaico
+    if etiquetas_salida is not None:
+        etiquetas_salida.flush()
+
+    if args.salida:
+        with open(args.salida, "w") as archivo:
+            json.dump(resultado, archivo, ensure_ascii=False)
+    else:
+        json.dump(resultado, sys.stdout, ensure_ascii=False)
+        print()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,262 @@
+# ----------------------------------------------------------
+# Núcleo de Clasificación de Manzanas
+# ----------------------------------------------------------
+# Distancia de Minkowski, prototipos, compuertas por color, comparacion() y
+# detectar_forma(), separados de la interfaz gráfica de V11.py. Este módulo no
+# crea ventanas ni importa tkinter, y OpenCV se carga sólo al detectar formas,
+# así los procesos de trabajo arrancan en milisegundos.
+# ----------------------------------------------------------
+
+# ----------------------------------------------------------
+# Importación de Bibliotecas
+# ----------------------------------------------------------
+import math  # Constante pi para la circularidad
+
+from instrumentacion import instrumentar, pixeles_del_primero, un_pixel  # Métricas opcionales por etapa
+
+# ----------------------------------------------------------
+# Función para Calcular la Distancia de Minkowski
+# ----------------------------------------------------------
+def minkowski_distance(x, y, p):
+    """
+    Calcula la distancia de Minkowski entre dos puntos.
+
+    Args:
+    x (list): Coordenadas del primer punto.
+    y (list): Coordenadas del segundo punto.
+    p (float): Parámetro de la distancia de Minkowski.
+
+    Returns:
+    float: Distancia de Minkowski entre los dos puntos.
+    """
+    if len(x) != len(y):
+        raise ValueError("Los puntos x e y deben tener la misma dimensión.")
+
+    if p == 2:
+        return sum((xi - yi) ** 2 for xi, yi in zip(x, y)) ** 0.5
+    if p == float('inf'):
+        return max(abs(xi - yi) for xi, yi in zip(x, y))
+    sum_powered_differences = sum(abs(xi - yi) ** p for xi, yi in zip(x, y))
+    return sum_powered_differences ** (1 / p)
+
+# ----------------------------------------------------------
+# Prototipos de Colores para Comparación
+# ----------------------------------------------------------
+prototipo_rgb1 = (185, 77, 64)  # Rojo
+prototipo_rgb2 = (137, 185, 65)  # Verde
+prototipo_rgb3 = (230, 173, 75)  # Amarillo
+prototipo_rgb4 = (255, 255, 255)  # Blanco
+
+# ----------------------------------------------------------
+# Parámetros de la Detección de Forma
+# ----------------------------------------------------------
+UMBRAL_FORMA = 128  # Nivel de gris que separa la figura del resto
+REDUCCION_FORMA = 4  # Factor de reducción del nivel donde se buscan candidatos
+AREA_MINIMA_FORMA = 200  # Área mínima (píxeles a resolución completa) de un contorno candidato
+CIRCULARIDAD_MINIMA = 0.1  # 4·pi·área / perímetro² mínimo de un candidato (1 es un círculo)
+LADO_REFINAR = 48  # Candidatos con un lado menor (en el nivel reducido) se revisan a resolución completa
+
+# ----------------------------------------------------------
+# Funciones para Calcular la Distancia para Colores Específicos
+# ----------------------------------------------------------
+def roja(pixel, metrica):
+    """
+    Calcula la distancia para el color rojo.
+
+    Args:
+    pixel (tuple): Coordenadas de color del píxel.
+    metrica (float): Parámetro de la distancia de Minkowski.
+
+    Returns:
+    float or None: Distancia si el píxel es rojo, None en caso contrario.
+    """
+    return minkowski_distance(prototipo_rgb1, pixel, metrica) if (
+        pixel[0] > 50 and pixel[1] < 60 and pixel[2] < 60
+    ) else None
+
+def verde(pixel, metrica):
+    """
+    Calcula la distancia para el color verde.
+
+    Args:
+    pixel (tuple): Coordenadas de color del píxel.
+    metrica (float): Parámetro de la distancia de Minkowski.
+
+    Returns:
+    float or None: Distancia si el píxel es verde, None en caso contrario.
+    """
+    return minkowski_distance(prototipo_rgb2, pixel, metrica) if (
+        pixel[0] > 20 and pixel[1] > 30 and pixel[2] < 100
+    ) else None
+
+def amarilla(pixel, metrica):
+    """
+    Calcula la distancia para el color amarillo.
+
+    Args:
+    pixel (tuple): Coordenadas de color del píxel.
+    metrica (float): Parámetro de la distancia de Minkowski.
+
+    Returns:
+    float or None: Distancia si el píxel es amarillo, None en caso contrario.
+    """
+    return minkowski_distance(prototipo_rgb3, pixel, metrica) if (
+        pixel[0] > 50 and pixel[1] > 80 and pixel[2] < 110
+    ) else None
+
+def blanco(pixel, metrica):
+    """
+    Calcula la distancia para el color blanco.
+
+    Args:
+    pixel (tuple): Coordenadas de color del píxel.
+    metrica (float): Parámetro de la distancia de Minkowski.
+
+    Returns:
+    float or None: Distancia si el píxel es blanco, None en caso contrario.
+    """
+    return minkowski_distance(prototipo_rgb4, pixel, metrica) if (
+        pixel[0] > 200 and pixel[1] > 200 and pixel[2] > 200
+    ) else None
+
+# ----------------------------------------------------------
+# Función para Comparar el Color de un Píxel con los Prototipos
+# ----------------------------------------------------------
+@instrumentar("comparacion", un_pixel)
+def comparacion(pixel, metrica, event):
+    """
+    Compara el color de un píxel con los prototipos y determina el color dominante.
+
+    Args:
+    pixel (tuple): Coordenadas de color del píxel.
+    metrica (float): Parámetro de la distancia de Minkowski.
+    event: Evento relacionado con la posición del píxel.
+
+    Returns:
+    tuple: Mensaje indicando el color y el color de la fuente para la presentación.
+    """
+    valor_rojo = roja(pixel, metrica)
+    valor_verde = verde(pixel, metrica)
+    valor_amarillo = amarilla(pixel, metrica)
+    valor_blanco = blanco(pixel, metrica)
+
+    valores = {
+        "Rojo": valor_rojo,
+        "Verde": valor_verde,
+        "Amarillo": valor_amarillo,
+        "Blanco": valor_blanco,
+    }
+# ----------------------------------------------------------
+# Filtrar valores válidos y seleccionar el color dominante
+# ----------------------------------------------------------
+    valores_validos = {color: valor for color, valor in valores.items() if valor is not None and valor != float('inf')}
+
+    if not valores_validos:
+        return "Es fondo", "black"
+
+    color_label = min(valores_validos, key=valores_validos.get)
+    font_color = color_label.lower()
+
+    if color_label.lower() == "blanco":
+        return "Es fondo", "black"
+
+    return f"Es manzana de color {color_label.lower()}", font_color
+
+# ----------------------------------------------------------
+# Función para Detectar la Forma de una Imagen
+# ----------------------------------------------------------
+@instrumentar("detectar_forma", pixeles_del_primero)
+def detectar_forma(img, umbral=UMBRAL_FORMA):
+    """
+    Detecta la forma de una imagen y determina si es una manzana o fondo.
+
+    Args:
+    img: Imagen a analizar.
+    umbral (int): Nivel de gris que separa la figura del resto.
+
+    Returns:
+    str: Mensaje indicando si es una manzana o fondo.
+    """
+    # OpenCV se importa aquí para no pagar su carga en los procesos que sólo clasifican colores
+    import cv2
+
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    _, thresh = cv2.threshold(gray, umbral, 255, cv2.THRESH_BINARY)
+    contours, _ = cv2.findContours(thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+
+    for contour in contours:
+        approx = cv2.approxPolyDP(contour, 0.02 * cv2.arcLength(contour, True), True)
+        if len(approx) >= 5:
+            return "Es una manzana"
+
+    return "Es fondo"
+
+# ----------------------------------------------------------
+# Función para Detectar la Forma en Varias Resoluciones
+# ----------------------------------------------------------
+@instrumentar("detectar_forma_multiescala", pixeles_del_primero)
+def detectar_forma_multiescala(img, umbral=UMBRAL_FORMA, reduccion=REDUCCION_FORMA, area_minima=AREA_MINIMA_FORMA,
+                               circularidad_minima=CIRCULARIDAD_MINIMA, lado_refinar=LADO_REFINAR):
+    """
+    Versión rápida de detectar_forma() que busca candidatos en una imagen reducida.
+
+    Los contornos del nivel reducido se recorren de mayor a menor área; los
+    que no alcanzan el área mínima (ruido) o la circularidad mínima se
+    descartan antes de aproximar el polígono. Un candidato grande se decide
+    en el nivel reducido, porque su polígono casi no cambia con la escala;
+    uno pequeño se vuelve a umbralizar a resolución completa sólo dentro de
+    su rectángulo.
+
+    Args:
+    img: Imagen a analizar (BGR).
+    umbral (int): Nivel de gris que separa la figura del resto.
+    reduccion (int): Factor de reducción del nivel de búsqueda (1 no reduce).
+    area_minima (float): Área mínima de un candidato en píxeles a resolución completa.
+    circularidad_minima (float): Circularidad mínima de un candidato (de 0 a 1).
+    lado_refinar (int): Lado (en el nivel reducido) bajo el cual un candidato se revisa a resolución completa.
+
+    Returns:
+    str: Mensaje indicando si es una manzana o fondo.
+    """
+    import cv2
+
+    alto, ancho = img.shape[:2]
+    reducida = img
+    if reduccion > 1:
+        # Submuestreo sin promediar: basta para umbralizar y cuesta una fracción de INTER_AREA
+        reducida = cv2.resize(img, (max(1, ancho // reduccion), max(1, alto // reduccion)), interpolation=cv2.INTER_NEAREST)
+    escala_x, escala_y = ancho / reducida.shape[1], alto / reducida.shape[0]
+
+    gris = cv2.cvtColor(reducida, cv2.COLOR_BGR2GRAY)
+    _, binaria = cv2.threshold(gris, umbral, 255, cv2.THRESH_BINARY)
+    contornos, _ = cv2.findContours(binaria, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+
+    areas = [cv2.contourArea(contorno) for contorno in contornos]
+    for indice in sorted(range(len(contornos)), key=areas.__getitem__, reverse=True):
+        if areas[indice] * escala_x * escala_y < area_minima:
+            break  # Los que siguen son aún más pequeños
+        contorno = contornos[indice]
+        perimetro = cv2.arcLength(contorno, True)
+        if 4 * math.pi * areas[indice] < circularidad_minima * perimetro * perimetro:
+            continue
+
+        x, y, ancho_caja, alto_caja = cv2.boundingRect(contorno)
+        if max(ancho_caja, alto_caja) >= lado_refinar:
+            if len(cv2.approxPolyDP(contorno, 0.02 * perimetro, True)) >= 5:
+                return "Es una manzana"
+            continue
+
+        # Refinar a resolución completa con dos píxeles reducidos de margen
+        x0, y0 = max(0, int((x - 2) * escala_x)), max(0, int((y - 2) * escala_y))
+        x1 = min(ancho, math.ceil((x + ancho_caja + 2) * escala_x))
+        y1 = min(alto, math.ceil((y + alto_caja + 2) * escala_y))
+        gris_roi = cv2.cvtColor(img[y0:y1, x0:x1], cv2.COLOR_BGR2GRAY)
+        _, binaria_roi = cv2.threshold(gris_roi, umbral, 255, cv2.THRESH_BINARY)
+        contornos_roi, _ = cv2.findContours(binaria_roi, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        for contorno_roi in contornos_roi:
+            if cv2.contourArea(contorno_roi) < area_minima:
+                continue
+            if len(cv2.approxPolyDP(contorno_roi, 0.02 * cv2.arcLength(contorno_roi, True), True)) >= 5:
+                return "Es una manzana"
+
+    return "Es fondo"
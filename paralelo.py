@@ -0,0 +1,189 @@
+# ----------------------------------------------------------
+# Clasificación en Paralelo dentro de una Sola Imagen
+# ----------------------------------------------------------
+# Una imagen de decenas de megapíxeles se reparte en franjas de filas que
+# se clasifican en un grupo de hilos. La consulta a la tabla y el filtro de
+# moda son operaciones de NumPy que liberan el GIL, así los hilos corren en
+# núcleos distintos sin copiar píxeles: cada franja lee una vista de la
+# imagen y escribe en su parte del mapa de salida. El voto de los 8 vecinos
+# necesita una fila de borde a cada lado; esa fila se clasifica dos veces
+# (una por franja vecina) y no se escribe, así el resultado es idéntico al
+# de procesar la imagen entera.
+# ----------------------------------------------------------
+
+# ----------------------------------------------------------
+# Importación de Bibliotecas
+# ----------------------------------------------------------
+import os  # Módulo para contar los núcleos disponibles
+from concurrent.futures import ThreadPoolExecutor  # Grupo de hilos para las franjas
+
+import numpy as np  # Biblioteca para trabajar con arreglos y operaciones matemáticas
+
+from instrumentacion import instrumentar, pixeles_del_primero  # Métricas opcionales por etapa
+from tablas import clasificar_con_tabla, tabla_para  # Clasificación con tablas precalculadas
+from vecindad import filtro_moda  # Voto de los 8 vecinos
+
+# ----------------------------------------------------------
+# Variables Globales
+# ----------------------------------------------------------
+HILOS = os.cpu_count() or 1  # Hilos por omisión: uno por núcleo
+FILAS_MINIMAS = 64  # Filas mínimas de una franja, para que el borde repetido no pese
+FRANJAS_POR_HILO = 4  # Más franjas que hilos, para que ninguno quede esperando al último
+
+# ----------------------------------------------------------
+# Función para Dividir una Imagen en Franjas
+# ----------------------------------------------------------
+def franjas(alto, hilos, filas_minimas=FILAS_MINIMAS):
+    """
+    Divide las filas de una imagen en franjas de tamaño parecido.
+
+    Args:
+    alto (int): Número de filas de la imagen.
+    hilos (int): Hilos que procesarán las franjas.
+    filas_minimas (int): Filas mínimas por franja.
+
+    Returns:
+    list: Pares (fila inicial, fila final) que cubren la imagen sin solaparse.
+    """
+    numero = max(1, min(hilos * FRANJAS_POR_HILO, alto // max(1, filas_minimas)))
+    limites = np.linspace(0, alto, numero + 1).astype(int)
+    return [(int(inicio), int(fin)) for inicio, fin in zip(limites[:-1], limites[1:]) if fin > inicio]
+
+# ----------------------------------------------------------
+# Función para Ejecutar un Trabajo por Franjas
+# ----------------------------------------------------------
+def _en_franjas(alto, hilos, trabajo):
+    """
+    Ejecuta trabajo(inicio, fin) para cada franja, en paralelo si hay más de un hilo.
+
+    Args:
+    alto (int): Número de filas de la imagen.
+    hilos (int): Hilos a usar.
+    trabajo (callable): Función (fila inicial, fila final) que escribe su franja.
+    """
+    _repartir(franjas(alto, hilos), hilos, trabajo)
+
+def _repartir(partes, hilos, trabajo):
+    """
+    Ejecuta trabajo(*parte) para cada parte, en paralelo si hay más de un hilo.
+
+    Args:
+    partes (list): Tuplas de argumentos, una por trabajo.
+    hilos (int): Hilos a usar.
+    trabajo (callable): Función que recibe los argumentos de una parte.
+    """
+    if hilos <= 1 or len(partes) == 1:
+        for parte in partes:
+            trabajo(*parte)
+        return
+    with ThreadPoolExecutor(max_workers=hilos) as grupo:
+        # list() propaga aquí la primera excepción de un hilo
+        list(grupo.map(lambda parte: trabajo(*parte), partes))
+
+# ----------------------------------------------------------
+# Función para Clasificar una Imagen por Franjas en Paralelo
+# ----------------------------------------------------------
+@instrumentar("clasificar_en_paralelo", pixeles_del_primero)
+def clasificar_en_paralelo(imagen, metrica, hilos=None, suavizar=False, clasificar=clasificar_con_tabla, salida=None):
+    """
+    Clasifica una imagen completa repartiendo franjas de filas entre varios hilos.
+
+    Args:
+    imagen (ndarray): Arreglo HxWx3 (uint8) en orden RGB (puede estar mapeado en memoria).
+    metrica (float): Parámetro de la distancia de Minkowski.
+    hilos (int): Hilos a usar; por omisión uno por núcleo.
+    suavizar (bool): Aplicar además filtro_moda() (voto de los 8 vecinos) a cada franja.
+    clasificar (callable): Función (imagen, métrica) -> mapa de etiquetas de cada franja.
+    salida (ndarray): Arreglo HxW (uint8) opcional donde escribir el mapa.
+
+    Returns:
+    ndarray: Mapa HxW (uint8) de códigos de etiqueta, igual al de clasificar la imagen entera.
+    """
+    if imagen.ndim != 3 or imagen.shape[2] != 3:
+        raise ValueError("La imagen debe tener forma HxWx3.")
+    alto = imagen.shape[0]
+    if salida is None:
+        salida = np.empty(imagen.shape[:2], dtype=np.uint8)
+    if clasificar is clasificar_con_tabla:
+        # La tabla se abre (o construye) una vez, antes de que los hilos la pidan a la vez
+        tabla_para(metrica)
+
+    def trabajo(inicio, fin):
+        # Con suavizado, una fila de borde a cada lado que sólo aporta votos
+        borde_inicio = max(0, inicio - 1) if suavizar else inicio
+        borde_fin = min(alto, fin + 1) if suavizar else fin
+        etiquetas = clasificar(imagen[borde_inicio:borde_fin], metrica)
+        if suavizar:
+            etiquetas = filtro_moda(etiquetas)
+        salida[inicio:fin] = etiquetas[inicio - borde_inicio:fin - borde_inicio]
+
+    _en_franjas(alto, hilos or HILOS, trabajo)
+    return salida
+
+# ----------------------------------------------------------
+# Función para Clasificar Varias Imágenes en una Sola Pasada
+# ----------------------------------------------------------
+def clasificar_varias_en_paralelo(imagenes, metrica, hilos=None, clasificar=clasificar_con_tabla):
+    """
+    Clasifica varias imágenes a la vez: las franjas de todas van al mismo grupo de hilos.
+
+    Con imágenes pequeñas, repartir cada una por separado dejaría a los hilos
+    esperando entre una imagen y la siguiente; así el lote entero ocupa los
+    núcleos hasta la última franja.
+
+    Args:
+    imagenes (list): Arreglos HxWx3 (uint8, RGB) de tamaños cualesquiera, sin copiar.
+    metrica (float): Parámetro de la distancia de Minkowski.
+    hilos (int): Hilos a usar; por omisión uno por núcleo.
+    clasificar (callable): Función (imagen, métrica) -> mapa de etiquetas de cada franja.
+
+    Returns:
+    list: Mapas HxW (uint8) de códigos de etiqueta, en el mismo orden.
+    """
+    if any(imagen.ndim != 3 or imagen.shape[2] != 3 for imagen in imagenes):
+        raise ValueError("Las imágenes deben tener forma HxWx3.")
+    hilos = hilos or HILOS
+    if clasificar is clasificar_con_tabla:
+        tabla_para(metrica)
+    salidas = [np.empty(imagen.shape[:2], dtype=np.uint8) for imagen in imagenes]
+    # Las franjas por hilo se reparten entre las imágenes del lote
+    hilos_por_imagen = max(1, -(-hilos // max(1, len(imagenes))))
+    partes = [
+        (imagen, salida, inicio, fin)
+        for imagen, salida in zip(imagenes, salidas)
+        for inicio, fin in franjas(imagen.shape[0], hilos_por_imagen)
+    ]
+
+    def trabajo(imagen, salida, inicio, fin):
+        salida[inicio:fin] = clasificar(imagen[inicio:fin], metrica)
+
+    _repartir(partes, hilos, trabajo)
+    return salidas
+
+# ----------------------------------------------------------
+# Función para Suavizar un Mapa por Franjas en Paralelo
+# ----------------------------------------------------------
+@instrumentar("filtro_moda_en_paralelo", pixeles_del_primero)
+def filtro_moda_en_paralelo(etiquetas, visitados=None, hilos=None):
+    """
+    Aplica filtro_moda() a un mapa ya clasificado repartiendo franjas entre varios hilos.
+
+    Args:
+    etiquetas (ndarray): Mapa HxW (uint8) de códigos de etiqueta.
+    visitados (ndarray): Máscara HxW (bool) opcional de píxeles válidos.
+    hilos (int): Hilos a usar; por omisión uno por núcleo.
+
+    Returns:
+    ndarray: Nuevo mapa HxW (uint8) suavizado, igual al de filtro_moda().
+    """
+    alto = etiquetas.shape[0]
+    resultado = np.empty_like(etiquetas)
+
+    def trabajo(inicio, fin):
+        borde_inicio, borde_fin = max(0, inicio - 1), min(alto, fin + 1)
+        mascara = None if visitados is None else visitados[borde_inicio:borde_fin]
+        suavizadas = filtro_moda(etiquetas[borde_inicio:borde_fin], mascara)
+        resultado[inicio:fin] = suavizadas[inicio - borde_inicio:fin - borde_inicio]
+
+    _en_franjas(alto, hilos or HILOS, trabajo)
+    return resultado
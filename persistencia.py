@@ -0,0 +1,157 @@
+# ----------------------------------------------------------
+# Persistencia Compacta de las Sesiones
+# ----------------------------------------------------------
+# Guarda el mapa de etiquetas y la máscara de visitados en un archivo
+# binario (.etq) con una cabecera JSON pequeña seguida de los arreglos sin
+# comprimir, alineados para poder abrirlos mapeados en memoria sin copiar.
+# Los archivos datos_*.json del formato anterior se siguen pudiendo leer.
+#
+# Estructura del archivo .etq:
+#   b"ETQ1" | longitud de la cabecera (uint32 little-endian) | cabecera JSON |
+#   relleno hasta múltiplo de 64 | etiquetas (alto*ancho uint8) | visitados (alto*ancho bool)
+# ----------------------------------------------------------
+
+# ----------------------------------------------------------
+# Importación de Bibliotecas
+# ----------------------------------------------------------
+import json  # Módulo para trabajar con archivos JSON
+import os  # Módulo para interactuar con el sistema operativo
+import struct  # Módulo para escribir la longitud de la cabecera en binario
+import numpy as np  # Biblioteca para trabajar con arreglos y operaciones matemáticas
+
+from clasificador import ETIQUETAS  # Textos de cada código de etiqueta
+from instrumentacion import instrumentar, pixeles_del_segundo  # Métricas opcionales por etapa
+from vecindad import crear_raster, diccionario_a_raster  # Mapa denso de etiquetas
+
+# ----------------------------------------------------------
+# Variables Globales
+# ----------------------------------------------------------
+MAGICO = b"ETQ1"
+ALINEACION = 64  # Los arreglos empiezan en un múltiplo de 64 bytes
+EXTENSION = ".etq"
+
+# ----------------------------------------------------------
+# Función para Guardar una Sesión en Formato Binario
+# ----------------------------------------------------------
+@instrumentar("guardar_sesion", pixeles_del_segundo)
+def guardar_sesion(ruta, etiquetas, visitados, valores_rgb):
+    """
+    Guarda el mapa de etiquetas y la máscara de visitados en un archivo .etq.
+
+    El archivo se escribe primero con un nombre temporal y luego se renombra,
+    así un lector nunca ve una sesión a medio escribir.
+
+    Args:
+    ruta (str): Ruta del archivo de destino.
+    etiquetas (ndarray): Mapa HxW (uint8) de códigos de etiqueta.
+    visitados (ndarray): Máscara HxW (bool) de píxeles visitados.
+    valores_rgb (dict): Valores RGB adicionales de la sesión.
+    """
+    alto, ancho = etiquetas.shape
+    cabecera = json.dumps({
+        "alto": alto,
+        "ancho": ancho,
+        "etiquetas": {str(codigo): frase for codigo, (frase, _) in ETIQUETAS.items()},
+        "valores_rgb": valores_rgb,
+    }, ensure_ascii=False).encode("utf-8")
+    inicio_datos = _alinear(len(MAGICO) + 4 + len(cabecera))
+
+    ruta_temporal = f"{ruta}.{os.getpid()}.tmp"
+    with open(ruta_temporal, "wb") as archivo:
+        archivo.write(MAGICO)
+        archivo.write(struct.pack("<I", len(cabecera)))
+        archivo.write(cabecera)
+        archivo.write(b"\0" * (inicio_datos - archivo.tell()))
+        archivo.write(np.ascontiguousarray(etiquetas, dtype=np.uint8).tobytes())
+        archivo.write(np.ascontiguousarray(visitados, dtype=bool).tobytes())
+    os.replace(ruta_temporal, ruta)
+
+# ----------------------------------------------------------
+# Función para Cargar una Sesión en Formato Binario
+# ----------------------------------------------------------
+@instrumentar("cargar_sesion")
+def cargar_sesion(ruta):
+    """
+    Abre un archivo .etq mapeado en memoria, sin copiar los arreglos.
+
+    Los arreglos se abren en modo copia-al-escribir: se pueden modificar en
+    memoria sin alterar el archivo.
+
+    Args:
+    ruta (str): Ruta del archivo .etq.
+
+    Returns:
+    tuple: (valores_rgb, etiquetas, visitados).
+    """
+    with open(ruta, "rb") as archivo:
+        if archivo.read(len(MAGICO)) != MAGICO:
+            raise ValueError(f"El archivo no es una sesión {EXTENSION}: {ruta}")
+        (longitud,) = struct.unpack("<I", archivo.read(4))
+        cabecera = json.loads(archivo.read(longitud).decode("utf-8"))
+
+    forma = (cabecera["alto"], cabecera["ancho"])
+    inicio_datos = _alinear(len(MAGICO) + 4 + longitud)
+    tamano = forma[0] * forma[1]
+    etiquetas = np.memmap(ruta, dtype=np.uint8, mode="c", offset=inicio_datos, shape=forma)
+    visitados = np.memmap(ruta, dtype=bool, mode="c", offset=inicio_datos + tamano, shape=forma)
+    return cabecera.get("valores_rgb", {}), etiquetas, visitados
+
+# ----------------------------------------------------------
+# Función para Cargar una Sesión del Formato JSON Anterior
+# ----------------------------------------------------------
+@instrumentar("cargar_sesion_json")
+def cargar_sesion_json(ruta, alto, ancho):
+    """
+    Lee un archivo datos_*.json y convierte sus claves "(x, y)" al mapa de etiquetas.
+
+    Args:
+    ruta (str): Ruta del archivo JSON.
+    alto (int): Alto de la imagen en píxeles.
+    ancho (int): Ancho de la imagen en píxeles.
+
+    Returns:
+    tuple: (valores_rgb, etiquetas, visitados).
+    """
+    with open(ruta, "r") as archivo:
+        datos = json.load(archivo)
+    etiquetas, visitados = crear_raster(alto, ancho)
+    diccionario_a_raster(datos.get("colores_circundantes", {}), etiquetas, visitados)
+    return datos.get("valores_rgb", {}), etiquetas, visitados
+
+# ----------------------------------------------------------
+# Función para Cargar una Sesión de Cualquier Formato
+# ----------------------------------------------------------
+def cargar_datos(ruta, alto, ancho):
+    """
+    Carga una sesión .etq o .json y comprueba que coincida con el tamaño de la imagen.
+
+    Args:
+    ruta (str): Ruta del archivo de la sesión.
+    alto (int): Alto de la imagen en píxeles.
+    ancho (int): Ancho de la imagen en píxeles.
+
+    Returns:
+    tuple: (valores_rgb, etiquetas, visitados). Si la sesión es de otro tamaño,
+        se devuelve un mapa vacío.
+    """
+    if ruta.endswith(EXTENSION):
+        valores_rgb, etiquetas, visitados = cargar_sesion(ruta)
+        if etiquetas.shape == (alto, ancho):
+            return valores_rgb, etiquetas, visitados
+        return valores_rgb, *crear_raster(alto, ancho)
+    return cargar_sesion_json(ruta, alto, ancho)
+
+# ----------------------------------------------------------
+# Función para Alinear Desplazamientos
+# ----------------------------------------------------------
+def _alinear(desplazamiento):
+    """
+    Redondea un desplazamiento hacia arriba al siguiente múltiplo de ALINEACION.
+
+    Args:
+    desplazamiento (int): Desplazamiento en bytes.
+
+    Returns:
+    int: Desplazamiento alineado.
+    """
+    return -(-desplazamiento // ALINEACION) * ALINEACION
@@ -0,0 +1,107 @@
+# ----------------------------------------------------------
+# Clasificación por Región (una por Manzana)
+# ----------------------------------------------------------
+# Segmenta todas las manzanas de una imagen con componentes conexas sobre
+# el mapa de etiquetas y decide el color de cada una por votación de sus
+# píxeles, en lugar de decidir con un solo píxel bajo el cursor.
+# ----------------------------------------------------------
+
+# ----------------------------------------------------------
+# Importación de Bibliotecas
+# ----------------------------------------------------------
+import cv2  # OpenCV, una biblioteca de visión por computadora
+import numpy as np  # Biblioteca para trabajar con arreglos y operaciones matemáticas
+
+from clasificador import ETIQUETAS, FONDO  # Códigos de etiqueta
+from instrumentacion import instrumentar, pixeles_del_primero  # Métricas opcionales por etapa
+from tablas import clasificar_con_tabla  # Clasificación con tablas precalculadas
+
+# ----------------------------------------------------------
+# Variables Globales
+# ----------------------------------------------------------
+AREA_MINIMA = 200  # Área mínima (píxeles) para considerar una región como manzana
+
+# ----------------------------------------------------------
+# Función para Segmentar y Clasificar Regiones
+# ----------------------------------------------------------
+@instrumentar("regiones", pixeles_del_primero)
+def regiones_desde_etiquetas(etiquetas, area_minima=AREA_MINIMA, cerrar=3):
+    """
+    Separa las manzanas de un mapa de etiquetas y vota el color de cada una.
+
+    Todos los píxeles que no son fondo forman la máscara de fruta, así una
+    manzana con zonas de dos colores sigue siendo una sola región.
+
+    Args:
+    etiquetas (ndarray): Mapa HxW (uint8) de códigos de etiqueta.
+    area_minima (int): Área mínima de una región para devolverla.
+    cerrar (int): Tamaño del cierre morfológico que une huecos pequeños (0 para omitirlo).
+
+    Returns:
+    list: Un diccionario por manzana con las claves "bbox" ([x, y, ancho, alto]),
+        "area", "color" y "confianza" (fracción de píxeles que votaron por el color).
+    """
+    mascara = (etiquetas != FONDO).view(np.uint8)
+    if cerrar:
+        elemento = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (cerrar, cerrar))
+        mascara = cv2.morphologyEx(mascara, cv2.MORPH_CLOSE, elemento)
+
+    numero, componentes, estadisticas, _ = cv2.connectedComponentsWithStats(mascara, connectivity=8)
+    if numero <= 1:
+        return []
+
+    # Votación vectorizada: un histograma de etiquetas por componente en una sola pasada
+    codigos = len(ETIQUETAS)
+    votos = np.bincount(
+        componentes.ravel() * codigos + etiquetas.ravel(), minlength=numero * codigos
+    ).reshape(numero, codigos)
+    votos[:, FONDO] = 0
+
+    resultado = []
+    for componente in range(1, numero):
+        x, y, ancho, alto, area = (int(valor) for valor in estadisticas[componente])
+        if area < area_minima:
+            continue
+        codigo = int(np.argmax(votos[componente]))
+        resultado.append({
+            "bbox": [x, y, ancho, alto],
+            "area": area,
+            "color": ETIQUETAS[codigo][1],
+            "confianza": round(float(votos[componente, codigo]) / area, 4),
+        })
+    return resultado
+
+# ----------------------------------------------------------
+# Función para Segmentar una Imagen RGB
+# ----------------------------------------------------------
+def segmentar_manzanas(imagen, metrica, area_minima=AREA_MINIMA):
+    """
+    Clasifica una imagen y devuelve una entrada por cada manzana encontrada.
+
+    Args:
+    imagen (ndarray): Arreglo HxWx3 (uint8) con los canales en orden RGB.
+    metrica (float): Parámetro de la distancia de Minkowski.
+    area_minima (int): Área mínima de una región para devolverla.
+
+    Returns:
+    list: Un diccionario por manzana (ver regiones_desde_etiquetas()).
+    """
+    return regiones_desde_etiquetas(clasificar_con_tabla(imagen, metrica), area_minima)
+
+# ----------------------------------------------------------
+# Función para Contar Manzanas por Color
+# ----------------------------------------------------------
+def contar_por_color(regiones):
+    """
+    Cuenta cuántas regiones hay de cada color de manzana.
+
+    Args:
+    regiones (list): Resultado de regiones_desde_etiquetas().
+
+    Returns:
+    dict: Número de manzanas por color, por ejemplo {"rojo": 2, "verde": 0, ...}.
+    """
+    conteo = {color: 0 for codigo, (_, color) in ETIQUETAS.items() if codigo != FONDO}
+    for region in regiones:
+        conteo[region["color"]] += 1
+    return conteo
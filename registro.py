@@ -0,0 +1,295 @@
+# ----------------------------------------------------------
+# Registro de Prototipos y Ajuste por K-Medias en Flujo
+# ----------------------------------------------------------
+# Los prototipos y compuertas se leen de un archivo JSON en lugar de estar
+# fijos en el código. El comando "ajustar" aprende prototipos a partir de
+# píxeles de muestra etiquetados con k-medias por mini-lotes, leyendo las
+# muestras por partes para no cargar millones de píxeles a la vez.
+#
+# Uso:
+#   python registro.py exportar --salida prototipos.json
+#   python registro.py ajustar --muestra rojo recortes/rojas --muestra verde recortes/verdes \
+#       --muestra amarillo recortes/amarillas --muestra fondo recortes/fondo -k 4 --salida mis_prototipos.json
+#   MANZANAS_PROTOTIPOS=mis_prototipos.json python lote.py fotos/
+#   MANZANAS_ESPACIO=lab python lote.py fotos/
+# ----------------------------------------------------------
+
+# ----------------------------------------------------------
+# Importación de Bibliotecas
+# ----------------------------------------------------------
+import argparse  # Módulo para leer los argumentos de la línea de comandos
+import json  # Módulo para trabajar con archivos JSON
+import os  # Módulo para interactuar con el sistema operativo
+
+import numpy as np  # Biblioteca para trabajar con arreglos y operaciones matemáticas
+
+import clasificador  # Conjunto de prototipos activo
+from clasificador import AMARILLO, FONDO, ROJO, VERDE  # Códigos de etiqueta
+from distancias import prototipo_mas_cercano  # Asignación de cada muestra a su centro
+from espacios_color import espacio_desde_texto  # Nombre del espacio de color
+
+# ----------------------------------------------------------
+# Variables Globales
+# ----------------------------------------------------------
+CODIGOS = {"fondo": FONDO, "rojo": ROJO, "verde": VERDE, "amarillo": AMARILLO}
+NOMBRES_CODIGO = {codigo: nombre for nombre, codigo in CODIGOS.items()}
+TAMANO_LOTE = 65536  # Píxeles por mini-lote
+EXTENSIONES_IMAGEN = (".jpg", ".jpeg", ".png", ".bmp", ".tif", ".tiff", ".webp")
+
+# ----------------------------------------------------------
+# Funciones para Leer y Escribir el Registro
+# ----------------------------------------------------------
+def cargar_registro(ruta):
+    """
+    Lee un archivo de prototipos y lo convierte al formato de clasificador.PROTOTIPOS.
+
+    Args:
+    ruta (str): Ruta del archivo JSON.
+
+    Returns:
+    tuple: Entradas (nombre, prototipo RGB, inferiores, superiores, código).
+    """
+    with open(ruta, "r", encoding="utf-8") as archivo:
+        datos = json.load(archivo)
+
+    prototipos = []
+    for entrada in datos["prototipos"]:
+        if entrada["etiqueta"] not in CODIGOS:
+            raise ValueError(f"Etiqueta desconocida en {ruta}: {entrada['etiqueta']}")
+        valores = [*entrada["rgb"], *entrada["inferior"], *entrada["superior"]]
+        if len(valores) != 9 or any(not isinstance(valor, int) for valor in valores):
+            raise ValueError(f"El prototipo {entrada['nombre']} debe tener tres enteros en rgb, inferior y superior.")
+        prototipos.append((
+            entrada["nombre"], tuple(entrada["rgb"]), tuple(entrada["inferior"]),
+            tuple(entrada["superior"]), CODIGOS[entrada["etiqueta"]],
+        ))
+    if not prototipos:
+        raise ValueError(f"El archivo {ruta} no tiene prototipos.")
+    return tuple(prototipos)
+
+def guardar_registro(ruta, prototipos):
+    """
+    Escribe un conjunto de prototipos en un archivo JSON.
+
+    Args:
+    ruta (str): Ruta del archivo JSON.
+    prototipos (tuple): Entradas (nombre, prototipo RGB, inferiores, superiores, código).
+    """
+    entradas = [
+        json.dumps({
+            "nombre": nombre,
+            "etiqueta": NOMBRES_CODIGO[codigo],
+            "rgb": [int(v) for v in rgb],
+            "inferior": [int(v) for v in inferior],
+            "superior": [int(v) for v in superior],
+        }, ensure_ascii=False)
+        for nombre, rgb, inferior, superior, codigo in prototipos
+    ]
+    # Un prototipo por línea, para que el archivo sea fácil de leer y editar a mano
+    with open(ruta, "w", encoding="utf-8") as archivo:
+        archivo.write('{"prototipos": [\n  ' + ",\n  ".join(entradas) + "\n]}\n")
+
+def activar_registro(ruta=None, espacio=None):
+    """
+    Activa los prototipos de un archivo, o los de MANZANAS_PROTOTIPOS si no se indica ninguno,
+    y el espacio de color indicado o el de MANZANAS_ESPACIO.
+
+    Args:
+    ruta (str): Ruta del archivo JSON; si es None y la variable no existe, no cambia nada.
+    espacio (str): Espacio de color de las distancias; si es None y la variable no existe, no cambia.
+    """
+    ruta = ruta or os.environ.get("MANZANAS_PROTOTIPOS")
+    if ruta:
+        clasificador.activar_prototipos(cargar_registro(ruta))
+    espacio = espacio or os.environ.get("MANZANAS_ESPACIO")
+    if espacio:
+        clasificador.activar_espacio(espacio_desde_texto(espacio))
+
+# ----------------------------------------------------------
+# Función para Leer Muestras por Mini-Lotes
+# ----------------------------------------------------------
+def leer_muestras(rutas, tamano_lote=TAMANO_LOTE):
+    """
+    Recorre archivos de muestras y produce lotes de píxeles RGB.
+
+    Se aceptan imágenes (los píxeles transparentes se ignoran, así un recorte
+    con canal alfa marca qué píxeles son muestra) y archivos .npy de forma
+    (N, 3), que se leen mapeados en memoria.
+
+    Args:
+    rutas (list): Archivos o directorios de muestras.
+    tamano_lote (int): Píxeles por lote.
+
+    Yields:
+    ndarray: Lote (B, 3) de píxeles uint8.
+    """
+    import cv2  # Sólo hace falta para leer imágenes de muestra
+
+    archivos = []
+    for ruta in rutas:
+        if os.path.isdir(ruta):
+            archivos.extend(sorted(
+                os.path.join(ruta, nombre) for nombre in os.listdir(ruta)
+                if nombre.lower().endswith(EXTENSIONES_IMAGEN + (".npy",))
+            ))
+        else:
+            archivos.append(ruta)
+
+    for archivo in archivos:
+        if archivo.lower().endswith(".npy"):
+            pixeles = np.load(archivo, mmap_mode="r").reshape(-1, 3)
+        else:
+            imagen = cv2.imread(archivo, cv2.IMREAD_UNCHANGED)
+            if imagen is None:
+                continue
+            if imagen.ndim == 2:
+                imagen = cv2.cvtColor(imagen, cv2.COLOR_GRAY2BGR)
+            if imagen.shape[2] == 4:
+                pixeles = imagen[imagen[..., 3] > 0][:, 2::-1]
+            else:
+                pixeles = imagen.reshape(-1, 3)[:, ::-1]
+        for inicio in range(0, len(pixeles), tamano_lote):
+            yield np.asarray(pixeles[inicio:inicio + tamano_lote], dtype=np.uint8)
+
+# ----------------------------------------------------------
+# Función de K-Medias por Mini-Lotes
+# ----------------------------------------------------------
+def kmedias_por_lotes(lotes, k, metrica=2, pasadas=2, semilla=0):
+    """
+    Ajusta k centros con k-medias por mini-lotes (Sculley, 2010).
+
+    Cada centro se mueve hacia la media de los píxeles que se le asignan con
+    un paso 1/n, donde n es el total de píxeles que ha recibido; así sólo se
+    guarda en memoria un lote a la vez.
+
+    Args:
+    lotes (callable): Función sin argumentos que devuelve un iterador de lotes (B, 3).
+    k (int): Número de centros.
+    metrica (float): Parámetro de Minkowski para asignar cada píxel a un centro.
+    pasadas (int): Número de recorridos completos de las muestras.
+    semilla (int): Semilla de la inicialización.
+
+    Returns:
+    tuple: (centros (k, 3) float64, conteos (k,) de píxeles asignados).
+    """
+    generador = np.random.default_rng(semilla)
+    centros = None
+    conteos = np.zeros(k, dtype=np.int64)
+
+    for _ in range(pasadas):
+        for lote in lotes():
+            lote = lote.astype(np.float64)
+            if centros is None:
+                centros = _inicializar_centros(lote, k, generador)
+            indices, _ = prototipo_mas_cercano(lote, centros, metrica)
+            cantidades = np.bincount(indices, minlength=k)
+            sumas = np.stack([np.bincount(indices, weights=lote[:, canal], minlength=k) for canal in range(3)], axis=1)
+
+            conteos += cantidades
+            recibieron = cantidades > 0
+            centros[recibieron] += (
+                sumas[recibieron] - cantidades[recibieron, None] * centros[recibieron]
+            ) / conteos[recibieron, None]
+
+    if centros is None:
+        raise ValueError("No se encontraron píxeles de muestra.")
+    return centros, conteos
+
+def _inicializar_centros(lote, k, generador):
+    """
+    Elige k centros iniciales del primer lote con la siembra de k-medias++.
+
+    Args:
+    lote (ndarray): Primer lote (B, 3) de píxeles.
+    k (int): Número de centros.
+    generador (np.random.Generator): Generador de números aleatorios.
+
+    Returns:
+    ndarray: Centros iniciales (k, 3).
+    """
+    centros = [lote[generador.integers(len(lote))]]
+    distancia = ((lote - centros[0]) ** 2).sum(axis=1)
+    for _ in range(1, k):
+        total = distancia.sum()
+        indice = generador.choice(len(lote), p=distancia / total) if total > 0 else generador.integers(len(lote))
+        centros.append(lote[indice])
+        distancia = np.minimum(distancia, ((lote - lote[indice]) ** 2).sum(axis=1))
+    return np.array(centros, dtype=np.float64)
+
+# ----------------------------------------------------------
+# Función para Aprender un Conjunto de Prototipos
+# ----------------------------------------------------------
+def ajustar_prototipos(muestras, k, metrica=2, pasadas=2):
+    """
+    Aprende k prototipos por etiqueta a partir de muestras etiquetadas.
+
+    Cada prototipo aprendido hereda la compuerta del primer prototipo activo
+    con la misma etiqueta; si no hay ninguno, su compuerta deja pasar todo.
+
+    Args:
+    muestras (dict): Etiqueta ("rojo", "verde", "amarillo", "fondo") -> lista de rutas.
+    k (int): Prototipos por etiqueta.
+    metrica (float): Parámetro de Minkowski de la asignación.
+    pasadas (int): Recorridos completos de las muestras.
+
+    Returns:
+    tuple: Entradas (nombre, prototipo RGB, inferiores, superiores, código).
+    """
+    compuertas = {}
+    for _, _, inferior, superior, codigo in clasificador.PROTOTIPOS:
+        compuertas.setdefault(codigo, (inferior, superior))
+
+    prototipos = []
+    for etiqueta, rutas in muestras.items():
+        codigo = CODIGOS[etiqueta]
+        centros, conteos = kmedias_por_lotes(lambda: leer_muestras(rutas), k, metrica, pasadas)
+        inferior, superior = compuertas.get(codigo, ((-1, -1, -1), (256, 256, 256)))
+        # Los centros más poblados van primero: ganan los empates
+        for posicion, indice in enumerate(np.argsort(-conteos, kind="stable")):
+            if conteos[indice] == 0:
+                continue
+            rgb = tuple(int(v) for v in np.clip(np.rint(centros[indice]), 0, 255))
+            prototipos.append((f"{etiqueta.capitalize()} {posicion + 1}", rgb, inferior, superior, codigo))
+    return tuple(prototipos)
+
+# ----------------------------------------------------------
+# Función Principal
+# ----------------------------------------------------------
+def main(argumentos=None):
+    """
+    Punto de entrada de la línea de comandos.
+
+    Args:
+    argumentos (list): Argumentos a interpretar; por omisión los de sys.argv.
+    """
+    parser = argparse.ArgumentParser(description="Registro de prototipos de color.")
+    comandos = parser.add_subparsers(dest="comando", required=True)
+
+    exportar = comandos.add_parser("exportar", help="Escribir el conjunto activo en un archivo.")
+    exportar.add_argument("--salida", default="prototipos.json", help="Archivo JSON de destino.")
+
+    ajustar = comandos.add_parser("ajustar", help="Aprender prototipos de muestras etiquetadas.")
+    ajustar.add_argument("--muestra", nargs=2, action="append", required=True, metavar=("ETIQUETA", "RUTA"),
+                         help="Etiqueta (rojo, verde, amarillo o fondo) y archivo o directorio de muestras.")
+    ajustar.add_argument("-k", type=int, default=3, help="Prototipos por etiqueta.")
+    ajustar.add_argument("--metrica", type=clasificador.metrica_desde_texto, default=2, help="Parámetro p de la asignación.")
+    ajustar.add_argument("--pasadas", type=int, default=2, help="Recorridos completos de las muestras.")
+    ajustar.add_argument("--salida", default="prototipos_aprendidos.json", help="Archivo JSON de destino.")
+    args = parser.parse_args(argumentos)
+
+    activar_registro()
+    if args.comando == "exportar":
+        guardar_registro(args.salida, clasificador.PROTOTIPOS)
+        return
+
+    muestras = {}
+    for etiqueta, ruta in args.muestra:
+        if etiqueta not in CODIGOS:
+            parser.error(f"Etiqueta desconocida: {etiqueta}")
+        muestras.setdefault(etiqueta, []).append(ruta)
+    prototipos = ajustar_prototipos(muestras, args.k, args.metrica, args.pasadas)
+    guardar_registro(args.salida, prototipos)
+    print(f"{len(prototipos)} prototipos guardados en {args.salida}.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,441 @@
+# ----------------------------------------------------------
+# Servicio HTTP Local de Clasificación
+# ----------------------------------------------------------
+# Permite que otros programas de la estación envíen fotogramas por HTTP y
+# reciban una entrada JSON por manzana. Cada conexión se atiende en su hilo
+# (decodificación, detectar_forma() y segmentación liberan el GIL dentro de
+# OpenCV), y las imágenes que llegan casi al mismo tiempo forman un lote que
+# se clasifica por franjas en todos los núcleos, con las tablas abiertas
+# entre peticiones. Sólo se aceptan las métricas indicadas al iniciar.
+#
+# Uso:
+#   python servicio.py servir --puerto 8765 --metrica 2
+#   curl --data-binary @foto.jpg "http://127.0.0.1:8765/clasificar?metrica=2"
+#   curl -F imagen=@a.jpg -F imagen=@b.jpg http://127.0.0.1:8765/clasificar
+#   python servicio.py enviar fotos/*.jpg --concurrentes 8
+# ----------------------------------------------------------
+
+# ----------------------------------------------------------
+# Importación de Bibliotecas
+# ----------------------------------------------------------
+import argparse  # Módulo para leer los argumentos de la línea de comandos
+import json  # Módulo para trabajar con JSON
+import os  # Módulo para leer variables de entorno
+import queue  # Cola de imágenes pendientes de clasificar
+import threading  # Hilo que agrupa las peticiones en lotes
+import time  # Módulo para medir tiempos y latencias
+import urllib.parse  # Lectura de los parámetros de la URL
+import urllib.request  # Cliente HTTP de prueba
+from concurrent.futures import Future, ThreadPoolExecutor  # Resultados pendientes y clientes concurrentes
+from email.parser import BytesParser  # Lectura de cuerpos multipart/form-data
+from email.policy import HTTP  # Reglas de cabeceras HTTP para el analizador de correo
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer  # Servidor HTTP con un hilo por conexión
+
+import cv2  # OpenCV, una biblioteca de visión por computadora
+import numpy as np  # Biblioteca para trabajar con arreglos y operaciones matemáticas
+
+import instrumentacion  # Métricas opcionales por etapa
+from cache_resultados import buscar_resultado, configurar_cache, estadisticas_cache, guardar_resultado, huella_contenido  # Caché por contenido
+import clasificador  # Espacio de color activo
+from clasificador import ETIQUETAS, metrica_desde_texto  # Códigos de etiqueta y lectura del parámetro p
+from espacios_color import espacio_desde_texto  # Espacio de color de las distancias
+from nucleo import detectar_forma  # Detección de forma sin interfaz gráfica
+from paralelo import clasificar_varias_en_paralelo  # Clasificación por franjas en varios núcleos
+from registro import activar_registro  # Conjunto de prototipos configurable
+from regiones import AREA_MINIMA, contar_por_color, regiones_desde_etiquetas  # Una región por manzana
+from tablas import huella_prototipos, tabla_para  # Clasificación con tablas precalculadas
+
+# ----------------------------------------------------------
+# Variables Globales
+# ----------------------------------------------------------
+PUERTO = 8765
+ESPERA_LOTE = 0.005  # Segundos que se esperan más imágenes después de la primera de un lote
+IMAGENES_POR_LOTE = 16  # Imágenes como máximo en una misma clasificación
+TAMANO_MAXIMO = 64 * 1024 * 1024  # Bytes como máximo en el cuerpo de una petición
+pendientes = queue.Queue()  # Tuplas (imagen RGB, métrica, Future) esperando su lote
+# Métricas con la tabla abierta al iniciar: sólo ésas se aceptan, así ningún cliente
+# puede obligar a construir una tabla nueva mientras los demás esperan su lote
+configuracion = {"metrica": 1, "metricas": (1,), "area_minima": AREA_MINIMA}
+
+# ----------------------------------------------------------
+# Función para Clasificar un Lote de Imágenes
+# ----------------------------------------------------------
+@instrumentacion.instrumentar("lote_servicio")
+def clasificar_lote(imagenes, metrica):
+    """
+    Clasifica las imágenes de un lote en una sola pasada por franjas.
+
+    Las imágenes no se copian: las franjas de todas van juntas al mismo grupo
+    de hilos, cada una consulta la tabla sobre una vista de su imagen y la
+    consulta libera el GIL, así los núcleos no esperan entre una imagen y otra.
+
+    Args:
+    imagenes (list): Arreglos HxWx3 (uint8, RGB) de tamaños cualesquiera.
+    metrica (float): Parámetro de la distancia de Minkowski.
+
+    Returns:
+    list: Mapas HxW (uint8) de códigos de etiqueta, en el mismo orden.
+    """
+    return clasificar_varias_en_paralelo(imagenes, metrica)
+
+# ----------------------------------------------------------
+# Función del Hilo que Agrupa las Peticiones
+# ----------------------------------------------------------
+def _agrupar_peticiones(espera=ESPERA_LOTE, maximo=IMAGENES_POR_LOTE):
+    """
+    Toma imágenes de la cola, las junta por métrica y las clasifica en lotes.
+
+    Después de la primera imagen se esperan hasta "espera" segundos a que
+    lleguen otras, así las peticiones simultáneas comparten una pasada.
+
+    Args:
+    espera (float): Segundos de espera para completar un lote.
+    maximo (int): Imágenes como máximo en un lote.
+    """
+    while True:
+        lote = [pendientes.get()]
+        limite = time.monotonic() + espera
+        while len(lote) < maximo:
+            restante = limite - time.monotonic()
+            if restante <= 0:
+                break
+            try:
+                lote.append(pendientes.get(timeout=restante))
+            except queue.Empty:
+                break
+
+        por_metrica = {}
+        for imagen, metrica, futuro in lote:
+            por_metrica.setdefault(metrica, []).append((imagen, futuro))
+        for metrica, grupo in por_metrica.items():
+            try:
+                etiquetas = clasificar_lote([imagen for imagen, _ in grupo], metrica)
+            except Exception as error:
+                for _, futuro in grupo:
+                    futuro.set_exception(error)
+                continue
+            for (_, futuro), resultado in zip(grupo, etiquetas):
+                futuro.set_result(resultado)
+
+# ----------------------------------------------------------
+# Función para Preparar una Imagen Recibida
+# ----------------------------------------------------------
+def _preparar_imagen(nombre, datos, metrica):
+    """
+    Busca una imagen en la caché o, si no está, la decodifica.
+
+    Args:
+    nombre (str): Nombre de la imagen en la respuesta.
+    datos (bytes): Contenido del archivo (JPEG, PNG, ...).
+    metrica (float): Parámetro de la distancia de Minkowski.
+
+    Returns:
+    dict: Estado de la imagen: "guardado" si ya estaba en la caché o "imagen_bgr"
+        si hay que clasificarla; con la clave "error" si no se pudo decodificar.
+    """
+    huella = huella_contenido(datos)
+    estado = {"imagen": nombre, "huella": huella}
+    guardado = buscar_resultado(huella, metrica)
+    if guardado is not None:
+        estado["guardado"] = guardado
+        return estado
+
+    imagen_bgr = cv2.imdecode(np.frombuffer(datos, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if imagen_bgr is None:
+        return {"imagen": nombre, "error": "No se pudo decodificar la imagen."}
+    estado["imagen_bgr"] = imagen_bgr
+    return estado
+
+# ----------------------------------------------------------
+# Función para Analizar las Imágenes de una Petición
+# ----------------------------------------------------------
+def analizar_imagenes(archivos, metrica, area_minima):
+    """
+    Clasifica juntas las imágenes de una petición y segmenta sus manzanas.
+
+    Todas se decodifican y se encolan juntas antes de esperar a la primera,
+    así comparten un lote en lugar de esperar cada una el suyo.
+
+    Args:
+    archivos (list): Pares (nombre, bytes) de las imágenes recibidas.
+    metrica (float): Parámetro de la distancia de Minkowski.
+    area_minima (int): Área mínima de una manzana en píxeles.
+
+    Returns:
+    list: Resultado de cada imagen, o un diccionario con la clave "error", en el mismo orden.
+    """
+    estados = [_preparar_imagen(nombre, datos, metrica) for nombre, datos in archivos]
+    for estado in estados:
+        if "imagen_bgr" in estado:
+            estado["futuro"] = Future()
+            pendientes.put((estado["imagen_bgr"][..., ::-1], metrica, estado["futuro"]))
+    # detectar_forma() no depende de la clasificación: corre mientras el lote se clasifica
+    for estado in estados:
+        if "imagen_bgr" in estado:
+            estado["forma"] = detectar_forma(estado["imagen_bgr"])
+    for estado in estados:
+        if "futuro" in estado:
+            estado["etiquetas"] = estado.pop("futuro").result()
+
+    resultados = []
+    for estado in estados:
+        if "error" in estado:
+            resultados.append(estado)
+            continue
+        if "guardado" in estado:
+            etiquetas, resultado = estado["guardado"]
+            if area_minima >= AREA_MINIMA:
+                # La caché guarda las manzanas de AREA_MINIMA: un área mayor sólo filtra
+                manzanas = [manzana for manzana in resultado["manzanas"] if manzana["area"] >= area_minima]
+            else:
+                manzanas = regiones_desde_etiquetas(etiquetas, area_minima)
+        else:
+            imagen_bgr, etiquetas = estado["imagen_bgr"], estado["etiquetas"]
+            todas = regiones_desde_etiquetas(etiquetas, min(area_minima, AREA_MINIMA))
+            manzanas = [manzana for manzana in todas if manzana["area"] >= area_minima]
+            conteo = np.bincount(etiquetas.ravel(), minlength=len(ETIQUETAS))
+            # Mismo formato que las entradas de lote.py, así ambos pueden compartir el directorio
+            resultado = {
+                "alto": int(imagen_bgr.shape[0]),
+                "ancho": int(imagen_bgr.shape[1]),
+                "forma": estado["forma"],
+                "pixeles": {ETIQUETAS[codigo][0]: int(conteo[codigo]) for codigo in ETIQUETAS},
+                "manzanas": [manzana for manzana in todas if manzana["area"] >= AREA_MINIMA],
+            }
+            guardar_resultado(estado["huella"], metrica, etiquetas, resultado)
+
+        resultados.append({
+            "imagen": estado["imagen"],
+            "alto": resultado["alto"],
+            "ancho": resultado["ancho"],
+            "forma": resultado["forma"],
+            "conteo": contar_por_color(manzanas),
+            "manzanas": manzanas,
+        })
+    return resultados
+
+# ----------------------------------------------------------
+# Función para Separar las Imágenes de un Cuerpo multipart
+# ----------------------------------------------------------
+def partes_multipart(tipo, cuerpo):
+    """
+    Extrae los archivos de un cuerpo multipart/form-data.
+
+    Args:
+    tipo (str): Cabecera Content-Type completa (con el boundary).
+    cuerpo (bytes): Cuerpo de la petición.
+
+    Returns:
+    list: Pares (nombre, bytes) de cada parte con contenido.
+    """
+    mensaje = BytesParser(policy=HTTP).parsebytes(f"Content-Type: {tipo}\r\n\r\n".encode("latin-1") + cuerpo)
+    partes = []
+    for numero, parte in enumerate(mensaje.iter_parts()):
+        datos = parte.get_payload(decode=True)
+        if datos:
+            nombre = parte.get_filename() or parte.get_param("name", header="content-disposition") or f"parte_{numero}"
+            partes.append((nombre, datos))
+    return partes
+
+# ----------------------------------------------------------
+# Manejador de las Peticiones HTTP
+# ----------------------------------------------------------
+class ManejadorClasificacion(BaseHTTPRequestHandler):
+    """
+    Atiende GET /salud, GET /metricas y POST /clasificar.
+    """
+    protocol_version = "HTTP/1.1"  # Conexiones persistentes para los clientes que envían muchos fotogramas
+
+    def _responder(self, codigo, contenido, tipo="application/json"):
+        cuerpo = contenido if isinstance(contenido, bytes) else json.dumps(contenido, ensure_ascii=False).encode("utf-8")
+        self.send_response(codigo)
+        self.send_header("Content-Type", f"{tipo}; charset=utf-8")
+        self.send_header("Content-Length", str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def do_GET(self):
+        ruta = urllib.parse.urlsplit(self.path).path
+        if ruta == "/salud":
+            metrica = configuracion["metrica"]
+            self._responder(200, {
+                "estado": "ok",
+                "metrica": str(metrica),
+                "prototipos": huella_prototipos(metrica),
+                "espacio": clasificador.ESPACIO_COLOR,
+                "cache": estadisticas_cache(),
+            })
+        elif ruta == "/metricas" and instrumentacion.activa:
+            self._responder(200, instrumentacion.a_prometheus().encode("utf-8"), "text/plain; version=0.0.4")
+        else:
+            self._responder(404, {"error": "Ruta desconocida."})
+
+    def do_POST(self):
+        direccion = urllib.parse.urlsplit(self.path)
+        if direccion.path != "/clasificar":
+            self._responder(404, {"error": "Ruta desconocida."})
+            return
+        longitud = int(self.headers.get("Content-Length") or 0)
+        if not 0 < longitud <= TAMANO_MAXIMO:
+            self._responder(413 if longitud else 411, {"error": "Cuerpo vacío o demasiado grande."})
+            return
+
+        parametros = urllib.parse.parse_qs(direccion.query)
+        try:
+            metrica = metrica_desde_texto(parametros.get("metrica", [configuracion["metrica"]])[0])
+            try:
+                area_minima = int(parametros.get("area_minima", [configuracion["area_minima"]])[0])
+            except ValueError:
+                raise ValueError("area_minima debe ser un entero.") from None
+            if metrica not in configuracion["metricas"]:
+                disponibles = ", ".join(str(valor) for valor in configuracion["metricas"])
+                raise ValueError(f"Métrica no disponible en este servicio (se admite {disponibles}).")
+        except ValueError as error:
+            # El cuerpo queda sin leer: la conexión no puede reutilizarse
+            self.close_connection = True
+            self._responder(400, {"error": str(error)})
+            return
+
+        inicio = time.perf_counter()
+        cuerpo = self.rfile.read(longitud)
+        tipo = self.headers.get("Content-Type", "")
+        if tipo.startswith("multipart/form-data"):
+            archivos = partes_multipart(tipo, cuerpo)
+        else:
+            archivos = [(parametros.get("nombre", ["imagen"])[0], cuerpo)]
+        if not archivos:
+            self._responder(400, {"error": "La petición no contiene imágenes."})
+            return
+
+        try:
+            resultados = analizar_imagenes(archivos, metrica, area_minima)
+        except Exception as error:
+            self._responder(500, {"error": f"{type(error).__name__}: {error}"})
+            return
+        codigo = 422 if all("error" in resultado for resultado in resultados) else 200
+        self._responder(codigo, {
+            "metrica": str(metrica),
+            "latencia_ms": round(1000 * (time.perf_counter() - inicio), 2),
+            "resultados": resultados,
+        })
+
+    def log_message(self, formato, *argumentos):
+        # Sin una línea por petición: con muchos fotogramas por segundo sólo estorba
+        pass
+
+# ----------------------------------------------------------
+# Función para Iniciar el Servicio
+# ----------------------------------------------------------
+def iniciar_servicio(direccion="127.0.0.1", puerto=PUERTO, metricas=(1,), ruta_prototipos=None,
+                     area_minima=AREA_MINIMA, cache_bytes=None, directorio_cache=None, espacio=None):
+    """
+    Prepara los prototipos y las tablas y crea el servidor (sin empezar a atender).
+
+    Args:
+    direccion (str): Dirección de escucha; por omisión sólo la máquina local.
+    puerto (int): Puerto de escucha (0 elige uno libre).
+    metricas (tuple): Métricas aceptadas, con sus tablas abiertas de antemano; la primera es la predeterminada.
+    ruta_prototipos (str): Archivo de prototipos a activar, o None para los predeterminados.
+    area_minima (int): Área mínima predeterminada de una manzana.
+    cache_bytes (int): Memoria máxima de la caché de resultados, o None para la predeterminada.
+    directorio_cache (str): Directorio de la copia en disco de la caché, o None.
+    espacio (str): Espacio de color de las distancias, o None para el de MANZANAS_ESPACIO.
+
+    Returns:
+    ThreadingHTTPServer: Servidor listo para serve_forever().
+    """
+    activar_registro(ruta_prototipos, espacio)
+    configurar_cache(cache_bytes, directorio_cache)
+    for metrica in metricas:
+        tabla_para(metrica)
+    configuracion.update(metrica=metricas[0], metricas=tuple(metricas), area_minima=area_minima)
+
+    threading.Thread(target=_agrupar_peticiones, name="agrupador", daemon=True).start()
+    servidor = ThreadingHTTPServer((direccion, puerto), ManejadorClasificacion)
+    servidor.daemon_threads = True
+    return servidor
+
+# ----------------------------------------------------------
+# Función del Cliente de Prueba
+# ----------------------------------------------------------
+def enviar_imagenes(rutas, url, concurrentes=4, metrica=None):
+    """
+    Envía imágenes al servicio desde varios hilos y mide el rendimiento.
+
+    Args:
+    rutas (list): Imágenes a enviar.
+    url (str): Dirección base del servicio.
+    concurrentes (int): Peticiones simultáneas.
+    metrica (float): Métrica a pedir, o None para la del servicio.
+
+    Returns:
+    list: Respuestas JSON del servicio, en el orden de las rutas.
+    """
+    destino = f"{url.rstrip('/')}/clasificar"
+    if metrica is not None:
+        destino += f"?metrica={metrica}"
+
+    def enviar(ruta):
+        with open(ruta, "rb") as archivo:
+            peticion = urllib.request.Request(destino, data=archivo.read(), headers={"Content-Type": "application/octet-stream"})
+        with urllib.request.urlopen(peticion) as respuesta:
+            return json.load(respuesta)
+
+    with ThreadPoolExecutor(max_workers=concurrentes) as grupo:
+        return list(grupo.map(enviar, rutas))
+
+# ----------------------------------------------------------
+# Función Principal
+# ----------------------------------------------------------
+def main(argumentos=None):
+    """
+    Punto de entrada de la línea de comandos.
+
+    Args:
+    argumentos (list): Argumentos a interpretar; por omisión los de sys.argv.
+    """
+    parser = argparse.ArgumentParser(description="Servicio HTTP local de clasificación de manzanas.")
+    comandos = parser.add_subparsers(dest="comando", required=True)
+
+    servir = comandos.add_parser("servir", help="Atender peticiones HTTP.")
+    servir.add_argument("--direccion", default="127.0.0.1", help="Dirección de escucha.")
+    servir.add_argument("--puerto", type=int, default=PUERTO, help="Puerto de escucha.")
+    servir.add_argument("--metrica", type=metrica_desde_texto, nargs="+", default=[1],
+                        help="Métricas aceptadas, con la tabla abierta de antemano; la primera es la predeterminada.")
+    servir.add_argument("--prototipos", default=os.environ.get("MANZANAS_PROTOTIPOS"), help="Archivo JSON de prototipos.")
+    servir.add_argument("--espacio", type=espacio_desde_texto, default=os.environ.get("MANZANAS_ESPACIO", "rgb"),
+                        help="Espacio de color de las distancias: rgb, lab o hsv.")
+    servir.add_argument("--area-minima", type=int, default=AREA_MINIMA, help="Área mínima de una manzana en píxeles.")
+    servir.add_argument("--cache-mb", type=float, help="Memoria máxima de la caché de resultados (MB; 0 la desactiva).")
+    servir.add_argument("--cache-directorio", help="Directorio donde la caché de resultados también se guarda en disco.")
+
+    enviar = comandos.add_parser("enviar", help="Cliente de prueba: enviar imágenes y medir.")
+    enviar.add_argument("imagenes", nargs="+", help="Imágenes a enviar.")
+    enviar.add_argument("--url", default=f"http://127.0.0.1:{PUERTO}", help="Dirección del servicio.")
+    enviar.add_argument("--concurrentes", type=int, default=4, help="Peticiones simultáneas.")
+    enviar.add_argument("--metrica", type=metrica_desde_texto, help="Métrica a pedir.")
+    args = parser.parse_args(argumentos)
+
+    if args.comando == "enviar":
+        inicio = time.perf_counter()
+        respuestas = enviar_imagenes(args.imagenes, args.url, args.concurrentes, args.metrica)
+        transcurrido = time.perf_counter() - inicio
+        for respuesta in respuestas:
+            for resultado in respuesta["resultados"]:
+                print(json.dumps({clave: resultado.get(clave) for clave in ("imagen", "forma", "conteo", "error")}, ensure_ascii=False))
+        print(f"{len(respuestas)} imágenes en {transcurrido:.2f} s ({len(respuestas) / transcurrido:.1f} imágenes/s).")
+        return
+
+    cache_bytes = None if args.cache_mb is None else int(args.cache_mb * 1024 * 1024)
+    servidor = iniciar_servicio(args.direccion, args.puerto, tuple(args.metrica), args.prototipos, args.area_minima,
+                                cache_bytes, args.cache_directorio, args.espacio)
+    print(f"Atendiendo en http://{args.direccion}:{servidor.server_address[1]}")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.server_close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+# ----------------------------------------------------------
+# Tablas de Consulta RGB -> Etiqueta
+# ----------------------------------------------------------
+# Las reglas de comparacion() dependen sólo del valor (r, g, b) y de la
+# métrica, así que cada resultado se precalcula una vez en una tabla de
+# 256x256x256 bytes (16 MB) por métrica. Las tablas se guardan en disco,
+# se abren mapeadas en memoria y se reconstruyen cuando cambian los
+# prototipos o las compuertas.
+# ----------------------------------------------------------
+
+# ----------------------------------------------------------
+# Importación de Bibliotecas
+# ----------------------------------------------------------
+import hashlib  # Módulo para calcular huellas de los prototipos
+import os  # Módulo para interactuar con el sistema operativo
+import threading  # Identificador del hilo para los archivos temporales
+import numpy as np  # Biblioteca para trabajar con arreglos y operaciones matemáticas
+
+import clasificador  # Clasificación vectorizada con los prototipos y compuertas
+from instrumentacion import instrumentar, pixeles_del_primero  # Métricas opcionales por etapa
+
+# ----------------------------------------------------------
+# Variables Globales
+# ----------------------------------------------------------
+# Directorio donde se guardan las tablas (configurable con MANZANAS_CACHE)
+DIRECTORIO_TABLAS = os.environ.get(
+    "MANZANAS_CACHE", os.path.join(os.path.expanduser("~"), ".cache", "manzanas")
+)
+FORMA_TABLA = (256, 256, 256)
+tablas_abiertas = {}  # Diccionario (métrica, huella) -> tabla mapeada en memoria
+
+# ----------------------------------------------------------
+# Función para Calcular la Huella de los Prototipos
+# ----------------------------------------------------------
+def huella_prototipos(metrica):
+    """
+    Calcula una huella de los prototipos, las compuertas, la métrica y el espacio de color.
+
+    Args:
+    metrica (float): Parámetro de la distancia de Minkowski.
+
+    Returns:
+    str: Huella hexadecimal corta.
+    """
+    datos = (clasificador.PROTOTIPOS, float(metrica))
+    if clasificador.ESPACIO_COLOR != "rgb":
+        # RGB conserva la huella de siempre, así las tablas ya construidas siguen valiendo
+        datos += (clasificador.ESPACIO_COLOR,)
+    contenido = repr(datos).encode("utf-8")
+    return hashlib.sha256(contenido).hexdigest()[:16]
+
+# ----------------------------------------------------------
+# Función para Construir una Tabla en Disco
+# ----------------------------------------------------------
+@instrumentar("construir_tabla")
+def construir_tabla(metrica, ruta):
+    """
+    Clasifica los 2^24 colores posibles y guarda la tabla en disco.
+
+    La tabla se escribe primero en un archivo temporal y luego se renombra,
+    así ningún proceso puede abrir una tabla a medio escribir.
+
+    Args:
+    metrica (float): Parámetro de la distancia de Minkowski.
+    ruta (str): Ruta final del archivo de la tabla.
+    """
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    # Cada proceso e hilo escribe su propio temporal, así dos construcciones simultáneas no se mezclan
+    ruta_temporal = f"{ruta}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+    tabla = np.memmap(ruta_temporal, dtype=np.uint8, mode="w+", shape=FORMA_TABLA)
+    canal = np.arange(256, dtype=np.uint8)
+    verde_azul = np.stack(np.meshgrid(canal, canal, indexing="ij"), axis=-1)
+    plano = np.empty((256, 256, 3), dtype=np.uint8)
+    plano[..., 1:] = verde_azul
+    for rojo in range(256):
+        plano[..., 0] = rojo
+        tabla[rojo] = clasificador.clasificar_imagen(plano, metrica)
+    tabla.flush()
+    del tabla
+
+    os.replace(ruta_temporal, ruta)
+
+# ----------------------------------------------------------
+# Función para Obtener la Tabla de una Métrica
+# ----------------------------------------------------------
+def tabla_para(metrica):
+    """
+    Devuelve la tabla de consulta de una métrica, construyéndola si hace falta.
+
+    Args:
+    metrica (float): Parámetro de la distancia de Minkowski.
+
+    Returns:
+    ndarray: Tabla 256x256x256 (uint8, sólo lectura) indexada por [r, g, b].
+    """
+    huella = huella_prototipos(metrica)
+    clave = (float(metrica), huella)
+    if clave in tablas_abiertas:
+        return tablas_abiertas[clave]
+
+    ruta = os.path.join(DIRECTORIO_TABLAS, f"tabla_{huella}.u8")
+    if not os.path.exists(ruta):
+        construir_tabla(metrica, ruta)
+
+    tabla = np.memmap(ruta, dtype=np.uint8, mode="r", shape=FORMA_TABLA)
+    tablas_abiertas[clave] = tabla
+    return tabla
+
+# ----------------------------------------------------------
+# Función para Clasificar una Imagen con la Tabla
+# ----------------------------------------------------------
+@instrumentar("clasificar_con_tabla", pixeles_del_primero)
+def clasificar_con_tabla(imagen, metrica):
+    """
+    Clasifica una imagen completa con una sola consulta a la tabla.
+
+    Args:
+    imagen (ndarray): Arreglo HxWx3 (uint8) con los canales en orden RGB.
+    metrica (float): Parámetro de la distancia de Minkowski.
+
+    Returns:
+    ndarray: Mapa HxW (uint8) de códigos de etiqueta.
+    """
+    imagen = np.asarray(imagen, dtype=np.uint8)
+    if imagen.ndim != 3 or imagen.shape[2] != 3:
+        raise ValueError("La imagen debe tener forma HxWx3.")
+    tabla = tabla_para(metrica)
+    return tabla[imagen[..., 0], imagen[..., 1], imagen[..., 2]]
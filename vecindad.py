@@ -0,0 +1,144 @@
+# ----------------------------------------------------------
+# Votación de Vecindad sobre un Mapa Denso de Etiquetas
+# ----------------------------------------------------------
+# Sustituye el diccionario colores_circundantes (tupla -> frase) por un
+# arreglo uint8 HxW de códigos más una máscara de píxeles visitados. La
+# votación de los 8 vecinos se hace con rebanadas del arreglo y el suavizado
+# de la imagen completa con un filtro de moda vectorizado.
+# ----------------------------------------------------------
+
+# ----------------------------------------------------------
+# Importación de Bibliotecas
+# ----------------------------------------------------------
+import numpy as np  # Biblioteca para trabajar con arreglos y operaciones matemáticas
+
+from clasificador import ETIQUETAS, FONDO  # Códigos de etiqueta
+from instrumentacion import instrumentar, pixeles_del_primero, un_pixel  # Métricas opcionales por etapa
+
+# ----------------------------------------------------------
+# Función para Crear un Mapa de Etiquetas Vacío
+# ----------------------------------------------------------
+def crear_raster(alto, ancho):
+    """
+    Reserva el mapa de etiquetas y la máscara de visitados de una imagen.
+
+    Args:
+    alto (int): Alto de la imagen en píxeles.
+    ancho (int): Ancho de la imagen en píxeles.
+
+    Returns:
+    tuple: (etiquetas, visitados) con forma alto x ancho, uint8 y bool.
+    """
+    return np.zeros((alto, ancho), dtype=np.uint8), np.zeros((alto, ancho), dtype=bool)
+
+# ----------------------------------------------------------
+# Función para Votar entre los 8 Vecinos de un Píxel
+# ----------------------------------------------------------
+@instrumentar("voto_vecinos", un_pixel)
+def voto_vecinos(etiquetas, visitados, x, y):
+    """
+    Devuelve la etiqueta más común entre los vecinos visitados de (x, y).
+
+    Args:
+    etiquetas (ndarray): Mapa HxW (uint8) de códigos de etiqueta.
+    visitados (ndarray): Máscara HxW (bool) de píxeles ya clasificados.
+    x (int): Columna del píxel.
+    y (int): Fila del píxel.
+
+    Returns:
+    int or None: Código más votado (el menor en caso de empate), o None si
+        ningún vecino ha sido visitado.
+    """
+    fila0, fila1 = max(y - 1, 0), y + 2
+    col0, col1 = max(x - 1, 0), x + 2
+    ventana = visitados[fila0:fila1, col0:col1].copy()
+    # El píxel central no vota por sí mismo
+    ventana[y - fila0, x - col0] = False
+
+    if not ventana.any():
+        return None
+    votos = np.bincount(etiquetas[fila0:fila1, col0:col1][ventana], minlength=len(ETIQUETAS))
+    return int(np.argmax(votos))
+
+# ----------------------------------------------------------
+# Función para Suavizar un Mapa Completo con la Moda
+# ----------------------------------------------------------
+@instrumentar("filtro_moda", pixeles_del_primero)
+def filtro_moda(etiquetas, visitados=None):
+    """
+    Reemplaza cada etiqueta por la moda de su vecindad 3x3.
+
+    Los 8 vecinos votan con peso 2 y el píxel central con peso 1, así el
+    centro sólo decide los empates. Con una máscara de visitados, sólo votan
+    y cambian los píxeles visitados.
+
+    Args:
+    etiquetas (ndarray): Mapa HxW (uint8) de códigos de etiqueta.
+    visitados (ndarray): Máscara HxW (bool) opcional de píxeles válidos.
+
+    Returns:
+    ndarray: Nuevo mapa HxW (uint8) suavizado.
+    """
+    alto, ancho = etiquetas.shape
+    validos = np.ones((alto, ancho), dtype=bool) if visitados is None else visitados
+
+    mejor_puntaje = np.zeros((alto, ancho), dtype=np.uint8)
+    resultado = etiquetas.copy()
+    for codigo in ETIQUETAS:
+        presente = np.zeros((alto + 2, ancho + 2), dtype=np.uint8)
+        presente[1:-1, 1:-1] = (etiquetas == codigo) & validos
+
+        # Suma de los 8 vecinos mediante rebanadas desplazadas del arreglo con borde
+        vecinos = np.zeros((alto, ancho), dtype=np.uint8)
+        for di in range(3):
+            for dj in range(3):
+                if (di, dj) != (1, 1):
+                    vecinos += presente[di:di + alto, dj:dj + ancho]
+        puntaje = 2 * vecinos + presente[1:-1, 1:-1]
+
+        # Sólo un puntaje estrictamente mayor cambia la etiqueta: en empates gana el código menor
+        mejora = puntaje > mejor_puntaje
+        mejor_puntaje[mejora] = puntaje[mejora]
+        resultado[mejora] = codigo
+
+    if visitados is not None:
+        resultado[~visitados] = etiquetas[~visitados]
+    return resultado
+
+# ----------------------------------------------------------
+# Funciones para Convertir entre el Mapa y el Formato de Diccionario
+# ----------------------------------------------------------
+def raster_a_diccionario(etiquetas, visitados):
+    """
+    Convierte los píxeles visitados al formato {"(x, y)": frase} de los JSON guardados.
+
+    Args:
+    etiquetas (ndarray): Mapa HxW (uint8) de códigos de etiqueta.
+    visitados (ndarray): Máscara HxW (bool) de píxeles visitados.
+
+    Returns:
+    dict: Diccionario con claves "(x, y)" y la frase de comparacion() como valor.
+    """
+    filas, columnas = np.nonzero(visitados)
+    codigos = etiquetas[filas, columnas]
+    return {
+        str((int(x), int(y))): ETIQUETAS[int(codigo)][0]
+        for x, y, codigo in zip(columnas, filas, codigos)
+    }
+
+def diccionario_a_raster(colores, etiquetas, visitados):
+    """
+    Vuelca un diccionario {(x, y) o "(x, y)": frase} en el mapa de etiquetas.
+
+    Args:
+    colores (dict): Diccionario leído de un JSON o del formato antiguo en memoria.
+    etiquetas (ndarray): Mapa HxW (uint8) a rellenar.
+    visitados (ndarray): Máscara HxW (bool) a rellenar.
+    """
+    codigo_por_frase = {frase: codigo for codigo, (frase, _) in ETIQUETAS.items()}
+    alto, ancho = etiquetas.shape
+    for clave, frase in colores.items():
+        x, y = clave if isinstance(clave, tuple) else (int(v) for v in clave.strip("()").split(","))
+        if 0 <= x < ancho and 0 <= y < alto:
+            etiquetas[y, x] = codigo_por_frase.get(frase, FONDO)
+            visitados[y, x] = True
@@ -0,0 +1,158 @@
+# ----------------------------------------------------------
+# Clasificación de Video o Cámara en Flujo Continuo
+# ----------------------------------------------------------
+# Lee fotogramas de un archivo de video o de un dispositivo V4L2 con
+# cv2.VideoCapture, clasifica cada uno con las tablas precalculadas y
+# detectar_forma(), y emite por fotograma el número de manzanas de cada color.
+# Los fotogramas esperan en una cola acotada; si la clasificación se atrasa,
+# se descarta el más antiguo para que la latencia no crezca.
+#
+# Uso:
+#   python video.py banda.mp4 --metrica 2 > conteos.jsonl
+#   python video.py 0 --capacidad 2
+# ----------------------------------------------------------
+
+# ----------------------------------------------------------
+# Importación de Bibliotecas
+# ----------------------------------------------------------
+import argparse  # Módulo para leer los argumentos de la línea de comandos
+import json  # Módulo para trabajar con JSON
+import os  # Módulo para leer variables de entorno
+import threading  # Módulo para leer fotogramas en un hilo aparte
+import time  # Módulo para medir tiempos y latencias
+from collections import deque  # Cola acotada que descarta el elemento más antiguo
+
+import cv2  # OpenCV, una biblioteca de visión por computadora
+
+from clasificador import metrica_desde_texto  # Lectura del parámetro p
+from espacios_color import espacio_desde_texto  # Espacio de color de las distancias
+from nucleo import detectar_forma  # Detección de forma sin interfaz gráfica
+from registro import activar_registro  # Conjunto de prototipos configurable
+from regiones import AREA_MINIMA, contar_por_color, regiones_desde_etiquetas  # Una región por manzana
+from tablas import clasificar_con_tabla, tabla_para  # Clasificación con tablas precalculadas
+
+# ----------------------------------------------------------
+# Función para Leer Fotogramas en Segundo Plano
+# ----------------------------------------------------------
+def _leer_fotogramas(captura, cola, condicion, estado, ritmo):
+    """
+    Lee fotogramas y los deja en la cola acotada hasta agotar la fuente.
+
+    Args:
+    captura (cv2.VideoCapture): Fuente de video abierta.
+    cola (deque): Cola con longitud máxima; al llenarse descarta el fotograma más antiguo.
+    condicion (threading.Condition): Condición que protege la cola y el estado.
+    estado (dict): Estado compartido con las claves "terminado", "detener" y "descartados".
+    ritmo (float): Segundos entre fotogramas para simular una cámara, o 0 para leer sin pausa.
+    """
+    indice = 0
+    siguiente = time.monotonic()
+    while not estado["detener"]:
+        leido, fotograma = captura.read()
+        if not leido:
+            break
+        with condicion:
+            if len(cola) == cola.maxlen:
+                estado["descartados"] += 1
+            cola.append((indice, time.monotonic(), fotograma))
+            condicion.notify()
+        indice += 1
+        if ritmo:
+            siguiente += ritmo
+            time.sleep(max(0.0, siguiente - time.monotonic()))
+
+    captura.release()
+    with condicion:
+        estado["terminado"] = True
+        condicion.notify()
+
+# ----------------------------------------------------------
+# Función para Clasificar un Flujo de Video
+# ----------------------------------------------------------
+def clasificar_flujo(fuente, metrica, capacidad=4, ritmo=None, area_minima=AREA_MINIMA):
+    """
+    Clasifica los fotogramas de un video o cámara y produce un resultado por fotograma.
+
+    Args:
+    fuente (str or int): Ruta del video, dispositivo ("/dev/video0") o índice de cámara.
+    metrica (float): Parámetro de la distancia de Minkowski.
+    capacidad (int): Máximo de fotogramas en espera antes de descartar el más antiguo.
+    ritmo (float): Segundos entre lecturas. Por omisión se usa el FPS de los
+        archivos de video y ninguna pausa para las cámaras.
+    area_minima (int): Área mínima de una región para contarla como manzana.
+
+    Yields:
+    dict: Índice del fotograma, forma, manzanas por color, regiones, latencia y descartados.
+    """
+    captura = cv2.VideoCapture(fuente)
+    if not captura.isOpened():
+        raise ValueError(f"No se pudo abrir la fuente de video: {fuente}")
+
+    if ritmo is None:
+        fps = captura.get(cv2.CAP_PROP_FPS)
+        ritmo = 1.0 / fps if isinstance(fuente, str) and not fuente.startswith("/dev/") and fps > 0 else 0.0
+
+    tabla_para(metrica)
+    cola = deque(maxlen=capacidad)
+    condicion = threading.Condition()
+    estado = {"terminado": False, "detener": False, "descartados": 0}
+    lector = threading.Thread(
+        target=_leer_fotogramas, args=(captura, cola, condicion, estado, ritmo), daemon=True
+    )
+    lector.start()
+
+    try:
+        while True:
+            with condicion:
+                while not cola and not estado["terminado"]:
+                    condicion.wait()
+                if not cola:
+                    break
+                indice, capturado, fotograma = cola.popleft()
+                descartados = estado["descartados"]
+
+            etiquetas = clasificar_con_tabla(fotograma[..., ::-1], metrica)
+            regiones = regiones_desde_etiquetas(etiquetas, area_minima)
+            yield {
+                "fotograma": indice,
+                "forma": detectar_forma(fotograma),
+                "manzanas": contar_por_color(regiones),
+                "regiones": regiones,
+                "latencia_ms": round(1000 * (time.monotonic() - capturado), 2),
+                "descartados": descartados,
+            }
+    finally:
+        estado["detener"] = True
+        lector.join()
+
+# ----------------------------------------------------------
+# Función Principal
+# ----------------------------------------------------------
+def main(argumentos=None):
+    """
+    Punto de entrada de la línea de comandos; escribe un JSON por línea y fotograma.
+
+    Args:
+    argumentos (list): Argumentos a interpretar; por omisión los de sys.argv.
+    """
+    parser = argparse.ArgumentParser(description="Clasificación de manzanas en video o cámara.")
+    parser.add_argument("fuente", help="Archivo de video, dispositivo V4L2 o índice de cámara.")
+    parser.add_argument("--metrica", type=metrica_desde_texto, default=1, help="Parámetro p de Minkowski (1, 2, inf o cualquier p > 0).")
+    parser.add_argument("--capacidad", type=int, default=4, help="Fotogramas en espera como máximo.")
+    parser.add_argument("--sin-ritmo", action="store_true", help="Leer el archivo sin esperar entre fotogramas.")
+    parser.add_argument("--prototipos", default=os.environ.get("MANZANAS_PROTOTIPOS"), help="Archivo JSON de prototipos.")
+    parser.add_argument("--espacio", type=espacio_desde_texto, default=os.environ.get("MANZANAS_ESPACIO", "rgb"),
+                        help="Espacio de color de las distancias: rgb, lab o hsv.")
+    parser.add_argument("--area-minima", type=int, default=AREA_MINIMA, help="Área mínima de una manzana.")
+    args = parser.parse_args(argumentos)
+
+    activar_registro(args.prototipos, args.espacio)
+    fuente = int(args.fuente) if args.fuente.isdigit() else args.fuente
+    for resultado in clasificar_flujo(
+        fuente, args.metrica, args.capacidad,
+        ritmo=0.0 if args.sin_ritmo else None, area_minima=args.area_minima,
+    ):
+        print(json.dumps(resultado, ensure_ascii=False), flush=True)
+
+if __name__ == "__main__":
+    main()